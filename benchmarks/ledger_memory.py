@@ -0,0 +1,115 @@
+"""Memory footprint of the Detailed View ledger: ``SELECT *`` tuples vs the compact ledger.
+
+Fills a throwaway database with synthetic ledger rows (shaped like what
+``process_files`` writes), then measures for each path the peak Python
+allocation while loading (tracemalloc) and the size of the resulting frame:
+
+    python benchmarks/ledger_memory.py --rows 100000 500000 --output memory.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import knorka  # noqa: E402
+from knorka import ledger, queries  # noqa: E402
+from knorka.config import staff_list  # noqa: E402
+from knorka.dates import date_key  # noqa: E402
+from knorka.db import bump_ledger_version  # noqa: E402
+from knorka.ingest import INSERT_INCENTIVE  # noqa: E402
+from knorka.staff import directory  # noqa: E402
+from synthetic import REGULAR_ITEMS, SPECIAL_ITEMS  # noqa: E402
+
+
+def fill_ledger(conn, rows, days, seed):
+    rng = random.Random(seed)
+    names = list(staff_list)
+    ids = directory(conn).ids
+    start = datetime(2025, 3, 1)
+    dates = [start + timedelta(days=d) for d in range(days)]
+    batch = []
+    for i in range(rows):
+        name = rng.choice(names)
+        company = rng.choice(["Life Style", "New Fashion Style"])
+        item = rng.choice(REGULAR_ITEMS + SPECIAL_ITEMS)
+        qty = rng.randint(1, 4)
+        rate = round(rng.uniform(199, 4999), 2)
+        gross = qty * rate
+        day = rng.choice(dates)
+        second = rng.choice(names + ["None"])
+        batch.append((day.strftime("%d-%m-%Y"), name, staff_list[name], round(gross * 0.00475, 4), gross, gross,
+                      rng.choice(["Present", "Sus"]), f"{company[:2].upper()}{i // 3:07d}", item, company, qty, rate,
+                      second, 2, round(gross * 0.01, 4), f"IC{rng.randint(1, 900):04d}",
+                      f"AIC{rng.randint(1, 300):04d}", date_key(day), ids[name], ids.get(second)))
+        if len(batch) == 10_000:
+            conn.executemany(INSERT_INCENTIVE, batch)
+            batch = []
+    if batch:
+        conn.executemany(INSERT_INCENTIVE, batch)
+    bump_ledger_version(conn)
+    conn.commit()
+
+
+def tuples_path(conn, start, end):
+    return pd.DataFrame(queries.detailed_rows(conn, start, end), columns=queries.LEDGER_COLUMNS)
+
+
+def ledger_path(conn, start, end):
+    return ledger.detailed_frame(ledger.load_ledger(conn), start, end)
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    frame = fn(*args)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": round(seconds, 4), "peak_mb": round(peak / 2**20, 2),
+            "frame_mb": round(frame.memory_usage(deep=True).sum() / 2**20, 2), "frame_rows": len(frame)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare ledger loading memory: SELECT * tuples vs compact frame")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000])
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write JSON results to this file (default: stdout)")
+    args = parser.parse_args()
+
+    start, end = datetime(2025, 3, 1), datetime(2025, 3, 1) + timedelta(days=args.days - 1)
+    results = []
+    with tempfile.TemporaryDirectory(prefix="knorka_ledger") as workdir:
+        for rows in args.rows:
+            conn = knorka.connect(os.path.join(workdir, f"ledger_{rows}.db"))
+            fill_ledger(conn, rows, args.days, args.seed)
+            entry = {"rows": rows, "select_tuples": measure(tuples_path, conn, start, end),
+                     "compact_ledger": measure(ledger_path, conn, start, end)}
+            entry["frame_ratio"] = round(entry["compact_ledger"]["frame_mb"] / entry["select_tuples"]["frame_mb"], 3)
+            entry["peak_ratio"] = round(entry["compact_ledger"]["peak_mb"] / entry["select_tuples"]["peak_mb"], 3)
+            results.append(entry)
+            conn.close()
+
+    report = {"meta": {"timestamp": datetime.now().isoformat(timespec="seconds"), "days": args.days,
+                       "pandas": pd.__version__}, "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""Concurrent-session load test of the Streamlit dashboard.
+
+Drives ``incentive_system.py`` headlessly with Streamlit's AppTest: each
+simulated user is a thread with its own session (as on the server, all
+sessions share one process, its caches and the database file). Users rerun
+the app, change the Overview, Performance and Detailed View date ranges,
+switch charts and generate PDFs, while a background thread keeps ingesting
+new synthetic days. Tabs are client-side in Streamlit, so every rerun
+executes all of them, as it does in the browser.
+
+    python benchmarks/load_test.py --users 1 4 8 --actions 20 --output load.json
+
+Reports p50/p95 rerun latency per action, SQLite lock waits (time spent
+retrying a busy database, measured with a zero busy timeout and the same
+5 second limit sqlite3 uses by default) and errors, as JSON like
+``run_benchmarks.py``.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(HERE)
+APP = os.path.join(REPO_ROOT, "incentive_system.py")
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, HERE)
+
+# The engine and the app read KNORKA_DATA_DIR on import, so it is set before importing them
+WORKDIR = tempfile.mkdtemp(prefix="knorka_load_")
+os.environ["KNORKA_DATA_DIR"] = WORKDIR
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import knorka  # noqa: E402
+import knorka.db  # noqa: E402
+from knorka.config import DB_PATH  # noqa: E402
+from run_benchmarks import git_revision  # noqa: E402
+from synthetic import write_dataset  # noqa: E402
+
+START = datetime(2025, 3, 1)
+# sqlite3's default busy timeout
+BUSY_TIMEOUT = 5.0
+BUSY_POLL = 0.005
+# New days the ingestion thread cycles through
+INGEST_DAYS = 3
+ACTIONS = {"rerun": 3, "overview_range": 2, "performance_range": 2, "detailed_view": 1, "pdf": 1}
+
+
+class LockStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.waits = []
+        self.timeouts = 0
+
+    def add(self, seconds, timed_out=False):
+        with self.lock:
+            self.waits.append(seconds)
+            self.timeouts += timed_out
+
+
+LOCKS = LockStats()
+
+
+def _retry_busy(call, *args):
+    """Run ``call``, waiting out SQLITE_BUSY like sqlite3's busy handler and recording the wait."""
+    started = None
+    while True:
+        try:
+            result = call(*args)
+        except sqlite3.OperationalError as e:
+            if "locked" not in str(e) and "busy" not in str(e):
+                raise
+            now = time.perf_counter()
+            started = started or now
+            if now - started >= BUSY_TIMEOUT:
+                LOCKS.add(now - started, timed_out=True)
+                raise
+            time.sleep(BUSY_POLL)
+            continue
+        if started is not None:
+            LOCKS.add(time.perf_counter() - started)
+        return result
+
+
+class LockTimedCursor(sqlite3.Cursor):
+    def execute(self, *args):
+        return _retry_busy(super().execute, *args)
+
+    def executemany(self, *args):
+        return _retry_busy(super().executemany, *args)
+
+
+class LockTimedConnection(sqlite3.Connection):
+    def cursor(self, factory=LockTimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+
+    def executemany(self, *args):
+        return self.cursor().executemany(*args)
+
+    def commit(self):
+        return _retry_busy(super().commit)
+
+
+def timed_connect(db_path=DB_PATH, migrate_schema=True):
+    """``knorka.db.connect`` with lock waits measured by ``LockTimedConnection``."""
+    conn = sqlite3.connect(db_path, check_same_thread=False, uri=True, timeout=0, factory=LockTimedConnection)
+    if migrate_schema:
+        knorka.db.migrate(conn)
+    return conn
+
+
+def _random_range(rng, days):
+    start = START + timedelta(days=rng.randrange(days))
+    return start.date(), (start + timedelta(days=rng.randrange(1, 8))).date()
+
+
+def _click(at, label):
+    for button in at.button:
+        if button.label == label:
+            button.click()
+            return
+    raise LookupError(f"no {label!r} button")
+
+
+def _act(at, action, rng, days):
+    """Set up the widgets for one user action; the caller times the rerun."""
+    if action == "overview_range":
+        start, end = _random_range(rng, days)
+        at.date_input(key="overview_start").set_value(start)
+        at.date_input(key="overview_end").set_value(end)
+    elif action == "performance_range":
+        start, end = _random_range(rng, days)
+        at.date_input(key="perf_start").set_value(start)
+        at.date_input(key="perf_end").set_value(end)
+        at.selectbox(key="chart_type").set_value(rng.choice(["Pie", "Bar", "Line"]))
+    elif action == "detailed_view":
+        start, end = _random_range(rng, days)
+        at.date_input(key="detail_start").set_value(start)
+        at.date_input(key="detail_end").set_value(end)
+        _click(at, "Generate Report")
+    elif action == "pdf":
+        at.date_input(key="report_date_input").set_value(_random_range(rng, days)[0])
+        _click(at, "Generate PDFs for Date")
+
+
+def user(index, actions, days, seed, think, timeout, samples, errors):
+    rng = random.Random(seed * 1000 + index)
+    at = AppTest.from_file(APP, default_timeout=timeout)
+    plan = ["first_load"] + rng.choices(list(ACTIONS), weights=list(ACTIONS.values()), k=actions)
+    for action in plan:
+        try:
+            if action != "first_load":
+                _act(at, action, rng, days)
+            started = time.perf_counter()
+            at.run()
+            samples.append((action, time.perf_counter() - started))
+            errors.extend(f"{action}: {e.proto.type}: {e.proto.message}" for e in at.exception)
+            errors.extend(f"{action}: {e.value}" for e in at.error)
+        except Exception as e:
+            errors.append(f"{action}: {type(e).__name__}: {e}")
+            if isinstance(e, LookupError):
+                continue
+            # A session whose rerun failed starts over, like a browser reload
+            at = AppTest.from_file(APP, default_timeout=timeout)
+        time.sleep(rng.uniform(0, think))
+
+
+def ingest_loop(datasets, stop, pause, ingests, errors):
+    """Ingest the synthetic days one after another, ``pause`` seconds apart, until the users are done."""
+    conn = timed_connect()
+    for erp_paths, attendance_path in itertools.cycle(datasets):
+        if stop.is_set():
+            break
+        started = time.perf_counter()
+        try:
+            knorka.process_files(conn, erp_paths, attendance_path, workers=1)
+            ingests.append(time.perf_counter() - started)
+        except Exception as e:
+            errors.append(f"ingest: {type(e).__name__}: {e}")
+        stop.wait(pause)
+    conn.close()
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(p / 100 * (len(ordered) - 1)))]
+
+
+def _latency(seconds):
+    return {"count": len(seconds), "p50": round(percentile(seconds, 50), 4), "p95": round(percentile(seconds, 95), 4),
+            "max": round(max(seconds), 4), "mean": round(statistics.mean(seconds), 4)}
+
+
+def run_level(users, args, seed_db, datasets):
+    shutil.copy(seed_db, DB_PATH)
+    LOCKS.reset()
+    samples, errors, ingests = [], [], []
+    stop = threading.Event()
+    ingester = threading.Thread(target=ingest_loop, args=(datasets, stop, args.ingest_pause, ingests, errors)) if args.ingest else None
+    threads = [threading.Thread(target=user, args=(i, args.actions, args.days, args.seed, args.think, args.timeout, samples, errors))
+               for i in range(users)]
+    started = time.perf_counter()
+    if ingester:
+        ingester.start()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stop.set()
+    if ingester:
+        ingester.join()
+    elapsed = time.perf_counter() - started
+
+    reruns = [seconds for action, seconds in samples if action != "first_load"]
+    by_action = {}
+    for action, seconds in samples:
+        by_action.setdefault(action, []).append(seconds)
+    return {
+        "users": users,
+        "seconds": round(elapsed, 2),
+        "reruns": _latency(reruns) if reruns else None,
+        "actions": {action: _latency(seconds) for action, seconds in sorted(by_action.items())},
+        "lock_waits": {"count": len(LOCKS.waits), "seconds": round(sum(LOCKS.waits), 4),
+                       "max": round(max(LOCKS.waits, default=0.0), 4), "timeouts": LOCKS.timeouts},
+        "ingests": {"count": len(ingests), "seconds": [round(s, 3) for s in ingests]},
+        "errors": {"count": len(errors), "samples": sorted(set(errors))[:10]},
+    }
+
+
+def print_table(results, header=True):
+    if header:
+        print(f"{'users':>5}{'reruns':>8}{'p50 s':>9}{'p95 s':>9}{'max s':>9}{'lock waits':>12}{'wait s':>9}{'ingests':>9}{'errors':>8}",
+              file=sys.stderr)
+    for r in results:
+        reruns = r["reruns"] or {"count": 0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+        print(f"{r['users']:>5}{reruns['count']:>8}{reruns['p50']:>9.3f}{reruns['p95']:>9.3f}{reruns['max']:>9.3f}"
+              f"{r['lock_waits']['count']:>12}{r['lock_waits']['seconds']:>9.3f}{r['ingests']['count']:>9}{r['errors']['count']:>8}",
+              file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the dashboard with concurrent headless sessions")
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 4, 8], help="concurrent sessions, one run per value")
+    parser.add_argument("--actions", type=int, default=20, help="actions per user after the first load")
+    parser.add_argument("--rows", type=int, default=500, help="sale lines per company file and day")
+    parser.add_argument("--days", type=int, default=14, help="days of history loaded before the run")
+    parser.add_argument("--think", type=float, default=0.5, help="maximum pause between a user's actions (seconds)")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds before a rerun counts as failed")
+    parser.add_argument("--no-ingest", dest="ingest", action="store_false", help="do not ingest while the users run")
+    parser.add_argument("--ingest-pause", type=float, default=1.0, help="seconds between background ingestions")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write JSON results to this file (default: stdout)")
+    args = parser.parse_args()
+
+    # The app's connections go through timed_connect as well: it imports knorka.db.connect on every rerun
+    knorka.db.connect = timed_connect
+    try:
+        knorka.configure_logging(os.path.join(WORKDIR, "processing.log"))
+        history = write_dataset(os.path.join(WORKDIR, "history"), args.rows * args.days, days=args.days, start=START,
+                                seed=args.seed)
+        knorka.process_files(timed_connect(), *history, workers=1)
+        seed_db = os.path.join(WORKDIR, "seed.db")
+        shutil.copy(DB_PATH, seed_db)
+        datasets = [write_dataset(os.path.join(WORKDIR, f"day{i}"), args.rows, start=START + timedelta(days=args.days + i),
+                                  seed=args.seed + i + 1)
+                    for i in range(INGEST_DAYS if args.ingest else 0)]
+        results = []
+        for users in args.users:
+            results.append(run_level(users, args, seed_db, datasets))
+            print_table(results[-1:], header=len(results) == 1)
+    finally:
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "rows": args.rows,
+            "days": args.days,
+            "actions": args.actions,
+            "think": args.think,
+            "ingest": args.ingest,
+            "ingest_pause": args.ingest_pause,
+            "seed": args.seed,
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""Headless benchmark of the ingestion and reporting engine.
+
+Generates synthetic Logic ERP exports (see ``synthetic.py``), then times each
+stage against a throwaway database without a Streamlit session:
+
+    python benchmarks/run_benchmarks.py --rows 500 2000 --days 7 --output bench.json
+    python benchmarks/run_benchmarks.py --rows 2000 --baseline bench.json
+
+Results are written as JSON so runs from different releases can be compared
+with ``--baseline``.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(HERE)
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, HERE)
+
+import knorka  # noqa: E402
+from knorka import ledger, queries  # noqa: E402
+from knorka.rules import simulate  # noqa: E402
+from knorka.staff import directory  # noqa: E402
+from synthetic import write_dataset  # noqa: E402
+
+
+class NamedBytes(io.BytesIO):
+    """In-memory upload with a ``name``, like Streamlit's UploadedFile."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            super().__init__(f.read())
+        self.name = os.path.basename(path)
+
+
+def fresh_db(workdir):
+    db_path = os.path.join(workdir, "incentive_data.db")
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    return knorka.connect(db_path)
+
+
+def timed(fn, repeat, setup=None):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return samples, result
+
+
+def summarize(stage, rows, samples, **extra):
+    best = min(samples)
+    entry = {
+        "stage": stage,
+        "rows": rows,
+        "repeat": len(samples),
+        "seconds": [round(s, 6) for s in samples],
+        "min": round(best, 6),
+        "median": round(statistics.median(samples), 6),
+        "rows_per_sec": round(rows / best, 1) if rows and best > 0 else None,
+    }
+    entry.update(extra)
+    return entry
+
+
+def dashboard_queries(conn, start, end):
+    """The Overview, Performance and Detailed View queries for one rerun."""
+    queries.overview_totals(conn, start, end)
+    queries.top_performer(conn, start, end)
+    queries.totals_by_staff(conn, start, end)
+    queries.incentive_by_staff(conn, start, end)
+    queries.gross_by_date(conn, start, end)
+    return pd.DataFrame(queries.detailed_rows(conn, start, end), columns=queries.LEDGER_COLUMNS)
+
+
+def dashboard_ledger(conn, start, end):
+    """The Detailed View read served from the shared ledger frame."""
+    return ledger.detailed_frame(ledger.get_ledger(conn), start, end)
+
+
+def bench_size(workdir, rows, days, repeat, seed, workers=None):
+    data_dir = os.path.join(workdir, f"data_{rows}")
+    start_day = datetime(2025, 3, 1)
+    end_day = start_day + timedelta(days=max(days, 1) - 1)
+    erp_paths, attendance_path = write_dataset(data_dir, rows, days=days, start=start_day, seed=seed)
+    results = []
+
+    samples, frames = timed(lambda: [pd.read_excel(p, skiprows=2) for p in erp_paths] + [pd.read_excel(attendance_path, skiprows=6)], repeat)
+    results.append(summarize("parse_excel", rows * len(erp_paths), samples))
+
+    sales = pd.concat(frames[:2])
+    sales = sales[pd.to_numeric(sales["SNO."], errors="coerce").notna()]
+    calls = list(zip(sales["ITEM NAME"].fillna(""), sales["NET AMOUNT"].fillna(0)))
+
+    def run_rules():
+        for item_name, net_amount in calls:
+            knorka.calculate_incentive("Gaurav", "Sonu", None, net_amount, item_name, net_amount)
+
+    samples, _ = timed(run_rules, repeat)
+    results.append(summarize("calculate_incentive", len(calls), samples))
+
+    state = {}
+
+    def reset():
+        if "conn" in state:
+            state["conn"].close()
+        state["conn"] = fresh_db(workdir)
+
+    def run_ingest():
+        return knorka.process_files(state["conn"], [NamedBytes(p) for p in erp_paths], NamedBytes(attendance_path), workers=workers)
+
+    samples, _ = timed(run_ingest, repeat, setup=reset)
+    conn = state["conn"]
+    ledger_rows = conn.execute("SELECT COUNT(*) FROM incentives").fetchone()[0]
+    results.append(summarize("process_files", rows * len(erp_paths), samples, ledger_rows=ledger_rows))
+
+    pdfs_dir = os.path.join(workdir, "pdfs")
+    samples, _ = timed(lambda: knorka.generate_pdfs_to_folder(conn, start_date=start_day, end_date=end_day, pdfs_dir=pdfs_dir), repeat)
+    results.append(summarize("generate_pdfs_to_folder", ledger_rows, samples, staff=len(directory(conn).known_staff)))
+
+    samples, pdf = timed(lambda: knorka.generate_detailed_pdf(conn, start_date=start_day, end_date=end_day), repeat)
+    results.append(summarize("generate_detailed_pdf", ledger_rows, samples, pdf_bytes=len(pdf)))
+
+    samples, detail = timed(lambda: dashboard_queries(conn, start_day, end_day), repeat)
+    results.append(summarize("dashboard_queries", ledger_rows, samples, detail_rows=len(detail)))
+
+    samples, detail = timed(lambda: dashboard_ledger(conn, start_day, end_day), repeat)
+    results.append(summarize("dashboard_ledger", ledger_rows, samples, detail_rows=len(detail)))
+
+    samples, simulation = timed(lambda: simulate(conn, {"total_rate": 0.012}, start_day, end_day), repeat)
+    results.append(summarize("simulate_rules", ledger_rows, samples, staff=len(simulation)))
+    conn.close()
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(r["stage"], r["rows"]): r for r in baseline["results"]}
+    print(f"{'stage':<26}{'rows':>8}{'baseline s':>12}{'current s':>12}{'ratio':>8}")
+    for r in results:
+        old = previous.get((r["stage"], r["rows"]))
+        if not old:
+            continue
+        ratio = r["min"] / old["min"] if old["min"] else float("nan")
+        print(f"{r['stage']:<26}{r['rows']:>8}{old['min']:>12.4f}{r['min']:>12.4f}{ratio:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingestion, PDF generation and dashboard queries")
+    parser.add_argument("--rows", type=int, nargs="+", default=[500, 2000], help="sale lines per company file")
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, help="worker processes for process_files (default: engine's choice)")
+    parser.add_argument("--output", help="write JSON results to this file (default: stdout)")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="knorka_bench") as workdir:
+        knorka.configure_logging(os.path.join(workdir, "processing.log"))
+        results = []
+        for rows in args.rows:
+            results.extend(bench_size(workdir, rows, args.days, args.repeat, args.seed, args.workers))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pandas": pd.__version__,
+            "days": args.days,
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "workers": args.workers,
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
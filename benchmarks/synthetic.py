@@ -0,0 +1,160 @@
+"""Synthetic Logic ERP exports for benchmarking.
+
+Writes LS_Sales / NFS_Sales workbooks and an attendance sheet with the same
+layout as the real exports: two title rows above the sales header
+(read with ``skiprows=2``), six preamble rows above the attendance header
+(``skiprows=6``), a trailing TOTAL row with a non-numeric ``SNO.``, agent
+names with stray spaces, newlines and misspellings, and special items that
+feed the helper pool.
+
+    python benchmarks/synthetic.py --rows 5000 --days 7 --out ./synthetic
+"""
+import argparse
+import os
+import random
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+SALES_COLUMNS = ["SNO.", "BILL DATE", "BILL NO.", "ITEM CODE", "ADDITIONAL ITEM CODE", "ITEM NAME",
+                 "TOTAL QTY", "RATE/UNIT", "GROSS AMOUNT", "NET AMOUNT", "AGENT NAME", "OTHER AGENT NAME"]
+ATTENDANCE_COLUMNS = ["SNO.", "Emp Code", "Name", "Status", "In Time", "Out Time"]
+
+SALESMEN = ["Gaurav", "Prakash", "Kishore", "Hemant", "Vivek", "Shum", "Vinod", "Rakesh"]
+HELPERS = ["Sahil", "Arjun", "Shivam", "Prince"]
+STOCKBOYS = ["Sonu"]
+# Spellings seen in real exports: case, whitespace, embedded newlines and typos
+MISSPELLINGS = {
+    "Gaurav": ["GAURAV", "gaurav ", "Gaurv", "Gourav"],
+    "Prakash": ["PRAKASH", "Prakash\n", "Parkash", "Prakas"],
+    "Kishore": ["KISHORE", "Kishor", "kishore"],
+    "Hemant": ["HEMANT", "Hement", " Hemant"],
+    "Vivek": ["VIVEK", "Vivek\n", "Vivk"],
+    "Shum": ["SHUM", "Shum "],
+    "Vinod": ["VINOD", "Vinodh", "vinod"],
+    "Rakesh": ["RAKESH", "Rakesh\n", "Raksh"],
+    "Sahil": ["SAHIL", "Sahill"],
+    "Arjun": ["ARJUN", "Arjunn"],
+    "Shivam": ["SHIVAM", "Shivam "],
+    "Sonu": ["SONU", "sonu"],
+    "Prince": ["PRINCE", "Prinse"],
+}
+REGULAR_ITEMS = ["SHIRT", "T-SHIRT", "JEANS", "TROUSER", "KURTA", "SAREE", "LEHENGA", "SUIT", "BLAZER",
+                 "JACKET", "TOP", "LEGGINGS", "DUPATTA", "SHERWANI", "KIDS FROCK", "NIGHT SUIT"]
+SPECIAL_ITEMS = ["PETICOT", "PETI COAT", "UNDERWEAR", "INNERWEAR VEST", "JOCKEY BRIEF"]
+
+
+def _agent_spelling(rng, name, typo_rate):
+    if rng.random() < typo_rate:
+        return rng.choice(MISSPELLINGS[name])
+    return name.upper()
+
+
+def sales_frame(rows, days=1, start=datetime(2025, 3, 1), bill_prefix="", seed=0,
+                special_rate=0.08, second_agent_rate=0.2, typo_rate=0.15, missing_rate=0.01):
+    """Return a DataFrame of ``rows`` synthetic sale lines spread over ``days`` days."""
+    rng = random.Random(seed)
+    records = []
+    bill_no = 1000
+    bill_lines = 0
+    for sno in range(1, rows + 1):
+        if bill_lines <= 0:
+            bill_no += 1
+            bill_lines = rng.randint(1, 5)
+            bill_day = start + timedelta(days=rng.randrange(max(days, 1)))
+            agent = rng.choice(SALESMEN + HELPERS)
+            other = None
+            if rng.random() < second_agent_rate:
+                other = rng.choice(STOCKBOYS + HELPERS + SALESMEN)
+                if other == agent:
+                    other = None
+        bill_lines -= 1
+
+        special = rng.random() < special_rate
+        item_name = rng.choice(SPECIAL_ITEMS if special else REGULAR_ITEMS)
+        qty = float(rng.randint(1, 3))
+        rate = float(rng.choice([199, 299, 399, 499, 799, 999, 1299, 1999, 2499, 3999]))
+        gross = qty * rate
+        net = round(gross * rng.choice([1.0, 0.95, 0.9]), 2)
+
+        # Logic ERP writes dates either as real dates or as dd/mm/yyyy text
+        bill_date = bill_day if rng.random() < 0.5 else bill_day.strftime("%d/%m/%Y")
+        agent_name = "NIL" if rng.random() < 0.02 else _agent_spelling(rng, agent, typo_rate)
+        other_name = _agent_spelling(rng, other, typo_rate) if other else None
+        record = [sno, bill_date, f"{bill_prefix}{bill_no}", f"IC{rng.randint(10000, 99999)}",
+                  f"AIC{rng.randint(100, 999)}", item_name, qty, rate, gross, net, agent_name, other_name]
+        if rng.random() < missing_rate:
+            record[rng.choice([1, 2, 5])] = None
+        records.append(record)
+
+    df = pd.DataFrame(records, columns=SALES_COLUMNS)
+    total = pd.DataFrame([["TOTAL", None, None, None, None, None, df["TOTAL QTY"].sum(), None,
+                           df["GROSS AMOUNT"].sum(), df["NET AMOUNT"].sum(), None, None]], columns=SALES_COLUMNS)
+    return pd.concat([df, total], ignore_index=True)
+
+
+def attendance_frame(seed=0, absent_rate=0.1):
+    """Return an attendance sheet covering the whole staff list plus a few unknown names."""
+    rng = random.Random(seed)
+    names = SALESMEN + HELPERS + STOCKBOYS + ["Maanik", "Ramesh Guard", "Sweeper"]
+    records = []
+    for sno, name in enumerate(names, start=1):
+        status = rng.choice(["L", "WO"]) if rng.random() < absent_rate else rng.choice(["P", "P", "P", "A"])
+        spelled = name.upper() if name in MISSPELLINGS else name
+        records.append([sno, f"E{sno:04d}", spelled, status, "10:0%d" % rng.randint(0, 9), "21:0%d" % rng.randint(0, 9)])
+    return pd.DataFrame(records, columns=ATTENDANCE_COLUMNS)
+
+
+def _write_with_preamble(df, path, preamble):
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        df.to_excel(writer, index=False, startrow=len(preamble), sheet_name="Sheet1")
+        sheet = writer.sheets["Sheet1"]
+        for i, line in enumerate(preamble, start=1):
+            sheet.cell(row=i, column=1, value=line)
+    return path
+
+
+def write_sales_workbook(path, company_title, rows, days=1, start=datetime(2025, 3, 1), seed=0, **kwargs):
+    df = sales_frame(rows, days=days, start=start, seed=seed, **kwargs)
+    end = start + timedelta(days=max(days, 1) - 1)
+    preamble = [company_title, f"Sales Register From {start.strftime('%d/%m/%Y')} To {end.strftime('%d/%m/%Y')}"]
+    return _write_with_preamble(df, path, preamble)
+
+
+def write_attendance_workbook(path, day=datetime(2025, 3, 1), seed=0):
+    df = attendance_frame(seed=seed)
+    preamble = ["LIFE STYLE", "Attendance Register", f"Date: {day.strftime('%d/%m/%Y')}", "", "Department: All", ""]
+    return _write_with_preamble(df, path, preamble)
+
+
+def write_dataset(out_dir, rows, days=1, start=datetime(2025, 3, 1), seed=0, **kwargs):
+    """Write LS_Sales.xlsx, NFS_Sales.xlsx and Attendance.xlsx into ``out_dir``.
+
+    ``rows`` is the number of sale lines per company file. Returns
+    ``(erp_paths, attendance_path)``.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    ls_path = write_sales_workbook(os.path.join(out_dir, "LS_Sales.xlsx"), "LIFE STYLE", rows,
+                                   days=days, start=start, seed=seed, **kwargs)
+    nfs_path = write_sales_workbook(os.path.join(out_dir, "NFS_Sales.xlsx"), "NEW FASHION STYLE", rows,
+                                    days=days, start=start, seed=seed + 1, bill_prefix="N", **kwargs)
+    attendance_path = write_attendance_workbook(os.path.join(out_dir, "Attendance.xlsx"), day=start, seed=seed)
+    return [ls_path, nfs_path], attendance_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic Logic ERP exports")
+    parser.add_argument("--rows", type=int, default=2000, help="sale lines per company file")
+    parser.add_argument("--days", type=int, default=1, help="number of bill dates to spread the lines over")
+    parser.add_argument("--start", default="01-03-2025", help="first bill date (dd-mm-yyyy)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="synthetic", help="output directory")
+    args = parser.parse_args()
+    erp_paths, attendance_path = write_dataset(args.out, args.rows, days=args.days,
+                                               start=datetime.strptime(args.start, "%d-%m-%Y"), seed=args.seed)
+    for path in erp_paths + [attendance_path]:
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
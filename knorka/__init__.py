@@ -0,0 +1,19 @@
+"""KNORKA incentive engine.
+
+Ingestion, incentive rules, aggregations and PDF rendering, importable
+without Streamlit. ``incentive_system.py`` is the dashboard over this API and
+``python -m knorka`` the command line.
+"""
+from .config import configure_logging
+from .dates import normalize_date, normalize_dates
+from .db import connect, migrate
+from .ingest import (IngestError, IngestResult, determine_company, latest_report_date, process_files, read_attendance_sheet,
+                     read_sales_sheet)
+from .reports import backup_pdfs, compress_pdfs, encrypt_pdf, generate_detailed_pdf, generate_pdfs_to_folder
+from .rules import calculate_incentive
+
+__all__ = [
+    "IngestError", "IngestResult", "backup_pdfs", "calculate_incentive", "compress_pdfs", "configure_logging",
+    "connect", "determine_company", "encrypt_pdf", "generate_detailed_pdf", "generate_pdfs_to_folder",
+    "latest_report_date", "migrate", "normalize_date", "normalize_dates", "process_files", "read_attendance_sheet", "read_sales_sheet",
+]
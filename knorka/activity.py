@@ -0,0 +1,78 @@
+"""Sales activity against attendance: idle days and inactivity streaks.
+
+Every ingestion stores the attendance register in ``attendance`` (one row
+per staff member and day). A staff member is idle on a day they were present
+but have no line in ``sales_lines`` as agent or other agent (special items,
+which pay only the helper pool, count as sales too). Streaks of consecutive
+idle present days are found for all staff at once with window functions
+(gaps and islands), and results are cached per ledger version like the
+ledger frame.
+"""
+from datetime import timedelta
+
+from .config import DATE_FORMAT, excluded_names
+from .dates import date_key, from_key
+from .db import VersionedCache, ledger_version
+
+# Attendance statuses counted as present, as the ingestion has always read the register
+PRESENT_STATUSES = ("P", "A")
+# Idle present days in one week that raise an alert
+INACTIVE_DAYS = 3
+ACTIVITY_COLUMNS = ["Name", "Present Days", "Sales Days", "Idle Days", "Current Streak", "Longest Streak", "Last Sale"]
+
+_cache = VersionedCache(ledger_version)
+
+STREAKS = """WITH sales AS (
+                  SELECT agent_id AS staff_id, date_key FROM sales_lines WHERE date_key BETWEEN :start AND :end
+                  UNION
+                  SELECT other_agent_id, date_key FROM sales_lines WHERE date_key BETWEEN :start AND :end),
+              days AS (
+                  SELECT attendance.staff_id, attendance.date_key, sales.staff_id IS NOT NULL AS sold
+                  FROM attendance LEFT JOIN sales ON sales.staff_id = attendance.staff_id AND sales.date_key = attendance.date_key
+                  WHERE attendance.date_key BETWEEN :start AND :end AND attendance.status IN ({statuses})),
+              runs AS (
+                  SELECT staff_id, date_key, sold,
+                         ROW_NUMBER() OVER (PARTITION BY staff_id ORDER BY date_key)
+                         - ROW_NUMBER() OVER (PARTITION BY staff_id, sold ORDER BY date_key) AS run
+                  FROM days),
+              streaks AS (
+                  SELECT staff_id, COUNT(*) AS length, MAX(date_key) AS last_day FROM runs WHERE NOT sold GROUP BY staff_id, run),
+              totals AS (
+                  SELECT staff_id, COUNT(*) AS present_days, SUM(sold) AS sales_days, MAX(date_key) AS last_present,
+                         MAX(CASE WHEN sold THEN date_key END) AS last_sale
+                  FROM days GROUP BY staff_id)
+              SELECT staff.name, totals.present_days, totals.sales_days, totals.present_days - totals.sales_days,
+                     COALESCE(MAX(CASE WHEN streaks.last_day = totals.last_present THEN streaks.length END), 0),
+                     COALESCE(MAX(streaks.length), 0), totals.last_sale
+              FROM totals JOIN staff ON staff.id = totals.staff_id
+              LEFT JOIN streaks ON streaks.staff_id = totals.staff_id
+              GROUP BY totals.staff_id
+              ORDER BY 5 DESC, 6 DESC, staff.name"""
+
+
+def record_attendance(cursor, rows):
+    """Store ``(staff_id, date_key, status)`` rows; a re-uploaded register replaces the day's status."""
+    cursor.executemany("INSERT OR REPLACE INTO attendance (staff_id, date_key, status) VALUES (?, ?, ?)", rows)
+
+
+def streaks(conn, start_date, end_date):
+    """Return one row per staff member (see ``ACTIVITY_COLUMNS``) for the range, longest current streak first."""
+    start, end = date_key(start_date), date_key(end_date)
+
+    def load():
+        statuses = {f"status{i}": status for i, status in enumerate(PRESENT_STATUSES)}
+        query = STREAKS.format(statuses=", ".join(f":{name}" for name in statuses))
+        rows = conn.execute(query, {"start": start, "end": end, **statuses}).fetchall()
+        return [(*row[:6], from_key(row[6]).strftime(DATE_FORMAT) if row[6] else None)
+                for row in rows if row[0] not in excluded_names]
+    return _cache.get(conn, ("streaks", start, end), load)
+
+
+def inactivity_alerts(conn, day, staff_directory):
+    """Alerts for salesmen with ``INACTIVE_DAYS`` or more idle present days in the week (Mon-Sun) of ``day``."""
+    monday = day - timedelta(days=day.weekday())
+    alerts = []
+    for name, _, _, idle_days, *_ in streaks(conn, monday, monday + timedelta(days=6)):
+        if idle_days >= INACTIVE_DAYS and staff_directory.role(name, date_key(day)) == "Salesman":
+            alerts.append(f"{name} has not made sales on {idle_days} days present this week!")
+    return alerts
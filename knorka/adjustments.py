@@ -0,0 +1,74 @@
+"""Append-only incentive adjustments.
+
+Computed incentives in ``incentives`` are never rewritten; corrections are
+rows in ``adjustments`` (staff, date_key, amount, percent of gross, reason,
+author) and the effective incentive is the base plus the summed ``value`` of
+its adjustments. A bulk correction over a date range and a set of staff is a
+single INSERT ... SELECT.
+"""
+import logging
+from datetime import datetime
+
+from . import balances
+from .archive import incentives
+from .dates import date_key
+from .db import bump_ledger_version
+
+# Adjustment value = amount + percent of the staff member's gross over the range
+INSERT_ADJUSTMENTS = """INSERT INTO adjustments (staff_id, date_key, amount, percent, value, reason, author, created_at)
+                        SELECT staff.id, ?, ?, ?, ? + COALESCE(sales.gross, 0) * ? / 100, ?, ?, ?
+                        FROM staff LEFT JOIN (SELECT staff_id, SUM(gross) AS gross FROM {incentives}
+                                              WHERE date_key BETWEEN ? AND ? AND bill_no != 'Helper Pool'
+                                              GROUP BY staff_id) AS sales ON sales.staff_id = staff.id
+                        WHERE staff.name IN ({names})"""
+
+
+def add_adjustments(conn, names, start_date, end_date=None, amount=0.0, percent=0.0, reason="", author=""):
+    """Add ``amount`` plus ``percent`` of gross over the range to each of ``names``, in one transaction.
+
+    Each staff member gets one adjustment dated on the last day of the range;
+    negative values cut the incentive. Returns the number of rows added.
+    """
+    names = list(names)
+    if not names:
+        return 0
+    start_key = date_key(start_date)
+    end_key = date_key(end_date) if end_date else start_key
+    created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    source = incentives(conn, start_date, end_date or start_date)
+    last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM adjustments").fetchone()[0]
+    cursor = conn.execute(INSERT_ADJUSTMENTS.format(incentives=source, names=", ".join("?" * len(names))),
+                          (end_key, amount, percent, amount, percent, reason, author, created_at, start_key, end_key, *names))
+    added = cursor.rowcount
+    balances.add_adjusted(cursor, cursor.execute("SELECT staff_id, date_key, value FROM adjustments WHERE id > ?", (last_id,)).fetchall())
+    bump_ledger_version(conn)
+    conn.commit()
+    logging.info(f"Added {added} adjustments ({amount:+.2f}, {percent:+.3f}%) for {start_key}-{end_key}: {reason}")
+    return added
+
+
+def effective_incentive(conn, name, day):
+    """Base incentive plus adjustments for ``name`` on one day, or None when there is neither."""
+    key = date_key(day)
+    row = conn.execute(f"""SELECT (SELECT SUM(incentive) FROM {incentives(conn, day, day)} WHERE staff_id = staff.id AND date_key = ?),
+                                 (SELECT SUM(value) FROM adjustments WHERE staff_id = staff.id AND date_key = ?)
+                          FROM staff WHERE name = ?""", (key, key, name)).fetchone()
+    if not row or (row[0] is None and row[1] is None):
+        return None
+    return (row[0] or 0.0) + (row[1] or 0.0)
+
+
+def set_incentive(conn, name, day, incentive, reason="", author=""):
+    """Bring the effective incentive of ``name`` on ``day`` to ``incentive`` with one adjustment."""
+    current = effective_incentive(conn, name, day) or 0.0
+    return add_adjustments(conn, [name], day, amount=incentive - current, reason=reason or "Incentive set manually",
+                           author=author)
+
+
+def recent_adjustments(conn, limit=50):
+    """Return ``(created_at, name, date, amount, percent, value, reason, author)`` of the latest adjustments."""
+    return conn.execute("""SELECT created_at, staff.name,
+                                  printf('%02d-%02d-%04d', date_key % 100, date_key / 100 % 100, date_key / 10000),
+                                  amount, percent, value, reason, author
+                           FROM adjustments JOIN staff ON staff.id = adjustments.staff_id
+                           ORDER BY adjustments.id DESC LIMIT ?""", (limit,)).fetchall()
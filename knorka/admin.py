@@ -0,0 +1,36 @@
+"""Control Panel operations: staff, incentive edits and payments."""
+import logging
+
+from . import adjustments, balances, staff
+
+
+def add_staff(conn, name, role="Salesman", password=None):
+    if not staff.add_staff(conn, name, role, password):
+        return False
+    logging.info(f"Added staff: {name}")
+    return True
+
+
+def update_role(conn, name, role, effective_from=None):
+    """Give ``name`` a new role from ``effective_from`` on; earlier ledger rows keep the role they were paid under."""
+    staff.set_role(conn, name, role, effective_from)
+    logging.info(f"Updated role of {name} to {role}")
+
+
+def current_incentive(conn, name, date):
+    return adjustments.effective_incentive(conn, name, date)
+
+
+def update_incentive(conn, name, date, incentive, reason="", author=""):
+    adjustments.set_incentive(conn, name, date, incentive, reason, author)
+
+
+def record_payment(conn, name, amount, cleared_date):
+    balances.record_payment(conn, name, amount, cleared_date)
+    logging.info(f"Recorded payment of {amount} to {name}")
+
+
+def apply_adjustment(conn, names, start_date, end_date, value, percent, extra=True, reason="", author=""):
+    """Add (or cut) ``value`` plus ``percent`` of gross for each of ``names`` over the range; returns the rows added."""
+    sign = 1 if extra else -1
+    return adjustments.add_adjustments(conn, names, start_date, end_date, sign * value, sign * percent, reason, author)
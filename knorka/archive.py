@@ -0,0 +1,208 @@
+"""Closed periods of the ledger in read-only archive databases.
+
+Incentive rows of closed months are moved out of ``incentives`` into one
+SQLite file per period under ``ARCHIVE_DIR`` (a year's months are rolled up
+into one file once the year is closed) and registered in
+``archive_partitions``. Reads go through :func:`incentives`: when the date
+range stays in the active database it is plain ``incentives``; otherwise the
+archives the range reaches are ATTACHed read-only and a temp view joins them
+to the active table with UNION ALL. SQLite attaches at most ``MAX_ATTACHED``
+databases, so archives no longer needed are detached first and, when a range
+reaches more archives than that (whole-history reads), the oldest are read
+from one scratch copy made on a separate connection. Adjustments, payments
+and sales lines stay in the active database.
+"""
+import logging
+import os
+import sqlite3
+import tempfile
+from datetime import date
+from urllib.request import pathname2url
+
+from . import db
+from .config import ARCHIVE_DIR
+from .dates import date_key
+
+MAX_KEY = 99991231
+# SQLite's default limit on attached databases (SQLITE_MAX_ATTACHED)
+MAX_ATTACHED = 10
+# The incentives columns kept in archives, in this order in every archive file
+ARCHIVED_COLUMNS = ["date", "name", "role", "incentive", "gross", "net_amount", "status", "bill_no", "item_name", "company",
+                    "qty", "rate", "second_agent", "parts_count", "total_pool", "item_code", "additional_item_code",
+                    "date_key", "staff_id", "second_staff_id"]
+ARCHIVE_DDL = """CREATE TABLE {schema}.incentives
+                 (date TEXT, name TEXT, role TEXT, incentive REAL, gross REAL, net_amount REAL, status TEXT, bill_no TEXT,
+                  item_name TEXT, company TEXT, qty REAL, rate REAL, second_agent TEXT, parts_count INTEGER, total_pool REAL,
+                  item_code TEXT, additional_item_code TEXT, date_key INTEGER, staff_id INTEGER, second_staff_id INTEGER)"""
+
+
+def partitions(conn, start_key=0, end_key=MAX_KEY):
+    """``(id, period, start_key, end_key, path, rows)`` of the archives overlapping the range, oldest first."""
+    return conn.execute("""SELECT id, period, start_key, end_key, path, rows FROM archive_partitions
+                           WHERE end_key >= ? AND start_key <= ? ORDER BY start_key""", (start_key, end_key)).fetchall()
+
+
+def _attach(conn, partition_id, path):
+    # Named by registry row, so a re-archived period is attached afresh in long-running processes
+    schema = f"archive_{partition_id}"
+    if schema not in _attached(conn):
+        conn.execute(f"ATTACH DATABASE ? AS {schema}", (f"file:{pathname2url(os.path.abspath(path))}?mode=ro",))
+    return schema
+
+
+def _attached(conn):
+    """``{schema: file}`` of the attached archives and scratch copies."""
+    return {row[1]: row[2] for row in conn.execute("PRAGMA database_list") if row[1].startswith("archive")}
+
+
+def _release(conn, keep=()):
+    """Drop the temp views over archives and detach every archive (deleting scratch copies) not in ``keep``."""
+    for (view,) in conn.execute("SELECT name FROM sqlite_temp_master WHERE type = 'view' AND name LIKE 'ledger_%'").fetchall():
+        conn.execute(f"DROP VIEW temp.{view}")
+    for schema, path in _attached(conn).items():
+        if schema not in keep:
+            conn.execute(f"DETACH DATABASE {schema}")
+            if schema.startswith("archived_"):
+                os.remove(path)
+
+
+def _attach_copy(conn, reached):
+    """Attach one scratch database holding the rows of ``reached``.
+
+    The copy is made on its own connection, attaching the archives one at a
+    time, so nothing is committed on ``conn`` whatever transaction it has open.
+    """
+    schema = "archived_" + "_".join(str(partition[0]) for partition in reached)
+    if schema in _attached(conn):
+        return schema
+    columns = ", ".join(ARCHIVED_COLUMNS)
+    fd, path = tempfile.mkstemp(prefix="knorka_archived_", suffix=".db")
+    os.close(fd)
+    scratch = sqlite3.connect(path, uri=True)
+    try:
+        scratch.execute(ARCHIVE_DDL.format(schema="main"))
+        for _, _, _, _, source_path, _ in reached:
+            scratch.execute("ATTACH DATABASE ? AS source", (f"file:{pathname2url(os.path.abspath(source_path))}?mode=ro",))
+            scratch.execute(f"INSERT INTO main.incentives ({columns}) SELECT {columns} FROM source.incentives")
+            scratch.commit()
+            scratch.execute("DETACH DATABASE source")
+    finally:
+        scratch.close()
+    conn.execute(f"ATTACH DATABASE ? AS {schema}", (f"file:{pathname2url(path)}?mode=ro",))
+    return schema
+
+
+def incentives(conn, start_date=None, end_date=None):
+    """Name of the relation holding the incentive rows between two dates (default: all of them).
+
+    Call it before opening a write transaction: attaching an archive is not
+    allowed inside one.
+    """
+    start = date_key(start_date) if start_date is not None else 0
+    end = date_key(end_date) if end_date is not None else MAX_KEY
+    reached = partitions(conn, start, end)
+    if not reached:
+        return "incentives"
+    view = "ledger_" + "_".join(str(partition[0]) for partition in reached)
+    if conn.execute("SELECT 1 FROM sqlite_temp_master WHERE type = 'view' AND name = ?", (view,)).fetchone():
+        return view
+    # Past the limit the newest archives stay attached and the rest are read from one scratch copy
+    overflow = reached[:-(MAX_ATTACHED - 1)] if len(reached) > MAX_ATTACHED else []
+    attached = reached[len(overflow):]
+    keep = {f"archive_{partition[0]}" for partition in attached}
+    if overflow:
+        keep.add("archived_" + "_".join(str(partition[0]) for partition in overflow))
+    if len(_attached(conn).keys() | keep) > MAX_ATTACHED:
+        _release(conn, keep)
+    sources = ([f"{_attach_copy(conn, overflow)}.incentives"] if overflow else []) + [
+        f"{_attach(conn, partition_id, path)}.incentives" for partition_id, _, _, _, path, _ in attached]
+    columns = ", ".join(ARCHIVED_COLUMNS)
+    conn.execute(f"CREATE TEMP VIEW {view} AS SELECT {columns} FROM main.incentives"
+                 + "".join(f" UNION ALL SELECT {columns} FROM {source}" for source in sources))
+    return view
+
+
+def _bounds(period):
+    """``(start_key, end_key)`` of a "YYYY" or "YYYY-MM" period."""
+    if len(period) == 4:
+        return int(period) * 10000 + 101, int(period) * 10000 + 1231
+    year, month = map(int, period.split("-"))
+    return year * 10000 + month * 100 + 1, year * 10000 + month * 100 + 31
+
+
+def closed_periods(conn, before=None):
+    """Periods to archive with data ending before ``before`` (default: the first of this month).
+
+    Months of a closed year roll up into the year; months of the current year stay monthly.
+    """
+    cutoff = date_key(before or date.today().replace(day=1))
+    periods = set()
+    months = [row[0] for row in conn.execute("SELECT DISTINCT date_key / 100 FROM incentives WHERE date_key < ? AND date_key > 0",
+                                             (cutoff,))]
+    months += [start // 100 for _, period, start, *_ in partitions(conn) if len(period) == 7]
+    for month in months:
+        year = month // 100
+        if year * 10000 + 1231 < cutoff:
+            periods.add(str(year))
+        elif month * 100 + 31 < cutoff:
+            periods.add(f"{year}-{month % 100:02d}")
+    return sorted(periods)
+
+
+def archive_period(conn, period, archive_dir=ARCHIVE_DIR):
+    """Move the period's rows (and any archives inside it) into one read-only archive file; returns rows archived."""
+    start, end = _bounds(period)
+    sources = partitions(conn, start, end)
+    if any(source_start < start or source_end > end for _, _, source_start, source_end, _, _ in sources):
+        raise ValueError(f"{period} overlaps an archive of a longer period")
+    moved = conn.execute("SELECT COUNT(*) FROM incentives WHERE date_key BETWEEN ? AND ?", (start, end)).fetchone()[0]
+    if not moved and (not sources or [source[1] for source in sources] == [period]):
+        return 0
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"incentives_{period}.db")
+    temp_path = path + ".tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+    columns = ", ".join(ARCHIVED_COLUMNS)
+    # Views over the old files go with them (incentives() recreates what it needs); the sources are attached one at a time
+    _release(conn)
+    conn.execute("ATTACH DATABASE ? AS archive_new", (temp_path,))
+    try:
+        conn.execute(ARCHIVE_DDL.format(schema="archive_new"))
+        for partition_id, _, _, _, source_path, _ in sources:
+            schema = _attach(conn, partition_id, source_path)
+            conn.execute(f"INSERT INTO archive_new.incentives ({columns}) SELECT {columns} FROM {schema}.incentives")
+            conn.commit()
+            conn.execute(f"DETACH DATABASE {schema}")
+        conn.execute(f"""INSERT INTO archive_new.incentives ({columns})
+                         SELECT {columns} FROM main.incentives WHERE date_key BETWEEN ? AND ? ORDER BY date_key""", (start, end))
+        conn.execute("CREATE INDEX archive_new.idx_incentives_staff_date_key ON incentives (staff_id, date_key)")
+        conn.execute("CREATE INDEX archive_new.idx_incentives_date_key ON incentives (date_key)")
+        total = conn.execute("SELECT COUNT(*) FROM archive_new.incentives").fetchone()[0]
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        _release(conn)
+
+    os.replace(temp_path, path)
+    os.chmod(path, 0o444)
+
+    conn.execute("DELETE FROM incentives WHERE date_key BETWEEN ? AND ?", (start, end))
+    conn.execute("DELETE FROM archive_partitions WHERE start_key >= ? AND end_key <= ?", (start, end))
+    conn.execute("INSERT INTO archive_partitions (period, start_key, end_key, path, rows, archived_at) VALUES (?, ?, ?, ?, ?, datetime('now'))",
+                 (period, start, end, path, total))
+    db.bump_ledger_version(conn)
+    conn.commit()
+    for *_, source_path, _ in sources:
+        if os.path.abspath(source_path) != os.path.abspath(path) and os.path.exists(source_path):
+            os.remove(source_path)
+    logging.info(f"Archived {moved} rows of {period} to {path} ({total} rows in the archive)")
+    return moved
+
+
+def archive_closed_periods(conn, before=None, archive_dir=ARCHIVE_DIR):
+    """Archive every closed period; returns ``{period: rows moved}``."""
+    return {period: archive_period(conn, period, archive_dir) for period in closed_periods(conn, before)}
@@ -0,0 +1,134 @@
+"""Earned, adjusted, paid and outstanding amounts per staff member.
+
+``staff_daily_totals`` holds one row per staff member and day with what was
+earned (ledger incentives), adjusted and paid; ``staff_balances`` holds the
+running totals. Both are updated incrementally in the same transaction as
+the ingestion, adjustment or payment that changes them, so "who is owed
+what" is a primary-key read and a payout sheet for any cut-off date sums a
+few rows per staff member instead of the whole ledger. Before a payout,
+:func:`reconcile` compares them with a full re-aggregation and rebuilds them
+if they have drifted.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime
+
+from .archive import incentives
+from .config import excluded_names
+from .dates import date_key
+
+_UPSERT = """INSERT INTO staff_daily_totals (staff_id, date_key, {column}) VALUES (?, ?, ?)
+             ON CONFLICT (staff_id, date_key) DO UPDATE SET {column} = {column} + excluded.{column}"""
+_UPSERT_BALANCE = """INSERT INTO staff_balances (staff_id, {column}, updated_at) VALUES (?, ?, ?)
+                     ON CONFLICT (staff_id) DO UPDATE SET {column} = {column} + excluded.{column},
+                                                          updated_at = excluded.updated_at"""
+BALANCE_COLUMNS = ["Name", "Earned", "Adjusted", "Paid", "Outstanding"]
+
+
+def _add(cursor, column, amounts):
+    """Fold ``(staff_id, date_key, amount)`` triples into the daily totals and balances."""
+    daily = defaultdict(float)
+    for staff_id, key, amount in amounts:
+        if staff_id is not None and amount:
+            daily[(staff_id, key)] += amount
+    if not daily:
+        return
+    cursor.executemany(_UPSERT.format(column=column), [(staff_id, key, amount) for (staff_id, key), amount in daily.items()])
+    per_staff = defaultdict(float)
+    for (staff_id, _), amount in daily.items():
+        per_staff[staff_id] += amount
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    cursor.executemany(_UPSERT_BALANCE.format(column=column), [(staff_id, amount, now) for staff_id, amount in per_staff.items()])
+
+
+def add_earned(cursor, amounts):
+    _add(cursor, "earned", amounts)
+
+
+def add_adjusted(cursor, amounts):
+    _add(cursor, "adjusted", amounts)
+
+
+def record_payment(conn, name, amount, cleared_date):
+    """Store a payment to ``name`` cleared on ``cleared_date`` and update the balances."""
+    staff_id = conn.execute("SELECT id FROM staff WHERE name = ?", (name,)).fetchone()
+    staff_id = staff_id[0] if staff_id else None
+    key = date_key(cleared_date)
+    conn.execute("INSERT INTO payments (date, name, amount, cleared_date, staff_id, date_key) VALUES (?, ?, ?, ?, ?, ?)",
+                 (datetime.now().strftime("%d/%m/%Y"), name, amount, cleared_date.strftime("%d/%m/%Y"), staff_id, key))
+    _add(conn.cursor(), "paid", [(staff_id, key, amount)])
+    conn.commit()
+
+
+_DAILY_TOTALS = """SELECT staff_id, date_key, SUM(earned) AS earned, SUM(adjusted) AS adjusted, SUM(paid) AS paid FROM (
+                        SELECT staff_id, date_key, incentive AS earned, 0 AS adjusted, 0 AS paid FROM {incentives}
+                        UNION ALL SELECT staff_id, date_key, 0, value, 0 FROM adjustments
+                        UNION ALL SELECT staff_id, date_key, 0, 0, amount FROM payments)
+                    WHERE staff_id IS NOT NULL GROUP BY staff_id, date_key"""
+# Differences below this are float noise from summing in another order
+TOLERANCE = 0.005
+
+
+def rebuild(conn):
+    """Recompute the daily totals and balances from the ledger (archives included), adjustments and payments."""
+    source = incentives(conn)
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM staff_daily_totals")
+    cursor.execute("DELETE FROM staff_balances")
+    cursor.execute(f"INSERT INTO staff_daily_totals (staff_id, date_key, earned, adjusted, paid) {_DAILY_TOTALS.format(incentives=source)}")
+    cursor.execute("""INSERT INTO staff_balances (staff_id, earned, adjusted, paid, updated_at)
+                      SELECT staff_id, SUM(earned), SUM(adjusted), SUM(paid), ? FROM staff_daily_totals GROUP BY staff_id""",
+                   (datetime.now().strftime("%Y-%m-%d %H:%M:%S"),))
+    conn.commit()
+    logging.info("Rebuilt staff balances from the ledger")
+
+
+def drift(conn):
+    """Names of staff whose stored balance or daily totals differ from a full re-aggregation of the ledger."""
+    totals = _DAILY_TOTALS.format(incentives=incentives(conn))
+    # Expected minus stored, per day and per staff member; anything left over is drift
+    rows = conn.execute(f"""WITH expected AS ({totals})
+                            SELECT name FROM staff WHERE id IN (
+                                SELECT staff_id FROM (
+                                    SELECT staff_id, date_key, earned, adjusted, paid FROM expected
+                                    UNION ALL SELECT staff_id, date_key, -earned, -adjusted, -paid FROM staff_daily_totals)
+                                GROUP BY staff_id, date_key
+                                HAVING MAX(ABS(SUM(earned)), ABS(SUM(adjusted)), ABS(SUM(paid))) > :tolerance
+                                UNION
+                                SELECT staff_id FROM (
+                                    SELECT staff_id, earned, adjusted, paid FROM expected
+                                    UNION ALL SELECT staff_id, -earned, -adjusted, -paid FROM staff_balances)
+                                GROUP BY staff_id
+                                HAVING MAX(ABS(SUM(earned)), ABS(SUM(adjusted)), ABS(SUM(paid))) > :tolerance)
+                            ORDER BY name""", {"tolerance": TOLERANCE}).fetchall()
+    return [name for (name,) in rows]
+
+
+def reconcile(conn):
+    """Rebuild the balances if they have drifted from the ledger; returns the names that had drifted."""
+    drifted = drift(conn)
+    if drifted:
+        logging.warning(f"Staff balances differed from the ledger for {', '.join(drifted)}; rebuilding")
+        rebuild(conn)
+    return drifted
+
+
+def _balance_rows(rows):
+    return [(name, earned, adjusted, paid, earned + adjusted - paid) for name, earned, adjusted, paid in rows]
+
+
+def outstanding(conn):
+    """Return ``(name, earned, adjusted, paid, outstanding)`` for every staff member, largest balance first."""
+    rows = conn.execute(f"""SELECT staff.name, staff_balances.earned, staff_balances.adjusted, staff_balances.paid
+                            FROM staff_balances JOIN staff ON staff.id = staff_balances.staff_id
+                            WHERE staff.name NOT IN ({", ".join("?" * len(excluded_names))})""", excluded_names).fetchall()
+    return sorted(_balance_rows(rows), key=lambda row: row[4], reverse=True)
+
+
+def payout_sheet(conn, cutoff):
+    """Balances as of the end of ``cutoff`` (a date or ``DATE_FORMAT`` string), one row per staff member."""
+    rows = conn.execute(f"""SELECT staff.name, SUM(totals.earned), SUM(totals.adjusted), SUM(totals.paid)
+                            FROM staff_daily_totals AS totals JOIN staff ON staff.id = totals.staff_id
+                            WHERE totals.date_key <= ? AND staff.name NOT IN ({", ".join("?" * len(excluded_names))})
+                            GROUP BY staff.id ORDER BY staff.id""", (date_key(cutoff), *excluded_names)).fetchall()
+    return _balance_rows(rows)
@@ -0,0 +1,130 @@
+"""Multi-branch mode: one database shard per branch and federated reporting.
+
+Branches are configured in ``config.branches`` (file-name prefix -> name).
+Each branch keeps the full schema in its own SQLite file in ``branches/``
+next to the main store's database (``BRANCHES_DIR`` for ``DB_PATH``); the
+main store is the branch without a prefix, so a single-store setup is simply the main branch alone. Exports are
+routed by their prefix (``NTH_LS_Sales.xlsx`` goes to branch NTH), so each
+branch's ledger, caches and queries stay as small as one store's.
+
+Cross-branch figures are computed by running the per-branch query on every
+shard in parallel (sqlite3 releases the GIL while a query runs) and merging
+the partial sums by staff name.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from . import queries
+from .config import BRANCHES_DIR, DB_PATH, MAIN_BRANCH, PDFS_DIR, branches
+from .db import connect
+from .ingest import IngestError, determine_branch, determine_company
+
+BRANCH_COLUMNS = ["Branch", "Total Incentive", "Total Gross"]
+
+_lock = threading.Lock()
+_shards = {}  # (main database, code) -> (connection, lock) shared by federated reads in this process
+
+
+def codes():
+    """Branch codes, the main store (None) first."""
+    return [None, *branches]
+
+
+def name(code):
+    return branches.get(code, MAIN_BRANCH) if code else MAIN_BRANCH
+
+
+def shard_path(code, main_db=DB_PATH):
+    """Database of a branch of the store whose main database is ``main_db``."""
+    if not code:
+        return main_db
+    folder = BRANCHES_DIR if main_db == DB_PATH else os.path.join(os.path.dirname(os.path.abspath(main_db)), "branches")
+    return os.path.join(folder, f"{code.lower()}.db")
+
+
+def pdfs_dir(code):
+    """Per-staff PDFs of a branch go in their own folder, so staff names may repeat across branches."""
+    return os.path.join(PDFS_DIR, code.lower()) if code else PDFS_DIR
+
+
+def connect_branch(code, main_db=DB_PATH, migrate_schema=True):
+    """Open (creating it on first use) a branch's database."""
+    path = shard_path(code, main_db)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    return connect(path, migrate_schema)
+
+
+def route(files, default=None):
+    """Group ERP exports and attendance sheets by branch: ``{code: (erp_files, attendance_file)}``.
+
+    Files without a branch prefix go to ``default`` (the main store unless
+    given). Raises IngestError unless every branch has its ERP exports and
+    exactly one attendance sheet.
+    """
+    routed = {}
+    for file in files:
+        erp_files, attendance_files = routed.setdefault(determine_branch(file) or default, ([], []))
+        (erp_files if determine_company(file) != "Unknown" else attendance_files).append(file)
+    for code, (erp_files, attendance_files) in routed.items():
+        if not erp_files or len(attendance_files) != 1:
+            where = f" for {name(code)}" if branches else ""
+            raise IngestError(f"Pass the ERP exports (LS_Sales, NFS_Sales, ...) plus exactly one attendance file{where}")
+    return {code: (erp_files, attendance_files[0]) for code, (erp_files, attendance_files) in routed.items()}
+
+
+def _shard(code, main_db):
+    key = (os.path.abspath(main_db), code)
+    with _lock:
+        if key not in _shards:
+            _shards[key] = (connect_branch(code, main_db), threading.Lock())
+        return _shards[key]
+
+
+def _on_shard(code, main_db, fn, args):
+    conn, lock = _shard(code, main_db)
+    with lock:
+        return fn(conn, *args)
+
+
+def federate(fn, *args, main_db=DB_PATH):
+    """Run ``fn(conn, *args)`` on every branch shard in parallel; returns ``{code: result}`` in branch order."""
+    shards = codes()
+    with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+        futures = {code: pool.submit(_on_shard, code, main_db, fn, args) for code in shards}
+        return {code: future.result() for code, future in futures.items()}
+
+
+def overview(start_date, end_date, today, main_db=DB_PATH):
+    """Cross-branch Overview: ``(total_incentive, total_gross, branch_rows, top_today, top_range)``.
+
+    ``branch_rows`` are ``(branch, incentive, gross)``; the top performers are
+    ``(name, incentive)`` over all branches or None.
+    """
+    def partials(conn):
+        return (queries.overview_totals(conn, start_date, end_date), queries.incentive_by_staff(conn, today, today),
+                queries.incentive_by_staff(conn, start_date, end_date))
+
+    results = federate(partials, main_db=main_db)
+    branch_rows = [(name(code), *totals) for code, (totals, _, _) in results.items()]
+    top = []
+    for i in (1, 2):
+        merged = {}
+        for result in results.values():
+            for staff_name, incentive in result[i]:
+                merged[staff_name] = merged.get(staff_name, 0.0) + (incentive or 0.0)
+        top.append(max(merged.items(), key=lambda item: item[1], default=None))
+    return sum(row[1] for row in branch_rows), sum(row[2] for row in branch_rows), branch_rows, top[0], top[1]
+
+
+def performance(start_date, end_date, today, main_db=DB_PATH):
+    """Cross-branch staff totals: ``{name: (branches, today_incentive, today_gross, range_incentive, range_gross)}``."""
+    results = federate(lambda conn: (queries.totals_by_staff(conn, today), queries.totals_by_staff(conn, start_date, end_date)),
+                       main_db=main_db)
+    merged = {}
+    for code, (today_totals, range_totals) in results.items():
+        for staff_name in today_totals.keys() | range_totals.keys():
+            where, *sums = merged.get(staff_name, ([], 0.0, 0.0, 0.0, 0.0))
+            values = (*today_totals.get(staff_name, (0.0, 0.0)), *range_totals.get(staff_name, (0.0, 0.0)))
+            merged[staff_name] = (where + [name(code)], *(total + value for total, value in zip(sums, values)))
+    return {staff_name: (", ".join(where), *sums) for staff_name, (where, *sums) in sorted(merged.items())}
@@ -0,0 +1,286 @@
+"""Command line entry point: ``python -m knorka <command>``.
+
+    python -m knorka ingest LS_Sales.xlsx NFS_Sales.xlsx Attendance.xlsx
+    python -m knorka reports --date 12-03-2025
+    python -m knorka reports --range 01-03-2025 15-03-2025 --detailed overview.pdf
+    python -m knorka payouts --cutoff 31-03-2025 payouts.csv
+    python -m knorka simulate candidate.json --range 01-01-2025 31-03-2025
+    python -m knorka archive --before 01-03-2025
+    python -m knorka watch inbox/
+    python -m knorka export march.xlsx --range 01-03-2025 31-03-2025 --split-by company
+    python -m knorka branches --range 01-03-2025 31-03-2025
+    python -m knorka --branch NTH reports --date 12-03-2025
+"""
+import argparse
+import csv
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+
+from . import archive, balances, branches, exports, queries, rules
+from .config import ARCHIVE_DIR, DATE_FORMAT, DB_PATH, PDFS_DIR, WATCH_DIR, branches as branch_names, configure_logging
+from .db import connect
+from .ingest import IngestError, latest_report_date, process_files
+from .reports import generate_detailed_pdf, generate_pdfs_to_folder
+from .watch import FolderWatcher
+
+
+def _date(value):
+    try:
+        return datetime.strptime(value, DATE_FORMAT)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a dd-mm-yyyy date, got {value!r}")
+
+
+def _print_rejects(result):
+    for reason, rows, net_amount in result.rejected:
+        print(f"rejected: {rows} rows, net amount {net_amount:.2f} ({reason})", file=sys.stderr)
+
+
+def cmd_ingest(args):
+    try:
+        routed = branches.route(args.files, default=args.branch)
+    except IngestError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    status = 0
+    for code, (erp_files, attendance_file) in routed.items():
+        # --pdfs-dir applies to the selected store; other branches use their own
+        conn = branches.connect_branch(code, args.main_db)
+        pdfs_dir = args.pdfs_dir if code == args.branch else branches.pdfs_dir(code)
+        prefix = f"{branches.name(code)}: " if branch_names else ""
+        try:
+            result = process_files(conn, erp_files, attendance_file, workers=args.workers)
+        except IngestError as e:
+            print(f"error: {prefix}{e}", file=sys.stderr)
+            status = 1
+            continue
+        for warning in result.warnings:
+            print(f"warning: {prefix}{warning}", file=sys.stderr)
+        print(f"{prefix}Processing completed: {result.rows_processed} rows processed")
+        _print_rejects(result)
+        if not args.no_pdfs:
+            written, errors = generate_pdfs_to_folder(conn, report_date=result.report_date, pdfs_dir=pdfs_dir)
+            print(f"{prefix}Generated {len(written)} PDFs for {result.report_date} in {pdfs_dir}")
+            for error in errors:
+                print(f"error: {error}", file=sys.stderr)
+    return status
+
+
+def cmd_reports(args):
+    conn = connect(args.db)
+    if args.range:
+        kwargs = {"start_date": args.range[0], "end_date": args.range[1]}
+    elif args.date:
+        kwargs = {"selected_date": args.date}
+    else:
+        kwargs = {}
+    errors = []
+    if not args.skip_staff:
+        written, errors = generate_pdfs_to_folder(conn, pdfs_dir=args.pdfs_dir, **kwargs)
+        print(f"Generated {len(written)} PDFs in {args.pdfs_dir}")
+        for error in errors:
+            print(f"error: {error}", file=sys.stderr)
+    if args.detailed:
+        with open(args.detailed, "wb") as f:
+            f.write(generate_detailed_pdf(conn, **kwargs))
+        print(f"Wrote detailed report to {args.detailed}")
+    return 1 if errors else 0
+
+
+def cmd_payouts(args):
+    conn = connect(args.db)
+    if args.rebuild:
+        balances.rebuild(conn)
+    elif args.cutoff:
+        balances.reconcile(conn)
+    rows = balances.payout_sheet(conn, args.cutoff) if args.cutoff else balances.outstanding(conn)
+    out = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        writer = csv.writer(out)
+        writer.writerow(balances.BALANCE_COLUMNS)
+        writer.writerows([name, *(f"{value:.2f}" for value in values)] for name, *values in rows)
+    finally:
+        if args.output:
+            out.close()
+            print(f"Wrote {len(rows)} balances to {args.output}")
+    return 0
+
+
+def cmd_simulate(args):
+    conn = connect(args.db)
+    try:
+        with open(args.rules) as f:
+            candidate = json.load(f)
+        if args.effective_from:
+            rules.add_rule_set(conn, args.name or args.rules, args.effective_from, candidate)
+            print(f"Saved rule set effective from {args.effective_from.strftime(DATE_FORMAT)}")
+            return 0
+        start, end = args.range
+        rows = rules.simulate(conn, candidate, start, end)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    writer = csv.writer(sys.stdout)
+    writer.writerow(rules.SIMULATION_COLUMNS)
+    writer.writerows([name, *(f"{value:.2f}" for value in values)] for name, *values in rows)
+    print(f"Total change: {sum(row[3] for row in rows):.2f}", file=sys.stderr)
+    return 0
+
+
+def _probe(conn, repeat=5):
+    """Median seconds of the hot dashboard reads for the latest ledger day and its month."""
+    day = datetime.strptime(latest_report_date(conn), DATE_FORMAT)
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        queries.top_performer(conn, day)
+        queries.overview_totals(conn, day.replace(day=1), day)
+        queries.detailed_rows(conn, day, day)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def cmd_archive(args):
+    conn = connect(args.db)
+    periods = archive.closed_periods(conn, args.before)
+    if not periods:
+        print("Nothing to archive")
+        return 0
+    if args.dry_run:
+        print(f"Would archive: {', '.join(periods)}")
+        return 0
+    size_before, latency_before = os.path.getsize(args.db), _probe(conn)
+    moved = {period: archive.archive_period(conn, period, args.archive_dir) for period in periods}
+    conn.execute("VACUUM")
+    size_after, latency_after = os.path.getsize(args.db), _probe(conn)
+    for period, rows in moved.items():
+        print(f"{period}: {rows} rows archived")
+    print(f"Active database: {size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB")
+    print(f"Hot queries: {latency_before * 1000:.1f} ms -> {latency_after * 1000:.1f} ms")
+    return 0
+
+
+def cmd_export(args):
+    conn = connect(args.db)
+    try:
+        rows = exports.export(conn, args.output, *args.range, staff=args.staff, split_by=args.split_by)
+    except (RuntimeError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    print(f"Wrote {rows} rows to {args.output}")
+    return 0
+
+
+def cmd_branches(args):
+    start, end = args.range
+    total_incentive, total_gross, rows, top_today, top_range = branches.overview(start, end, datetime.now(), args.main_db)
+    writer = csv.writer(sys.stdout)
+    writer.writerow(branches.BRANCH_COLUMNS)
+    writer.writerows([branch, f"{incentive:.2f}", f"{gross:.2f}"] for branch, incentive, gross in rows)
+    writer.writerow(["All branches", f"{total_incentive:.2f}", f"{total_gross:.2f}"])
+    if top_range:
+        print(f"Top performer: {top_range[0]} ({top_range[1]:.2f})", file=sys.stderr)
+    return 0
+
+
+def cmd_watch(args):
+    os.makedirs(args.folder, exist_ok=True)
+    watcher = FolderWatcher(connect(args.db), args.folder, settle=args.settle, batch_timeout=args.batch_timeout,
+                            pdfs_dir=args.pdfs_dir, render_pdfs=not args.no_pdfs, main_db=args.main_db)
+
+    def report(result):
+        for warning in result.warnings:
+            print(f"warning: {warning}", file=sys.stderr)
+        print(f"{datetime.now():%H:%M:%S} Ingested {result.rows_processed} rows for {result.report_date}", flush=True)
+        _print_rejects(result)
+
+    print(f"Watching {args.folder} (Ctrl+C to stop)", flush=True)
+    try:
+        watcher.run(interval=args.interval, once=args.once, on_result=report)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="knorka", description="KNORKA incentive engine")
+    parser.add_argument("--db", default=DB_PATH,
+                        help="incentive database; branch databases are in branches/ next to it (default: %(default)s)")
+    parser.add_argument("--pdfs-dir", default=PDFS_DIR, help="where per-staff PDFs are written (default: %(default)s)")
+    parser.add_argument("--branch", type=str.upper, choices=sorted(branch_names), metavar="CODE",
+                        help="work on this branch's database (multi-branch mode, see KNORKA_BRANCHES)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="process LS_Sales, NFS_Sales and attendance exports")
+    ingest.add_argument("files", nargs="+", help="ERP exports and the attendance sheet")
+    ingest.add_argument("--no-pdfs", action="store_true", help="skip rendering per-staff PDFs")
+    ingest.add_argument("--workers", type=int, help="worker processes for the ERP exports (default: by upload size)")
+    ingest.set_defaults(func=cmd_ingest)
+
+    reports = commands.add_parser("reports", help="render per-staff PDFs for a date or a range")
+    period = reports.add_mutually_exclusive_group()
+    period.add_argument("--date", type=_date, help="single report date (dd-mm-yyyy); defaults to the latest ledger date")
+    period.add_argument("--range", type=_date, nargs=2, metavar=("START", "END"), help="report range (dd-mm-yyyy)")
+    reports.add_argument("--detailed", metavar="PDF", help="also write the combined detailed report to this file")
+    reports.add_argument("--skip-staff", action="store_true", help="only write the detailed report")
+    reports.set_defaults(func=cmd_reports)
+
+    payouts = commands.add_parser("payouts", help="write earned, adjusted, paid and outstanding amounts per staff member as CSV")
+    payouts.add_argument("output", nargs="?", help="CSV file to write (default: stdout)")
+    payouts.add_argument("--cutoff", type=_date, help="balances as of this date (dd-mm-yyyy); default: current balances")
+    payouts.add_argument("--rebuild", action="store_true", help="recompute the balances from the ledger and payments first")
+    payouts.set_defaults(func=cmd_payouts)
+
+    simulate = commands.add_parser("simulate", help="replay stored sales under a candidate rule set (JSON) and print per-staff deltas")
+    simulate.add_argument("rules", help="rule set JSON; keys left out keep their default")
+    action = simulate.add_mutually_exclusive_group(required=True)
+    action.add_argument("--range", type=_date, nargs=2, metavar=("START", "END"), help="period to replay (dd-mm-yyyy)")
+    action.add_argument("--effective-from", type=_date, metavar="DATE", help="save the rule set for bills from this date instead")
+    simulate.add_argument("--name", help="name of the saved rule set (default: the file name)")
+    simulate.set_defaults(func=cmd_simulate)
+
+    archive_cmd = commands.add_parser("archive", help="move closed months (whole years once closed) into read-only archive files")
+    archive_cmd.add_argument("--before", type=_date, help="archive periods ending before this date (default: the first of this month)")
+    archive_cmd.add_argument("--archive-dir", default=ARCHIVE_DIR, help="where archive files are written (default: %(default)s)")
+    archive_cmd.add_argument("--dry-run", action="store_true", help="only list the periods that would be archived")
+    archive_cmd.set_defaults(func=cmd_archive)
+
+    export = commands.add_parser("export", help="write the ledger lines of a range as .xlsx, .csv or .parquet")
+    export.add_argument("output", help="file to write; the format follows its extension")
+    export.add_argument("--range", type=_date, nargs=2, metavar=("START", "END"), required=True, help="export range (dd-mm-yyyy)")
+    export.add_argument("--staff", default="All", help="only this staff member's lines")
+    export.add_argument("--split-by", choices=sorted(exports.SPLIT_BY), help="one Excel sheet per company or staff member")
+    export.set_defaults(func=cmd_export)
+
+    branches_cmd = commands.add_parser("branches", help="incentive and gross totals of every branch and all branches combined")
+    branches_cmd.add_argument("--range", type=_date, nargs=2, metavar=("START", "END"), required=True, help="report range (dd-mm-yyyy)")
+    branches_cmd.set_defaults(func=cmd_branches)
+
+    watch = commands.add_parser("watch", help="ingest ERP exports and attendance sheets as they are dropped into a folder")
+    watch.add_argument("folder", nargs="?", default=WATCH_DIR, help="folder to watch (default: %(default)s)")
+    watch.add_argument("--interval", type=float, default=5.0, help="seconds between polls (default: %(default)s)")
+    watch.add_argument("--settle", type=float, default=10.0,
+                       help="seconds a file must stay unchanged before it is read (default: %(default)s)")
+    watch.add_argument("--batch-timeout", type=float, default=120.0,
+                       help="ingest without the other companies' exports after this many seconds (default: %(default)s)")
+    watch.add_argument("--no-pdfs", action="store_true", help="skip rendering per-staff PDFs")
+    watch.add_argument("--once", action="store_true", help="poll twice, --interval apart, process what is ready and exit (for cron)")
+    watch.set_defaults(func=cmd_watch)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # --db names the main store; --branch selects a shard next to it
+    args.main_db = args.db
+    if args.branch:
+        args.db = branches.shard_path(args.branch, args.main_db)
+        os.makedirs(os.path.dirname(args.db), exist_ok=True)
+        if args.pdfs_dir == PDFS_DIR:
+            args.pdfs_dir = branches.pdfs_dir(args.branch)
+    configure_logging()
+    sys.exit(args.func(args))
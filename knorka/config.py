@@ -0,0 +1,60 @@
+import logging
+import os
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Database, PDFs and log live next to the app unless KNORKA_DATA_DIR points elsewhere
+DATA_DIR = os.environ.get("KNORKA_DATA_DIR", BASE_DIR)
+DB_PATH = os.path.join(DATA_DIR, "incentive_data.db")
+PDFS_DIR = os.path.join(DATA_DIR, "pdfs")
+ARCHIVE_DIR = os.path.join(DATA_DIR, "archive")
+WATCH_DIR = os.path.join(DATA_DIR, "inbox")
+BRANCHES_DIR = os.path.join(DATA_DIR, "branches")
+LOG_PATH = os.path.join(DATA_DIR, "processing.log")
+
+DATE_FORMAT = "%d-%m-%Y"
+
+# ERP export file-name prefixes (LS_Sales.xlsx, NFS_Sales.xlsx) and their companies
+company_prefixes = {"LS": "Life Style", "NFS": "New Fashion Style"}
+
+# Multi-branch mode: branch file-name prefixes and names, e.g. KNORKA_BRANCHES="NTH=North,STH=South".
+# NTH_LS_Sales.xlsx and NTH_Attendance.xlsx go to the branch's own database in BRANCHES_DIR;
+# files without a branch prefix go to the main store (DB_PATH).
+MAIN_BRANCH = "Main"
+branches = {code.strip().upper(): name.strip() for code, _, name in
+            (entry.partition("=") for entry in os.environ.get("KNORKA_BRANCHES", "").split(",")) if code.strip() and name.strip()}
+
+# Staff seeded into the staff table on first run; edit staff through the Control Panel afterwards
+passwords = {
+    "Gaurav": "0007855076", "Prakash": "0015102458", "Kishore": "0015102420",
+    "Sonu": "0007857305", "Shivam": "0015102456", "Hemant": "0015102447",
+    "Sahil": "0007857872", "Arjun": "0015032010", "Vivek": "0007856700",
+    "Shum": "0007857811", "Vinod": "0015032022", "Prince": "123456789",
+    "Rakesh": "0007857282"
+}
+
+# Staff List and Roles
+staff_list = {
+    "Gaurav": "Salesman", "Prakash": "Salesman", "Kishore": "Salesman",
+    "Hemant": "Salesman", "Vivek": "Salesman", "Shum": "Salesman",
+    "Vinod": "Salesman", "Rakesh": "Salesman", "Maanik": "General",
+    "Sahil": "Helper", "Arjun": "Helper", "Shivam": "Helper",
+    "Sonu": "Stockboy", "Prince": "Helper"
+}
+excluded_names = ["Maanik", "NIL"]
+
+# Incentive rules seeded into the rule_sets table on first run; later versions are added with an effective date
+default_rules = {
+    "total_rate": 0.01,  # of the net amount, per sale line
+    "pool_rate": 0.0005,  # of the net amount, taken for the helper pool
+    "pair_rates": [0.00475, 0.00475],  # first and second agent on a shared sale
+    "junior_agents": ["sonu", "shivam"],
+    "junior_pair_rates": [0.00675, 0.00275],  # when the second agent is a junior
+    "special_items": ["PETI", "PETICOT", "UNDERWEAR", "INNERWEAR", "JOCKEY"],  # go entirely to the helper pool
+    "special_item_score": 80,
+}
+roles = ["Salesman", "Helper", "Stockboy", "General"]
+
+
+def configure_logging(path=LOG_PATH):
+    logging.basicConfig(filename=path, level=logging.INFO,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
@@ -0,0 +1,102 @@
+"""Bill date normalization for whole columns.
+
+A sheet holds thousands of rows but only a handful of distinct bill dates,
+so each distinct raw value is parsed once: the column's format is inferred
+from a sample, the distinct strings are parsed in one vectorized call and
+the few leftovers fall back to the other known formats. Every row gets the
+display string (``DATE_FORMAT``) and an integer ``date_key`` (YYYYMMDD) that
+sorts and compares chronologically. Values no format accepts are reported
+back instead of being replaced by today's date.
+"""
+from dataclasses import dataclass, field
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from .config import DATE_FORMAT
+
+# In order of preference, as the ERP exports have used them
+DATE_FORMATS = ["%d/%m/%Y", "%d-%m-%Y", "%Y-%m-%d", "%d.%m.%Y", "%m/%d/%Y", "%Y-%m-%d %H:%M:%S"]
+SAMPLE_SIZE = 20
+
+
+@dataclass
+class NormalizedDates:
+    """Per-row display strings and date keys; unparseable rows have ``None`` and 0."""
+    display: pd.Series
+    keys: pd.Series
+    format: str = None
+    unparsed: list = field(default_factory=list)
+
+    @property
+    def valid(self):
+        return self.keys > 0
+
+
+def date_key(value):
+    """YYYYMMDD integer for a date, datetime or ``DATE_FORMAT`` string."""
+    if isinstance(value, str):
+        value = datetime.strptime(value, DATE_FORMAT)
+    return value.year * 10000 + value.month * 100 + value.day
+
+
+def from_key(key):
+    return date(key // 10000, key // 100 % 100, key % 100)
+
+
+def infer_format(values, sample_size=SAMPLE_SIZE):
+    """The one of ``DATE_FORMATS`` parsing most of a sample of ``values`` (earliest on ties), or None."""
+    sample = pd.Series(list(values)[:sample_size], dtype=object)
+    best, best_count = None, 0
+    for fmt in DATE_FORMATS:
+        count = pd.to_datetime(sample, format=fmt, errors="coerce").notna().sum()
+        if count > best_count:
+            best, best_count = fmt, count
+    return best
+
+
+def _parse_strings(values):
+    """Map each distinct string to a Timestamp, trying the inferred format first."""
+    fmt = infer_format(values)
+    parsed = {}
+    remaining = pd.Series(values, dtype=object)
+    for candidate in ([fmt] if fmt else []) + [f for f in DATE_FORMATS if f != fmt]:
+        if remaining.empty:
+            break
+        stamps = pd.to_datetime(remaining, format=candidate, errors="coerce")
+        hit = stamps.notna()
+        parsed.update(zip(remaining[hit], stamps[hit]))
+        remaining = remaining[~hit]
+    return parsed, fmt, list(remaining)
+
+
+def normalize_dates(column):
+    """Normalize a raw ``BILL DATE`` column; returns a :class:`NormalizedDates` aligned with it."""
+    column = pd.Series(column)
+    if pd.api.types.is_datetime64_any_dtype(column):
+        # Real Excel date cells: read_excel already parsed the whole column
+        shown = column.dt.strftime(DATE_FORMAT)
+        keys = column.dt.year * 10000 + column.dt.month * 100 + column.dt.day
+        return NormalizedDates(display=shown.astype(object).where(shown.notna(), None),
+                               keys=keys.fillna(0).astype("int64"))
+    stamps = {}
+    strings = []
+    for raw in pd.unique(column.dropna()):
+        if isinstance(raw, (datetime, date, np.datetime64)):
+            stamps[raw] = pd.Timestamp(raw)
+        else:
+            strings.append(raw)
+    parsed, fmt, unparsed = _parse_strings([str(raw) for raw in strings])
+    stamps.update((raw, parsed[str(raw)]) for raw in strings if str(raw) in parsed)
+    display = {raw: stamp.strftime(DATE_FORMAT) for raw, stamp in stamps.items()}
+    keys = {raw: stamp.year * 10000 + stamp.month * 100 + stamp.day for raw, stamp in stamps.items()}
+    shown = column.map(display)
+    return NormalizedDates(display=shown.astype(object).where(shown.notna(), None),
+                           keys=column.map(keys).fillna(0).astype("int64"), format=fmt, unparsed=unparsed)
+
+
+def normalize_date(value):
+    """Normalize a single raw date to ``DATE_FORMAT``; None when no known format accepts it."""
+    result = normalize_dates([value])
+    return result.display.iloc[0]
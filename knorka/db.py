@@ -0,0 +1,211 @@
+import json
+import logging
+import sqlite3
+import threading
+import uuid
+
+from . import balances, config
+from .config import DB_PATH
+from .dates import normalize_dates
+
+
+def connect(db_path=DB_PATH, migrate_schema=True):
+    """Open the incentive database, bringing its schema up to date unless ``migrate_schema`` is False."""
+    # uri=True so archives can be attached read-only (file:...?mode=ro)
+    conn = sqlite3.connect(db_path, check_same_thread=False, uri=True)
+    if migrate_schema:
+        migrate(conn)
+    return conn
+
+
+def migrate(conn):
+    cursor = conn.cursor()
+    tables = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+    # Define the latest table structure
+    cursor.execute('''CREATE TABLE IF NOT EXISTS incentives
+                      (date TEXT, name TEXT, role TEXT, incentive REAL, gross REAL, net_amount REAL, status TEXT, bill_no TEXT, item_name TEXT, company TEXT, qty REAL, rate REAL, second_agent TEXT, parts_count INTEGER, total_pool REAL, item_code TEXT, additional_item_code TEXT)''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS payments
+                      (date TEXT, name TEXT, amount REAL, cleared_date TEXT)''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS run_metrics
+                      (run_id TEXT, kind TEXT, started_at TEXT, status TEXT, category TEXT, metric TEXT, value REAL, calls INTEGER)''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_run_metrics_run ON run_metrics (run_id)")
+    cursor.execute('''CREATE TABLE IF NOT EXISTS run_profiles
+                      (run_id TEXT PRIMARY KEY, stats TEXT)''')
+    cursor.execute("CREATE TABLE IF NOT EXISTS ledger_meta (version INTEGER NOT NULL)")
+    if cursor.execute("SELECT COUNT(*) FROM ledger_meta").fetchone()[0] == 0:
+        cursor.execute("INSERT INTO ledger_meta VALUES (0)")
+    if "staff_version" not in [col[1] for col in cursor.execute("PRAGMA table_info(ledger_meta)")]:
+        cursor.execute("ALTER TABLE ledger_meta ADD COLUMN staff_version INTEGER NOT NULL DEFAULT 0")
+    if "database_id" not in [col[1] for col in cursor.execute("PRAGMA table_info(ledger_meta)")]:
+        cursor.execute("ALTER TABLE ledger_meta ADD COLUMN database_id TEXT")
+    # Tells apart in-memory databases (which have no file name) and a file deleted and created again
+    cursor.execute("UPDATE ledger_meta SET database_id = ? WHERE database_id IS NULL", (uuid.uuid4().hex,))
+    cursor.execute('''CREATE TABLE IF NOT EXISTS staff
+                      (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE, password TEXT, active INTEGER NOT NULL DEFAULT 1)''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS staff_aliases
+                      (alias TEXT PRIMARY KEY, staff_id INTEGER NOT NULL REFERENCES staff (id))''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS staff_roles
+                      (staff_id INTEGER NOT NULL REFERENCES staff (id), effective_from INTEGER NOT NULL, role TEXT NOT NULL,
+                       PRIMARY KEY (staff_id, effective_from))''')
+    if cursor.execute("SELECT COUNT(*) FROM staff").fetchone()[0] == 0:
+        _seed_staff(cursor)
+    cursor.execute('''CREATE TABLE IF NOT EXISTS adjustments
+                      (id INTEGER PRIMARY KEY, staff_id INTEGER NOT NULL REFERENCES staff (id), date_key INTEGER NOT NULL,
+                       amount REAL NOT NULL DEFAULT 0, percent REAL NOT NULL DEFAULT 0, value REAL NOT NULL,
+                       reason TEXT, author TEXT, created_at TEXT)''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_adjustments_staff_date_key ON adjustments (staff_id, date_key)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_adjustments_date_key ON adjustments (date_key)")
+    cursor.execute('''CREATE TABLE IF NOT EXISTS staff_daily_totals
+                      (staff_id INTEGER NOT NULL, date_key INTEGER NOT NULL, earned REAL NOT NULL DEFAULT 0,
+                       adjusted REAL NOT NULL DEFAULT 0, paid REAL NOT NULL DEFAULT 0, PRIMARY KEY (staff_id, date_key))
+                      WITHOUT ROWID''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS staff_balances
+                      (staff_id INTEGER PRIMARY KEY, earned REAL NOT NULL DEFAULT 0, adjusted REAL NOT NULL DEFAULT 0,
+                       paid REAL NOT NULL DEFAULT 0, updated_at TEXT)''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS rule_sets
+                      (id INTEGER PRIMARY KEY, name TEXT NOT NULL, effective_from INTEGER NOT NULL UNIQUE, config TEXT NOT NULL,
+                       author TEXT, created_at TEXT)''')
+    if cursor.execute("SELECT COUNT(*) FROM rule_sets").fetchone()[0] == 0:
+        cursor.execute("INSERT INTO rule_sets (name, effective_from, config) VALUES ('Default', 0, ?)", (json.dumps(config.default_rules),))
+    cursor.execute('''CREATE TABLE IF NOT EXISTS sales_lines
+                      (id INTEGER PRIMARY KEY, date_key INTEGER NOT NULL, company TEXT, bill_no TEXT, item_name TEXT, gross REAL,
+                       net_amount REAL, agent_id INTEGER REFERENCES staff (id), other_agent_id INTEGER REFERENCES staff (id))''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_lines_date_key ON sales_lines (date_key)")
+    cursor.execute('''CREATE TABLE IF NOT EXISTS attendance
+                      (staff_id INTEGER NOT NULL REFERENCES staff (id), date_key INTEGER NOT NULL, status TEXT,
+                       PRIMARY KEY (staff_id, date_key)) WITHOUT ROWID''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_attendance_date_key ON attendance (date_key)")
+    cursor.execute('''CREATE TABLE IF NOT EXISTS archive_partitions
+                      (id INTEGER PRIMARY KEY AUTOINCREMENT, period TEXT NOT NULL UNIQUE, start_key INTEGER NOT NULL, end_key INTEGER NOT NULL, path TEXT NOT NULL,
+                       rows INTEGER, archived_at TEXT)''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS rejects
+                      (id INTEGER PRIMARY KEY, run_id TEXT NOT NULL, company TEXT, file_name TEXT, sheet_row INTEGER, reason TEXT NOT NULL,
+                       date_key INTEGER, bill_no TEXT, item_name TEXT, agent TEXT, other_agent TEXT, gross REAL, net_amount REAL)''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_rejects_run_id ON rejects (run_id, reason)")
+
+    # Check and migrate existing table if needed
+    cursor.execute("PRAGMA table_info(incentives)")
+    columns = [col[1] for col in cursor.fetchall()]
+    if "item_code" not in columns:
+        cursor.execute("ALTER TABLE incentives ADD COLUMN item_code TEXT")
+        logging.info("Added item_code column to incentives table")
+    if "additional_item_code" not in columns:
+        cursor.execute("ALTER TABLE incentives ADD COLUMN additional_item_code TEXT")
+        logging.info("Added additional_item_code column to incentives table")
+    if "date_key" not in columns:
+        cursor.execute("ALTER TABLE incentives ADD COLUMN date_key INTEGER")
+        logging.info("Added date_key column to incentives table")
+        _backfill_date_keys(cursor)
+    if "staff_id" not in columns:
+        cursor.execute("ALTER TABLE incentives ADD COLUMN staff_id INTEGER REFERENCES staff (id)")
+        cursor.execute("ALTER TABLE incentives ADD COLUMN second_staff_id INTEGER REFERENCES staff (id)")
+        cursor.execute("UPDATE incentives SET staff_id = (SELECT id FROM staff WHERE staff.name = incentives.name), "
+                       "second_staff_id = (SELECT id FROM staff WHERE staff.name = incentives.second_agent)")
+        logging.info("Added staff_id columns to incentives table")
+    payment_columns = [col[1] for col in cursor.execute("PRAGMA table_info(payments)")]
+    if "staff_id" not in payment_columns:
+        cursor.execute("ALTER TABLE payments ADD COLUMN staff_id INTEGER REFERENCES staff (id)")
+        cursor.execute("ALTER TABLE payments ADD COLUMN date_key INTEGER")
+        _backfill_payments(cursor)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_payments_staff_date_key ON payments (staff_id, date_key)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_incentives_date_key ON incentives (date_key)")
+    cursor.execute("DROP INDEX IF EXISTS idx_incentives_name_date_key")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_incentives_staff_date_key ON incentives (staff_id, date_key)")
+    if "sales_lines" not in tables:
+        _backfill_sales_lines(cursor)
+    conn.commit()
+    if "staff_daily_totals" not in tables:
+        balances.rebuild(conn)
+
+
+def _seed_staff(cursor):
+    # First run: the staff table starts from the lists in config.py
+    for name, role in config.staff_list.items():
+        staff_id = cursor.execute("INSERT INTO staff (name, password) VALUES (?, ?)", (name, config.passwords.get(name))).lastrowid
+        cursor.execute("INSERT INTO staff_aliases VALUES (?, ?)", (name.lower(), staff_id))
+        cursor.execute("INSERT INTO staff_roles VALUES (?, 0, ?)", (staff_id, role))
+    logging.info(f"Seeded staff table with {len(config.staff_list)} staff")
+
+
+def _backfill_sales_lines(cursor):
+    # Best effort from the ledger: one row per solo sale, and for shared sales the first agent's row, told apart by
+    # the default split. Special items went entirely to the helper pool and are not in the ledger.
+    rates = config.default_rules
+    cursor.execute("""INSERT INTO sales_lines (date_key, company, bill_no, item_name, gross, net_amount, agent_id, other_agent_id)
+                      SELECT date_key, company, bill_no, item_name, gross, net_amount, staff_id, second_staff_id FROM incentives
+                      WHERE bill_no != 'Helper Pool' AND date_key IS NOT NULL AND staff_id IS NOT NULL
+                        AND (second_staff_id IS NULL OR ABS(incentive - net_amount * ?) < 1e-9
+                             OR (ABS(incentive - net_amount * ?) < 1e-9 AND staff_id <= second_staff_id))""",
+                   (rates["junior_pair_rates"][0], rates["pair_rates"][0]))
+    logging.info(f"Backfilled {cursor.rowcount} sales lines from the ledger")
+
+
+def _backfill_payments(cursor):
+    # Payments count on their cleared date (stored as dd/mm/yyyy)
+    cursor.execute("UPDATE payments SET staff_id = (SELECT id FROM staff WHERE staff.name = payments.name)")
+    dates = [row[0] for row in cursor.execute("SELECT DISTINCT cleared_date FROM payments")]
+    if dates:
+        cursor.executemany("UPDATE payments SET date_key = ? WHERE cleared_date = ?",
+                           [(int(key), raw) for raw, key in zip(dates, normalize_dates(dates).keys)])
+
+
+def _backfill_date_keys(cursor):
+    # Rows written before date_key existed; one UPDATE per distinct date
+    dates = [row[0] for row in cursor.execute("SELECT DISTINCT date FROM incentives")]
+    if not dates:
+        return
+    normalized = normalize_dates(dates)
+    cursor.executemany("UPDATE incentives SET date_key = ? WHERE date = ?",
+                       [(int(key), raw) for raw, key in zip(dates, normalized.keys)])
+    if normalized.unparsed:
+        logging.warning(f"Could not read {len(normalized.unparsed)} ledger dates, left without date_key: {normalized.unparsed[:5]}")
+    logging.info(f"Backfilled date_key for {len(dates)} ledger dates")
+
+
+def ledger_version(conn):
+    """Counter bumped by every write to ``incentives``; caches key on it."""
+    return conn.execute("SELECT version FROM ledger_meta").fetchone()[0]
+
+
+def bump_ledger_version(conn):
+    """Mark the ledger as changed; call inside the writing transaction, before commit."""
+    conn.execute("UPDATE ledger_meta SET version = version + 1")
+
+
+def database_id(conn):
+    """``(file name, random id set at creation)``; caches key on it rather than on the file name alone."""
+    return conn.execute("PRAGMA database_list").fetchone()[2], conn.execute("SELECT database_id FROM ledger_meta").fetchone()[0]
+
+
+def staff_version(conn):
+    return conn.execute("SELECT staff_version FROM ledger_meta").fetchone()[0]
+
+
+def bump_staff_version(conn):
+    """Mark the staff tables as changed; call inside the writing transaction, before commit."""
+    conn.execute("UPDATE ledger_meta SET staff_version = staff_version + 1")
+
+
+class VersionedCache:
+    """Values loaded from a database, shared by every connection to the same database in the process.
+
+    ``version`` is one of the counters above; a database's entries are all
+    dropped once its counter has moved.
+    """
+
+    def __init__(self, version):
+        self.version = version
+        self.lock = threading.Lock()
+        self.entries = {}  # database_id -> (version, {key: value})
+
+    def get(self, conn, key, load):
+        """The cached value for ``key``, calling ``load()`` on a miss."""
+        db_key, version = database_id(conn), self.version(conn)
+        with self.lock:
+            cached = self.entries.get(db_key)
+            if not cached or cached[0] != version:
+                cached = self.entries[db_key] = (version, {})
+            if key not in cached[1]:
+                cached[1][key] = load()
+            return cached[1][key]
@@ -0,0 +1,142 @@
+"""Ledger exports written straight from a SQLite cursor.
+
+Rows are fetched ``EXPORT_BATCH_ROWS`` at a time and written out before the
+next batch is read, so memory stays bounded whatever the date range. Excel
+workbooks use xlsxwriter's constant-memory mode (each sheet is flushed row
+by row to a temporary file) and can be split into one sheet per company or
+staff member in the same pass; a sheet that reaches Excel's row limit is
+continued on the next one ("Ledger (2)", ...). CSV and Parquet (pyarrow) are written batch
+by batch as well. Rows are the Detailed View's: sales lines plus adjustments.
+"""
+import csv
+import re
+
+import xlsxwriter
+
+from .archive import incentives
+from .config import excluded_names
+from .dates import date_key
+from .ledger import LEDGER_SQL
+from .queries import COLUMNS, LEDGER_COLUMNS
+
+EXPORT_BATCH_ROWS = 5_000
+EXPORT_FORMATS = ("xlsx", "csv", "parquet")
+# Rows per worksheet, header included
+EXCEL_MAX_ROWS = 1_048_576
+SPLIT_BY = {"company": COLUMNS.index("company"), "staff": COLUMNS.index("name")}
+TEXT_COLUMNS = {"date", "name", "role", "status", "bill_no", "item_name", "company", "second_agent", "item_code",
+                "additional_item_code"}
+# Excel sheet names: at most 31 characters, none of []:*?/\
+_SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+
+
+def ledger_batches(conn, start_date, end_date, staff="All"):
+    """Yield lists of ledger rows (``queries.COLUMNS``) in the range, ``EXPORT_BATCH_ROWS`` at a time."""
+    query = (f"SELECT {', '.join(COLUMNS)} FROM ({LEDGER_SQL.format(incentives=incentives(conn, start_date, end_date))})"
+             " WHERE date_key BETWEEN ? AND ? AND name != ?")
+    params = [date_key(start_date), date_key(end_date), excluded_names[0]]
+    if staff != "All":
+        query += " AND name = ?"
+        params.append(staff)
+    cursor = conn.execute(query, params)
+    try:
+        while True:
+            batch = cursor.fetchmany(EXPORT_BATCH_ROWS)
+            if not batch:
+                return
+            yield batch
+    finally:
+        cursor.close()
+
+
+def _sheet_name(value, taken):
+    name = _SHEET_CHARS.sub("_", str(value or "Other")).strip("'")[:31] or "Other"
+    base, i = name, 2
+    while name.lower() in taken:
+        suffix = f" ({i})"
+        name, i = base[:31 - len(suffix)] + suffix, i + 1
+    taken.add(name.lower())
+    return name
+
+
+def write_excel(conn, target, start_date, end_date, staff="All", split_by=None, summary=None, lines=True):
+    """Write the range's ledger rows as an .xlsx workbook to ``target`` (path or binary file); returns rows written.
+
+    ``split_by`` ("company" or "staff") puts each group on its own sheet
+    instead of one "Ledger" sheet; a full sheet continues on "<name> (2)". ``summary`` is an optional
+    ``(columns, rows)`` table written first as an "Overview" sheet; with
+    ``lines=False`` it is the only sheet.
+    """
+    workbook = xlsxwriter.Workbook(target, {"constant_memory": True})
+    bold = workbook.add_format({"bold": True})
+    sheets, taken = {}, set()
+
+    def add_sheet(name, columns):
+        sheet = workbook.add_worksheet(_sheet_name(name, taken))
+        sheet.set_column(0, len(columns) - 1, 14)
+        sheet.write_row(0, 0, columns, bold)
+        return [sheet, 1]
+
+    if summary:
+        columns, rows = summary
+        sheet, _ = add_sheet("Overview", columns)
+        for i, row in enumerate(rows, start=1):
+            sheet.write_row(i, 0, row)
+    group = SPLIT_BY[split_by] if split_by else None
+    written = 0
+    for batch in ledger_batches(conn, start_date, end_date, staff) if lines else ():
+        for row in batch:
+            key = row[group] if group is not None else "Ledger"
+            entry = sheets.get(key)
+            if entry is None or entry[1] == EXCEL_MAX_ROWS:
+                entry = sheets[key] = add_sheet(key, LEDGER_COLUMNS)
+            entry[0].write_row(entry[1], 0, row)
+            entry[1] += 1
+        written += len(batch)
+    if not sheets and not summary:
+        add_sheet("Ledger", LEDGER_COLUMNS)
+    workbook.close()
+    return written
+
+
+def write_csv(conn, target, start_date, end_date, staff="All"):
+    """Write the range's ledger rows as CSV to ``target`` (a text file); returns rows written."""
+    writer = csv.writer(target)
+    writer.writerow(LEDGER_COLUMNS)
+    written = 0
+    for batch in ledger_batches(conn, start_date, end_date, staff):
+        writer.writerows(batch)
+        written += len(batch)
+    return written
+
+
+def write_parquet(conn, target, start_date, end_date, staff="All"):
+    """Write the range's ledger rows as Parquet (one row group per batch); returns rows written. Needs pyarrow."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)") from e
+    schema = pa.schema([(label, pa.string() if col in TEXT_COLUMNS else pa.int64() if col == "parts_count" else pa.float64())
+                        for col, label in zip(COLUMNS, LEDGER_COLUMNS)])
+    written = 0
+    with pq.ParquetWriter(target, schema) as writer:
+        for batch in ledger_batches(conn, start_date, end_date, staff):
+            columns = [[None if value is None else str(value) if field.type == pa.string() else value for value in values]
+                       for field, values in zip(schema, zip(*batch))]
+            writer.write_batch(pa.record_batch(columns, schema=schema))
+            written += len(batch)
+    return written
+
+
+def export(conn, path, start_date, end_date, staff="All", split_by=None):
+    """Write an export to ``path``, choosing the format by its extension; returns rows written."""
+    extension = path.rsplit(".", 1)[-1].lower()
+    if extension == "csv":
+        with open(path, "w", newline="") as f:
+            return write_csv(conn, f, start_date, end_date, staff)
+    if extension == "parquet":
+        return write_parquet(conn, path, start_date, end_date, staff)
+    if extension == "xlsx":
+        return write_excel(conn, path, start_date, end_date, staff, split_by)
+    raise ValueError(f"Unsupported export format {extension!r}; use one of {', '.join(EXPORT_FORMATS)}")
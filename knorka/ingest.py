@@ -0,0 +1,430 @@
+import atexit
+import logging
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from io import BytesIO
+
+import pandas as pd
+from fuzzywuzzy import fuzz, process
+
+from . import activity, archive, balances
+from .config import DATE_FORMAT, branches, company_prefixes, configure_logging
+from .dates import date_key, normalize_dates
+from .db import bump_ledger_version
+from .metrics import RunMetrics, track_run
+from .rules import calculate_incentive, is_special_item, load_rule_book
+from .staff import directory
+from .validation import INSERT_REJECT, reject_rows, upload_summary, validate
+
+INSERT_INCENTIVE = """INSERT INTO incentives (date, name, role, incentive, gross, net_amount, status, bill_no, item_name, company,
+                                            qty, rate, second_agent, parts_count, total_pool, item_code, additional_item_code,
+                                            date_key, staff_id, second_staff_id)
+                      VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+INSERT_SALES_LINE = """INSERT INTO sales_lines (date_key, company, bill_no, item_name, gross, net_amount, agent_id, other_agent_id)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""
+# Below this many bytes of ERP exports, starting worker processes costs more than it saves
+PARALLEL_MIN_BYTES = 256 * 1024
+
+
+class IngestError(Exception):
+    """Raised when uploaded files cannot be ingested."""
+
+
+@dataclass
+class IngestResult:
+    rows_processed: int = 0
+    dates: set = field(default_factory=set)
+    report_date: str = None
+    warnings: list = field(default_factory=list)
+    run_id: str = None
+    rejected: list = field(default_factory=list)  # validation.upload_summary rows
+
+
+def _file_name(file):
+    return os.path.basename(file if isinstance(file, (str, os.PathLike)) else file.name)
+
+
+def _read_bytes(file):
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as f:
+            return f.read()
+    if hasattr(file, "getvalue"):
+        return file.getvalue()
+    file.seek(0)
+    return file.read()
+
+
+def _name_parts(file):
+    parts = os.path.splitext(_file_name(file))[0].split("_")
+    if len(parts) > 1 and parts[0].upper() in branches:
+        return parts[0].upper(), parts[1:]
+    return None, parts
+
+
+def determine_branch(file):
+    """Branch code from a "<BRANCH>_" file-name prefix (see ``config.branches``), or None for the main store."""
+    return _name_parts(file)[0]
+
+
+# Determine Company
+def determine_company(file):
+    file_base = _name_parts(file)[1][0]
+    for prefix, company in company_prefixes.items():
+        if prefix in file_base:
+            return company
+    return "Unknown"
+
+
+def _clean_names(series):
+    return series.apply(lambda x: str(x).strip().replace("\n", "").title() if pd.notna(x) else None)
+
+
+class StaffMatcher:
+    """Resolves agent spellings to known staff names, memoizing each distinct spelling.
+
+    Spellings recorded in ``staff_aliases`` resolve directly; anything else
+    is fuzzy-matched against the staff names.
+    """
+
+    def __init__(self, staff_directory):
+        self.directory = staff_directory
+        self.staff = staff_directory.known_staff
+        self.known_lower = [name.lower() for name in self.staff]
+        self.cache = {}
+        self.hits = 0
+        self.misses = 0
+
+    def match(self, name_lower):
+        """Return the staff name for a lower-cased spelling, or None."""
+        if not name_lower:
+            return None
+        if name_lower in self.cache:
+            self.hits += 1
+            return self.cache[name_lower]
+        self.misses += 1
+        matched = self.directory.resolve(name_lower)
+        if matched is None:
+            best_match, score = process.extractOne(name_lower, self.known_lower, scorer=fuzz.partial_ratio)
+            if score >= 80:
+                matched = self.staff[self.known_lower.index(best_match)]
+                logging.info(f"Fuzzy matched {name_lower} to {matched}")
+        self.cache[name_lower] = matched
+        return matched
+
+
+def read_sales_sheet(source, file_name="ERP file"):
+    """Read and clean one Logic ERP sales export (path, file object or bytes)."""
+    if isinstance(source, bytes):
+        source = BytesIO(source)
+    try:
+        df = pd.read_excel(source, skiprows=2)
+    except Exception as e:
+        raise IngestError(f"Error loading {file_name}: {e}") from e
+    df.columns = df.columns.str.strip()
+    for column in ["AGENT NAME", "OTHER AGENT NAME"]:
+        if column in df.columns:
+            df[column] = _clean_names(df[column])
+    if "SNO." not in df.columns:
+        raise IngestError(f"Column 'SNO.' not found in {file_name}")
+    return df[pd.to_numeric(df["SNO."], errors='coerce').notna()]
+
+
+def _register_date(header):
+    """date_key of the "Date: dd/mm/yyyy" line above the attendance table, or 0."""
+    for value in header.stack():
+        if isinstance(value, str) and value.strip().lower().startswith("date:"):
+            return int(normalize_dates([value.split(":", 1)[1].strip()]).keys.iloc[0])
+    return 0
+
+
+def read_attendance_sheet(source):
+    """Read and clean the attendance export (path, file object or bytes).
+
+    The register's date is kept in ``attendance.attrs["date_key"]`` (0 when
+    the sheet does not state one).
+    """
+    content = source if isinstance(source, bytes) else _read_bytes(source)
+    try:
+        header = pd.read_excel(BytesIO(content), header=None, nrows=6)
+        attendance = pd.read_excel(BytesIO(content), skiprows=6)
+    except Exception as e:
+        raise IngestError(f"Error loading attendance file: {e}") from e
+    attendance.columns = attendance.columns.str.strip()
+    if "Name" not in attendance.columns or "Status" not in attendance.columns:
+        raise IngestError("Required columns 'Name' or 'Status' not found in Attendance file")
+    attendance["Name"] = _clean_names(attendance["Name"])
+    attendance.attrs["date_key"] = _register_date(header)
+    return attendance
+
+
+def _company_pipeline(task):
+    """Parse one ERP export and compute its incentive rows; runs in a worker process.
+
+    Returns a dict with the rows to insert, the sale lines the rules ran on
+    (kept for simulation), the helper-pool contribution of
+    every line, bill dates and the worker's metrics.
+    Nothing here touches the database, so companies can run concurrently.
+    """
+    company = task["company"]
+    metrics = RunMetrics("company")
+    with metrics.stage("parse"):
+        df = read_sales_sheet(task["content"], task["file_name"])
+    metrics.count("rows_read", len(df))
+
+    staff_directory = task["staff"]
+    staff = staff_directory.known_staff
+    present_employees = task["present_employees"]
+    matcher = StaffMatcher(staff_directory)
+    rule_book = task["rules"]
+    special_before = is_special_item.cache_info()
+    rows = []
+    lines = []
+    pool_contributions = []
+    dates = set()
+    with metrics.stage("normalize_date"):
+        bill_dates = normalize_dates(df["BILL DATE"] if "BILL DATE" in df else pd.Series(None, index=df.index, dtype=object))
+    with metrics.stage("validate"):
+        valid, agents, other_agents, rejected = validate(df, bill_dates, matcher)
+    reasons = rejected["reason"].value_counts()
+    metrics.count("rows_skipped", int(reasons.get("missing_data", 0)))
+    metrics.count("rows_unmatched", int(reasons.get("unmatched_agent", 0)))
+    bad_dates = int(reasons.get("bad_date", 0))
+
+    # Timed once for the whole loop, not per row
+    with metrics.stage("rules"):
+        # NIL lines pay no agent; with a known other agent they still feed the helper pool, as they always have
+        for index, row in rejected[rejected["feeds_pool"]].iterrows():
+            gross = row.get("GROSS AMOUNT", 0)
+            key = int(bill_dates.keys.at[index])
+            dates.add(bill_dates.display.at[index])
+            pool_contributions.append(calculate_incentive(None, None, None, gross, row.get("ITEM NAME"),
+                                                          row.get("NET AMOUNT", row.get("NET AMT", gross * 0.95)), rule_book.at(key))[2])
+
+        for (index, row), salesman1, salesman2 in zip(valid.iterrows(), agents, other_agents):
+            gross = row.get("GROSS AMOUNT", 0)
+            net_amount = row.get("NET AMOUNT", row.get("NET AMT", gross * 0.95))
+            bill_no = row.get("BILL NO.")
+            item_name = row.get("ITEM NAME")
+            qty = row.get("TOTAL QTY", 1.0)
+            rate = row.get("RATE/UNIT", gross / qty if qty > 0 else gross)
+            item_code = row.get("ITEM CODE", "")
+            additional_item_code = row.get("ADDITIONAL ITEM CODE", "")
+            key = int(bill_dates.keys.at[index])
+            date = bill_dates.display.at[index]
+            dates.add(date)
+            helper = None
+
+            incentives, net_amounts, pool_contribution = calculate_incentive(salesman1, salesman2, helper, gross, item_name, net_amount,
+                                                                             rule_book.at(key))
+            pool_contributions.append(pool_contribution)
+            lines.append((key, company, bill_no, item_name, gross, net_amount, staff_directory.ids.get(salesman1),
+                          staff_directory.ids.get(salesman2)))
+            for name, amount in incentives.items():
+                actual_name = next((s for s in staff if s.lower() == name.lower()), name)
+                role = staff_directory.role(actual_name, key)
+                if role == "Helper" and (salesman1 == actual_name or salesman2 == actual_name):
+                    role = "Salesman"
+                status = "Present" if actual_name.lower() in present_employees else "Sus"
+                if actual_name.lower() not in present_employees:
+                    status = f'<span class="red-text">{status}</span>'
+                net_amount = net_amounts.get(name, net_amount)
+                second_agent = None
+                if salesman1 and salesman2:
+                    if actual_name == salesman1:
+                        second_agent = salesman2
+                    elif actual_name == salesman2:
+                        second_agent = salesman1
+                parts_count = 0
+                total_pool = 0.0
+                rows.append((date, actual_name, role, amount, gross, net_amount, status, bill_no, item_name, company, qty, rate,
+                             second_agent, parts_count, total_pool, item_code, additional_item_code, key,
+                             staff_directory.ids.get(actual_name), staff_directory.ids.get(second_agent)))
+
+    metrics.count("rows_bad_date", bad_dates)
+    special_after = is_special_item.cache_info()
+    metrics.cache_stats("fuzzy_match_cache", matcher.hits, matcher.misses)
+    metrics.cache_stats("special_item_cache", special_after.hits - special_before.hits, special_after.misses - special_before.misses)
+    return {
+        "company": company,
+        "file_name": task["file_name"],
+        "rows": rows,
+        "lines": lines,
+        "pool_contributions": pool_contributions,
+        "dates": dates,
+        "bad_dates": bad_dates,
+        "rejects": reject_rows(rejected, bill_dates, company, task["file_name"]),
+        "unparsed_dates": bill_dates.unparsed,
+        "metrics": metrics,
+    }
+
+
+_pool = None
+
+
+def _worker_init(log_path):
+    if log_path:
+        configure_logging(log_path)
+
+
+def _executor():
+    """A process pool shared by every ingestion in this process, started on first use and shut down at exit."""
+    global _pool
+    if _pool is None:
+        log_path = next((h.baseFilename for h in logging.getLogger().handlers if isinstance(h, logging.FileHandler)), None)
+        _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 2, mp_context=multiprocessing.get_context("spawn"),
+                                    initializer=_worker_init, initargs=(log_path,))
+        atexit.register(shutdown_executor)
+    return _pool
+
+
+def shutdown_executor():
+    """Stop the worker processes of parallel ingestion; the next parallel ingestion starts new ones."""
+    global _pool
+    if _pool is not None:
+        atexit.unregister(shutdown_executor)
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+def _run_pipelines(tasks, workers):
+    if workers is None:
+        size = sum(len(task["content"]) for task in tasks)
+        workers = len(tasks) if len(tasks) > 1 and size >= PARALLEL_MIN_BYTES else 1
+    if workers <= 1 or len(tasks) == 1:
+        return [_company_pipeline(task) for task in tasks]
+    return list(_executor().map(_company_pipeline, tasks))
+
+
+# Process Files
+def process_files(conn, erp_files, attendance_file, profile=False, workers=None):
+    """Ingest one day's ERP exports and attendance workbook into ``conn``.
+
+    ``erp_files`` holds one export per company or branch (LS_Sales,
+    NFS_Sales, ...); they and ``attendance_file`` may be paths or file-like
+    objects with a ``name`` (such as Streamlit uploads). Each export is
+    parsed and priced in its own worker process and the results are merged
+    in company order, so the outcome does not depend on which worker
+    finishes first. ``workers=1`` keeps everything in this process; by
+    default small uploads stay in-process too. Raises IngestError when the
+    files are missing or malformed. Stage timings are stored in
+    ``run_metrics``; ``profile`` also captures the run with cProfile.
+    """
+    with track_run(conn, "ingest", profile) as metrics:
+        result = _process_files(conn, erp_files, attendance_file, metrics, workers)
+        result.run_id = metrics.run_id
+    return result
+
+
+def _process_files(conn, erp_files, attendance_file, metrics, workers):
+    try:
+        if not erp_files or not attendance_file:
+            raise IngestError("Please upload the ERP files (LS_Sales, NFS_Sales) and 1 Attendance file")
+        unknown = [_file_name(f) for f in erp_files if determine_company(f) == "Unknown"]
+        if unknown:
+            raise IngestError(f"Could not identify the company of {', '.join(unknown)}; "
+                              f"ERP file names must start with {' or '.join(company_prefixes)}")
+        with metrics.stage("parse_attendance"):
+            attendance = read_attendance_sheet(attendance_file)
+    except IngestError as e:
+        logging.error(str(e))
+        raise
+
+    staff_directory = directory(conn)
+    rule_book = load_rule_book(conn)
+    present_employees = {name.lower(): True for name in attendance[attendance["Status"].isin(["P", "A"])]["Name"] if name is not None}
+    logging.info(f"Present employees: {list(present_employees.keys())}")
+
+    tasks = sorted(({"company": determine_company(f), "file_name": _file_name(f), "content": _read_bytes(f),
+                     "staff": staff_directory, "rules": rule_book,
+                     "present_employees": present_employees} for f in erp_files),
+                   key=lambda task: (task["company"], task["file_name"]))
+    try:
+        with metrics.stage("companies"):
+            partials = _run_pipelines(tasks, workers)
+    except IngestError as e:
+        logging.error(str(e))
+        raise
+
+    cursor = conn.cursor()
+    result = IngestResult()
+    pool_contributions = []
+    earned = []  # (staff_id, date_key, incentive) for the running balances
+    with metrics.stage("insert"):
+        for partial in partials:
+            metrics.merge(partial["metrics"])
+            metrics.executemany(cursor, "insert incentive", INSERT_INCENTIVE, partial["rows"])
+            metrics.executemany(cursor, "insert sales line", INSERT_SALES_LINE, partial["lines"])
+            metrics.executemany(cursor, "insert reject", INSERT_REJECT, [(metrics.run_id, *row) for row in partial["rejects"]])
+            result.rows_processed += len(partial["rows"])
+            earned.extend((row[18], row[17], row[3]) for row in partial["rows"])
+            result.dates |= partial["dates"]
+            pool_contributions.extend(partial["pool_contributions"])
+            if partial["bad_dates"]:
+                result.warnings.append(f"{partial['file_name']}: skipped {partial['bad_dates']} rows with an unreadable "
+                                       f"BILL DATE ({', '.join(partial['unparsed_dates'][:5])})")
+    # fsum is exactly rounded, so the pool does not depend on worker order
+    helper_pool = math.fsum(pool_contributions)
+
+    with metrics.stage("pool_distribution"):
+        helpers = staff_directory.helpers
+        attendance_names = [name.lower() for name in attendance[attendance["Status"].isin(["P", "A"])]["Name"] if name]
+        fuzzy_matched_helpers = []
+        for att_name in attendance_names:
+            best_match, score = process.extractOne(att_name, helpers, scorer=fuzz.partial_ratio)
+            if score >= 80:
+                fuzzy_matched_helpers.append(best_match)
+        for date in sorted(result.dates, key=date_key):
+            num_present_helpers = len(fuzzy_matched_helpers)
+            if num_present_helpers > 0:
+                total_pool = helper_pool
+                pool_share = helper_pool / num_present_helpers if helper_pool > 0 else 1.79
+                for helper in fuzzy_matched_helpers:
+                    actual_helper = next((staff for staff in staff_directory.known_staff if staff.lower() == helper), helper.title())
+                    helper_id = staff_directory.ids.get(actual_helper)
+                    metrics.execute(cursor, "insert pool share", INSERT_INCENTIVE,
+                                    (date, actual_helper, "Helper", pool_share, 0, 0, "Present", "Helper Pool", "Helper Pool Share", "", 0, 0, None, num_present_helpers, total_pool, "", "", date_key(date),
+                                     helper_id, None))
+                    earned.append((helper_id, date_key(date), pool_share))
+                    logging.info(f"Distributed pool incentive {pool_share} to {actual_helper}")
+
+    with metrics.stage("balances"):
+        balances.add_earned(cursor, earned)
+
+    with metrics.stage("attendance"):
+        # A register without its own date covers the upload's bill dates
+        register_keys = [attendance.attrs["date_key"]] if attendance.attrs.get("date_key") else sorted(map(date_key, result.dates))
+        matcher = StaffMatcher(staff_directory)
+        statuses = {}
+        for name, status in zip(attendance["Name"], attendance["Status"]):
+            matched = matcher.match(name.lower()) if name else None
+            if matched and pd.notna(status):
+                statuses[staff_directory.ids[matched]] = str(status).strip()
+        activity.record_attendance(cursor, [(staff_id, key, status) for key in register_keys for staff_id, status in statuses.items()])
+
+    logging.info(f"Processing completed: {result.rows_processed} rows processed")
+    with metrics.stage("commit"):
+        bump_ledger_version(conn)
+        conn.commit()
+    metrics.count("rows_inserted", result.rows_processed)
+    metrics.count("files", len(tasks))
+    result.report_date = latest_report_date(conn)
+    result.rejected = upload_summary(conn, metrics.run_id)
+    for reason, rows, net_amount in result.rejected:
+        logging.warning(f"Rejected {rows} rows ({reason}), net amount {net_amount:.2f}")
+    if result.dates:
+        for alert in activity.inactivity_alerts(conn, datetime.strptime(max(result.dates, key=date_key), DATE_FORMAT), staff_directory):
+            result.warnings.append(alert)
+            logging.warning(alert)
+    return result
+
+
+def latest_report_date(conn):
+    """The most recent ledger date, or today when the ledger is empty."""
+    latest = conn.execute("SELECT date FROM incentives ORDER BY date_key DESC LIMIT 1").fetchone()
+    if not latest and archive.partitions(conn):
+        latest = conn.execute(f"SELECT date FROM {archive.incentives(conn)} ORDER BY date_key DESC LIMIT 1").fetchone()
+    return latest[0] if latest else datetime.now().strftime(DATE_FORMAT)
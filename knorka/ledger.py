@@ -0,0 +1,106 @@
+"""Shared, compact in-memory copy of the incentives ledger for the dashboard.
+
+The Search and Detailed View tabs read their rows from it; totals come from
+the SQL aggregates in :mod:`queries`. The frame is loaded once per ledger
+version (see ``db.bump_ledger_version``) and shared by every session in the
+process. Repeated text is stored as categoricals, numerics as
+float32/int32, and date ranges are filtered on the integer ``date_key``
+(YYYYMMDD). Adjustments are loaded as extra lines with bill number
+"Adjustment" (the reason in the item column). Archived periods are only
+loaded when a caller's start date reaches them.
+"""
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from .archive import incentives
+from .config import excluded_names
+from .dates import date_key
+from .db import VersionedCache, ledger_version
+from .queries import COLUMNS, LEDGER_COLUMNS, SEARCH_FIELDS
+
+CATEGORY_COLUMNS = ["date", "name", "role", "status", "bill_no", "item_name", "company", "second_agent", "item_code",
+                    "additional_item_code"]
+FLOAT_COLUMNS = ["incentive", "gross", "net_amount", "qty", "rate", "total_pool"]
+INT_COLUMNS = ["parts_count", "date_key"]
+CHUNK_ROWS = 10_000
+ADJUSTMENT = "Adjustment"
+LEDGER_SQL = f"""SELECT {', '.join(COLUMNS)}, date_key FROM {{incentives}}
+                 UNION ALL
+                 SELECT printf('%02d-%02d-%04d', adjustments.date_key % 100, adjustments.date_key / 100 % 100,
+                               adjustments.date_key / 10000),
+                        staff.name, NULL, adjustments.value, 0, 0, NULL, '{ADJUSTMENT}', adjustments.reason, '', 0, 0, NULL, 0, 0,
+                        '', '', adjustments.date_key
+                 FROM adjustments JOIN staff ON staff.id = adjustments.staff_id"""
+
+_cache = VersionedCache(ledger_version)
+
+
+def _compact(chunk):
+    for col in CATEGORY_COLUMNS:
+        chunk[col] = chunk[col].astype("category")
+    for col in FLOAT_COLUMNS:
+        chunk[col] = pd.to_numeric(chunk[col], errors="coerce").astype("float32")
+    for col in INT_COLUMNS:
+        chunk[col] = pd.to_numeric(chunk[col], errors="coerce").fillna(0).astype("int32")
+    return chunk
+
+
+def load_ledger(conn, source="incentives"):
+    """Read the ledger (``source``: incentives or an archive view) into a compact frame, ``CHUNK_ROWS`` rows at a time."""
+    chunks = [_compact(chunk) for chunk in pd.read_sql_query(LEDGER_SQL.format(incentives=source), conn, chunksize=CHUNK_ROWS)]
+    if not chunks:
+        return _compact(pd.DataFrame({col: pd.Series(dtype=object) for col in COLUMNS + ["date_key"]}))
+    if len(chunks) == 1:
+        return chunks[0]
+    data = {}
+    for col in chunks[0].columns:
+        if col in CATEGORY_COLUMNS:
+            parts = [chunk[col] for chunk in chunks]
+            # A chunk where the column is all NULL has object categories, the others str (pandas 3)
+            dtype = next((part.cat.categories.dtype for part in parts if len(part.cat.categories)), object)
+            data[col] = union_categoricals([part.cat.set_categories(part.cat.categories.astype(dtype)) for part in parts])
+        else:
+            data[col] = np.concatenate([chunk[col].to_numpy() for chunk in chunks])
+    return pd.DataFrame(data)
+
+
+def get_ledger(conn, start_date=None):
+    """Return the shared ledger frame from ``start_date`` on (default: all history).
+
+    Frames are reloaded only when the ledger version moved; one that only
+    covers the active database is shared by every range it can serve.
+    """
+    source = incentives(conn, start_date)
+    return _cache.get(conn, source, lambda: load_ledger(conn, source))
+
+
+def _in_range(ledger, start_date, end_date=None):
+    keys = ledger["date_key"]
+    if end_date is None:
+        return keys == date_key(start_date)
+    return keys.between(date_key(start_date), date_key(end_date))
+
+
+def _staff_rows(ledger, start_date, end_date=None):
+    return ledger[_in_range(ledger, start_date, end_date) & (ledger["name"] != excluded_names[0])]
+
+
+def detailed_frame(ledger, start_date, end_date, staff="All"):
+    """Detailed View rows with the display column names."""
+    rows = _staff_rows(ledger, start_date, end_date)
+    if staff != "All":
+        rows = rows[rows["name"] == staff]
+    rows = rows[COLUMNS].copy()
+    rows.columns = LEDGER_COLUMNS
+    return rows.reset_index(drop=True)
+
+
+def search_frame(ledger, search_type, search_term, start_date, end_date):
+    """Case-insensitive substring search, matched once per distinct value rather than per row."""
+    column = ledger[SEARCH_FIELDS[search_type]]
+    matching = np.flatnonzero(column.cat.categories.astype(str).str.contains(search_term, case=False, regex=False))
+    rows = ledger[column.cat.codes.isin(matching) & _in_range(ledger, start_date, end_date) & (ledger["bill_no"] != ADJUSTMENT)]
+    rows = rows[["date", "name", "bill_no", "item_name", "net_amount", "incentive"]].copy()
+    rows.columns = ["Date", "Agent Name", "Bill No", "Item Name", "Net Amount", "Incentive"]
+    return rows.reset_index(drop=True)
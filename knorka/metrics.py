@@ -0,0 +1,141 @@
+"""Per-run timers, counters and SQL timings, stored in the ``run_metrics`` table."""
+import cProfile
+import io
+import logging
+import pstats
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+
+class RunMetrics:
+    """Collects stage timings, counters and SQL timings for one engine run."""
+
+    def __init__(self, kind):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.started_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.status = "ok"
+        self.stages = {}
+        self.counters = {}
+        self.sql = {}
+        self.profile = None
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def execute(self, cursor, label, sql, params=()):
+        """Run ``sql`` on ``cursor``, accumulating its time under ``label``."""
+        start = time.perf_counter()
+        cursor.execute(sql, params)
+        elapsed = time.perf_counter() - start
+        calls, seconds = self.sql.get(label, (0, 0.0))
+        self.sql[label] = (calls + 1, seconds + elapsed)
+        return cursor
+
+    def executemany(self, cursor, label, sql, rows):
+        start = time.perf_counter()
+        cursor.executemany(sql, rows)
+        elapsed = time.perf_counter() - start
+        calls, seconds = self.sql.get(label, (0, 0.0))
+        self.sql[label] = (calls + len(rows), seconds + elapsed)
+        return cursor
+
+    def merge(self, other):
+        """Fold the stages, counters and SQL timings of a worker's metrics into this run."""
+        for name, seconds in other.stages.items():
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+        for name, value in other.counters.items():
+            self.count(name, value)
+        for label, (calls, seconds) in other.sql.items():
+            old_calls, old_seconds = self.sql.get(label, (0, 0.0))
+            self.sql[label] = (old_calls + calls, old_seconds + seconds)
+
+    def cache_stats(self, name, hits, misses):
+        self.count(f"{name}_hits", hits)
+        self.count(f"{name}_misses", misses)
+
+    def rows(self):
+        total = self.stages.get("total", 0.0)
+        rows = [(self.run_id, self.kind, self.started_at, self.status, "stage", name, seconds, None)
+                for name, seconds in self.stages.items()]
+        rows += [(self.run_id, self.kind, self.started_at, self.status, "counter", name, float(value), None)
+                 for name, value in self.counters.items()]
+        rows += [(self.run_id, self.kind, self.started_at, self.status, "sql", label, seconds, calls)
+                 for label, (calls, seconds) in self.sql.items()]
+        if total > 0 and self.counters.get("rows_read"):
+            rows.append((self.run_id, self.kind, self.started_at, self.status, "rate", "rows_per_sec",
+                         self.counters["rows_read"] / total, None))
+        for name in sorted({key.rsplit("_", 1)[0] for key in self.counters if key.endswith("_hits")}):
+            lookups = self.counters.get(f"{name}_hits", 0) + self.counters.get(f"{name}_misses", 0)
+            if lookups:
+                rows.append((self.run_id, self.kind, self.started_at, self.status, "rate", f"{name}_hit_rate",
+                             self.counters.get(f"{name}_hits", 0) / lookups, None))
+        return rows
+
+    def save(self, conn):
+        conn.executemany("INSERT INTO run_metrics VALUES (?, ?, ?, ?, ?, ?, ?, ?)", self.rows())
+        if self.profile:
+            conn.execute("INSERT INTO run_profiles VALUES (?, ?)", (self.run_id, self.profile))
+        conn.commit()
+
+
+def _format_profile(profiler, limit=40):
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(limit)
+    return out.getvalue()
+
+
+@contextmanager
+def track_run(conn, kind, profile=False):
+    """Time an engine run and store its metrics in ``conn`` when it finishes.
+
+    With ``profile`` the run is also captured with cProfile and the top
+    functions by cumulative time are stored in ``run_profiles``. A run that
+    raises is rolled back and recorded with status ``error``.
+    """
+    metrics = RunMetrics(kind)
+    profiler = cProfile.Profile() if profile else None
+    if profiler:
+        profiler.enable()
+    try:
+        with metrics.stage("total"):
+            yield metrics
+    except Exception:
+        conn.rollback()
+        metrics.status = "error"
+        raise
+    finally:
+        if profiler:
+            profiler.disable()
+            metrics.profile = _format_profile(profiler)
+        try:
+            metrics.save(conn)
+        except Exception as e:
+            logging.error(f"Could not store metrics for run {metrics.run_id}: {e}")
+        logging.info(f"{kind} run {metrics.run_id} finished in {metrics.stages.get('total', 0.0):.3f}s")
+
+
+def recent_runs(conn, limit=50):
+    """Return ``(run_id, kind, started_at, status, total_seconds, rows_per_sec)`` of the latest runs."""
+    return conn.execute("""SELECT run_id, kind, started_at, status,
+                                  MAX(CASE WHEN category = 'stage' AND metric = 'total' THEN value END),
+                                  MAX(CASE WHEN category = 'rate' AND metric = 'rows_per_sec' THEN value END)
+                           FROM run_metrics GROUP BY run_id ORDER BY started_at DESC LIMIT ?""", (limit,)).fetchall()
+
+
+def run_details(conn, run_id):
+    """Return ``(metric_rows, profile_text)`` for one run; metric rows are ``(category, metric, value, calls)``."""
+    rows = conn.execute("SELECT category, metric, value, calls FROM run_metrics WHERE run_id = ? ORDER BY category, value DESC",
+                        (run_id,)).fetchall()
+    profile = conn.execute("SELECT stats FROM run_profiles WHERE run_id = ?", (run_id,)).fetchone()
+    return rows, profile[0] if profile else None
@@ -0,0 +1,99 @@
+"""Read-side aggregations behind the dashboard tabs and the CLI."""
+from .archive import incentives as _incentives
+from .config import excluded_names
+from .dates import date_key
+
+LEDGER_COLUMNS = ["Date", "Name", "Role", "Incentive", "Gross", "Net Amount", "Status", "Bill No", "Item Name", "Company",
+                  "Qty", "Rate", "Second Agent", "Parts Count", "Total Pool", "Item Code", "Additional Item Code"]
+COLUMNS = ["date", "name", "role", "incentive", "gross", "net_amount", "status", "bill_no", "item_name", "company",
+           "qty", "rate", "second_agent", "parts_count", "total_pool", "item_code", "additional_item_code"]
+SEARCH_FIELDS = {"Item Name": "item_name", "Item Code": "item_code", "Additional Item Code": "additional_item_code"}
+
+
+# Effective incentive lines: computed incentives plus adjustments, both restricted to a date_key range
+EFFECTIVE_INCENTIVES = """SELECT name, date_key, incentive FROM {incentives} WHERE date_key BETWEEN ? AND ?
+                          UNION ALL
+                          SELECT staff.name, adjustments.date_key, adjustments.value
+                          FROM adjustments JOIN staff ON staff.id = adjustments.staff_id
+                          WHERE adjustments.date_key BETWEEN ? AND ?"""
+
+
+def _range(start_date, end_date=None):
+    start = date_key(start_date)
+    end = date_key(end_date) if end_date is not None else start
+    return start, end, start, end
+
+
+def _effective(conn, start_date, end_date=None):
+    return EFFECTIVE_INCENTIVES.format(incentives=_incentives(conn, start_date, end_date if end_date is not None else start_date))
+
+
+def overview_totals(conn, start_date, end_date):
+    """Return ``(total_incentive, total_gross)`` for the range; the incentive includes adjustments."""
+    incentive = conn.execute(f"SELECT SUM(incentive) FROM ({_effective(conn, start_date, end_date)}) WHERE name NOT IN (?)",
+                             (*_range(start_date, end_date), excluded_names[0])).fetchone()
+    gross = conn.execute(f"SELECT SUM(gross) FROM {_incentives(conn, start_date, end_date)} WHERE name NOT IN (?) AND date_key BETWEEN ? AND ?",
+                         (excluded_names[0], date_key(start_date), date_key(end_date))).fetchone()
+    total_incentive = float(incentive[0]) if incentive and incentive[0] is not None else 0.0
+    total_gross = float(gross[0]) if gross and gross[0] is not None else 0.0
+    return total_incentive, total_gross
+
+
+def top_performer(conn, start_date, end_date=None):
+    """Return ``(name, incentive)`` of the best earner in the range (or on one day), or None."""
+    row = conn.execute(f"SELECT name, SUM(incentive) FROM ({_effective(conn, start_date, end_date)}) WHERE name NOT IN (?) GROUP BY name ORDER BY SUM(incentive) DESC LIMIT 1",
+                       (*_range(start_date, end_date), excluded_names[0])).fetchone()
+    if row and row[1] is not None:
+        return row[0], float(row[1])
+    return None
+
+
+def totals_by_staff(conn, start_date, end_date=None):
+    """Return ``{name: (incentive, gross)}`` from sales (helper pool excluded) plus adjustments, for the range or one day."""
+    start, end, _, _ = _range(start_date, end_date)
+    incentives = _incentives(conn, start_date, end_date if end_date is not None else start_date)
+    rows = conn.execute(f"""SELECT name, SUM(incentive), SUM(gross) FROM (
+                                SELECT name, incentive, gross FROM {incentives}
+                                WHERE date_key BETWEEN ? AND ? AND bill_no != 'Helper Pool'
+                                UNION ALL
+                                SELECT staff.name, adjustments.value, 0 FROM adjustments JOIN staff ON staff.id = adjustments.staff_id
+                                WHERE adjustments.date_key BETWEEN ? AND ?)
+                            WHERE name NOT IN (?) GROUP BY name""", (start, end, start, end, excluded_names[0])).fetchall()
+    return {name: (float(incentive or 0.0), float(gross or 0.0)) for name, incentive, gross in rows}
+
+
+def incentive_by_staff(conn, start_date, end_date):
+    return conn.execute(f"SELECT name, SUM(incentive) FROM ({_effective(conn, start_date, end_date)}) WHERE name NOT IN (?) GROUP BY name",
+                        (*_range(start_date, end_date), excluded_names[0])).fetchall()
+
+
+def gross_by_date(conn, start_date, end_date):
+    return conn.execute(f"SELECT date, SUM(gross) FROM {_incentives(conn, start_date, end_date)} WHERE name NOT IN (?) AND date_key BETWEEN ? AND ? GROUP BY date_key ORDER BY date_key",
+                        (excluded_names[0], date_key(start_date), date_key(end_date))).fetchall()
+
+
+def incentive_by_month(conn, start_date, end_date):
+    return conn.execute(f"SELECT printf('%d-%02d', date_key / 10000, date_key / 100 % 100) AS month, SUM(incentive) FROM ({_effective(conn, start_date, end_date)}) WHERE name NOT IN (?) GROUP BY month ORDER BY month",
+                        (*_range(start_date, end_date), excluded_names[0])).fetchall()
+
+
+def search_items(conn, search_type, search_term, start_date, end_date):
+    column = SEARCH_FIELDS[search_type]
+    return conn.execute(f"SELECT date, name, bill_no, item_name, net_amount, incentive FROM {_incentives(conn, start_date, end_date)} WHERE {column} LIKE ? AND date_key BETWEEN ? AND ?",
+                        (f"%{search_term}%", date_key(start_date), date_key(end_date))).fetchall()
+
+
+def detailed_rows(conn, start_date, end_date, staff="All"):
+    query = f"SELECT {', '.join(COLUMNS)} FROM {_incentives(conn, start_date, end_date)} WHERE name NOT IN (?) AND date_key BETWEEN ? AND ?"
+    params = [excluded_names[0], date_key(start_date), date_key(end_date)]
+    if staff != "All":
+        query += " AND staff_id = (SELECT id FROM staff WHERE name = ?)"
+        params.append(staff)
+    return conn.execute(query, params).fetchall()
+
+
+def has_data(conn, start_date, end_date=None):
+    incentives = _incentives(conn, start_date, end_date if end_date is not None else start_date)
+    if end_date is None:
+        return conn.execute(f"SELECT date FROM {incentives} WHERE date_key = ?", (date_key(start_date),)).fetchone() is not None
+    return conn.execute(f"SELECT date FROM {incentives} WHERE date_key BETWEEN ? AND ?", (date_key(start_date), date_key(end_date))).fetchone() is not None
@@ -0,0 +1,364 @@
+import logging
+import os
+import zipfile
+from datetime import datetime, timedelta
+from io import BytesIO
+
+from PyPDF2 import PdfReader, PdfWriter
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Table, TableStyle
+
+from .archive import incentives
+from .config import DATE_FORMAT, PDFS_DIR
+from .dates import date_key
+from .ingest import latest_report_date
+from .metrics import track_run
+from .staff import directory
+
+BILL_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3498db')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f5f5f5')),
+    ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 8),
+    ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.HexColor('#f5f5f5'), colors.white]),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+])
+
+SUMMARY_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3498db')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+    ('TOPPADDING', (0, 0), (-1, 0), 8),
+    ('BACKGROUND', (0, 1), (-1, 1), colors.HexColor('#e6f0fa')),
+    ('BACKGROUND', (0, 3), (-1, -1), colors.HexColor('#e6f0fa')),
+    ('TEXTCOLOR', (0, 1), (-1, -1), colors.darkblue),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 9),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ('BOX', (0, 0), (-1, -1), 1, colors.grey),
+    ('BACKGROUND', (0, 2), (-1, 2), colors.transparent),
+    ('TEXTCOLOR', (0, 2), (-1, 2), colors.grey),
+    ('FONTSIZE', (0, 2), (-1, 2), 8),
+])
+
+BILL_COLUMNS = "bill_no, item_name, net_amount, incentive, date, name, qty, rate, second_agent, total_pool"
+
+
+# Encrypt PDF
+def encrypt_pdf(input_path, output_path, password):
+    try:
+        reader = PdfReader(input_path)
+        writer = PdfWriter()
+        for page in reader.pages:
+            writer.add_page(page)
+        writer.encrypt(password)
+        with open(output_path, "wb") as f:
+            writer.write(f)
+        logging.info(f"Encrypted PDF: {output_path}")
+    except Exception as e:
+        logging.error(f"Error encrypting PDF {input_path}: {e}")
+        raise
+
+
+def _report_period(selected_date, start_date, end_date, report_date):
+    """Return ``(date_to_use, last_day, date_dt, header_date)`` for a report."""
+    if start_date and not selected_date:
+        date_to_use = f"{start_date.strftime(DATE_FORMAT)}_to_{end_date.strftime(DATE_FORMAT)}"
+        header_date = f"{start_date.strftime('%d/%m/%Y')} to {end_date.strftime('%d/%m/%Y')}"
+        return date_to_use, end_date.strftime(DATE_FORMAT), end_date, header_date
+    date_to_use = selected_date.strftime(DATE_FORMAT) if selected_date else report_date
+    return date_to_use, date_to_use, datetime.strptime(date_to_use, DATE_FORMAT), date_to_use.replace('-', '/')
+
+
+def _report_source(conn, date_dt, start_date, last_day):
+    """The incentives relation covering the report period and its month so far."""
+    month_start = date_dt.replace(day=1)
+    first = start_date if start_date and date_key(start_date) < date_key(month_start) else month_start
+    return incentives(conn, first, last_day)
+
+
+def _bill_rows(metrics, cursor, source, staff_id, date_to_use, start_date, end_date):
+    if not start_date:
+        metrics.execute(cursor, "bill rows", f"SELECT {BILL_COLUMNS} FROM {source} WHERE staff_id = ? AND date_key = ?", (staff_id, date_key(date_to_use)))
+    else:
+        metrics.execute(cursor, "bill rows", f"SELECT {BILL_COLUMNS} FROM {source} WHERE staff_id = ? AND date_key BETWEEN ? AND ?", (staff_id, date_key(start_date), date_key(end_date)))
+    rows = cursor.fetchall()
+    metrics.count("bill_rows", len(rows))
+    return rows
+
+
+def _bill_table(bill_data):
+    """Build the bill table rows and the report totals."""
+    table_data = [["Bill No", "Item", "Qty", "Rate", "Amount", "Second Agent", "%", "Incentive"]]
+    total_net_amount = 0
+    total_incentive = 0
+    for row in bill_data:
+        if row:
+            bill_no, item_name, net_amount, incentive, date, name, qty, rate, second_agent, total_pool = row
+            percent = (incentive / net_amount) * 100 if net_amount != 0 else 0
+            rate_str = f"Rs.{rate:.2f}" if rate != 0 else "Rs.0.00"
+            amount_str = f"Rs.{net_amount:.2f}" if net_amount != 0 else "Rs.0.00"
+            incentive_str = f"Rs.{incentive:.2f}"
+            second_agent_display = second_agent if second_agent else "N/A"
+            table_data.append([bill_no, item_name, f"{qty:.1f}", rate_str, amount_str, second_agent_display, f"{percent:.3f}%", incentive_str])
+            total_net_amount += net_amount
+            total_incentive += incentive
+    return table_data, total_net_amount, total_incentive
+
+
+def _draw_header(metrics, c, cursor, source, staff_directory, staff, y_position, header_date, day_of_week, last_day):
+    c.setFont("Helvetica-Bold", 12)
+    c.setFillColorRGB(0.2, 0.2, 0.2)
+    c.drawString(50, y_position, f"Salesman Name: {staff.upper()}    Incentive Date: {header_date} - {day_of_week}")
+
+    if staff_directory.role(staff) == "Helper":
+        metrics.execute(cursor, "helper pool", f"SELECT total_pool FROM {source} WHERE staff_id = ? AND bill_no = 'Helper Pool' AND date_key = ?", (staff_directory.ids[staff], date_key(last_day)))
+        total_pool_data = cursor.fetchone()
+        total_pool = total_pool_data[0] if total_pool_data and total_pool_data[0] is not None else 0.0
+        y_position -= 20
+        c.setFont("Helvetica", 10)
+        c.setFillColorRGB(0, 0, 0)
+        c.drawString(50, y_position, f"Total Helper Pool for the Day: Rs.{total_pool:.2f}")
+    return y_position
+
+
+def _summary_table(metrics, cursor, source, staff_id, date_dt, start_date, last_day, total_net_amount, total_incentive):
+    month_start = date_dt.replace(day=1)
+    metrics.execute(cursor, "month totals", f"SELECT SUM(net_amount), SUM(incentive) FROM {source} WHERE staff_id = ? AND date_key BETWEEN ? AND ?", (staff_id, date_key(month_start), date_key(last_day)))
+    month_totals = cursor.fetchone()
+    total_month_net_amount = month_totals[0] if month_totals and month_totals[0] is not None else 0.0
+    total_month_incentive = month_totals[1] if month_totals and month_totals[1] is not None else 0.0
+    # Adjustments for this PDF's period and for the month so far
+    period_start = date_key(start_date) if start_date else date_key(last_day)
+    month_key = date_key(month_start)
+    metrics.execute(cursor, "adjustments", """SELECT SUM(CASE WHEN date_key >= ? THEN value END), SUM(CASE WHEN date_key >= ? THEN value END)
+                                              FROM adjustments WHERE staff_id = ? AND date_key BETWEEN ? AND ?""",
+                    (period_start, month_key, staff_id, min(period_start, month_key), date_key(last_day)))
+    period_adjustments, month_adjustments = (value or 0.0 for value in cursor.fetchone())
+
+    summary_data = [
+        ["Sale (Current PDF)", f"Rs.{total_net_amount:.2f}"],
+        ["Incentive (Current PDF)", f"Rs.{total_incentive + period_adjustments:.2f}"],
+        ["---", "---"],
+        ["Month Running Sale", f"Rs.{total_month_net_amount:.2f}"],
+        ["Month Running Incentive", f"Rs.{total_month_incentive + month_adjustments:.2f}"],
+    ]
+    if period_adjustments:
+        summary_data.insert(2, ["Adjustments (Current PDF)", f"Rs.{period_adjustments:.2f}"])
+    summary_table = Table(summary_data, colWidths=[100, 80])
+    summary_table.setStyle(SUMMARY_TABLE_STYLE)
+    return summary_table
+
+
+def _draw_footer(c, width, page_number):
+    c.setFillColorRGB(0.2, 0.2, 0.2)
+    c.setLineWidth(0.5)
+    c.line(50, 50, width - 50, 50)
+    c.setFont("Helvetica", 10)
+    c.drawString(50, 35, f"Page {page_number} of 1")
+    c.drawRightString(width - 50, 35, "Generated by KNORKA 1.0")
+
+
+# Original PDF Generation (Restored)
+def generate_pdfs_to_folder(conn, selected_date=None, start_date=None, end_date=None, report_date=None, pdfs_dir=PDFS_DIR, profile=False):
+    """Write one password-protected PDF per staff member under ``pdfs_dir``.
+
+    Returns ``(written_paths, errors)``; a staff member whose report fails is
+    skipped and the error message collected.
+    """
+    with track_run(conn, "pdfs", profile) as metrics:
+        return _generate_pdfs_to_folder(conn, metrics, selected_date, start_date, end_date, report_date, pdfs_dir)
+
+
+def _generate_pdfs_to_folder(conn, metrics, selected_date, start_date, end_date, report_date, pdfs_dir):
+    cursor = conn.cursor()
+    if not selected_date and not start_date and not report_date:
+        report_date = latest_report_date(conn)
+    date_to_use, last_day, date_dt, header_date = _report_period(selected_date, start_date, end_date, report_date)
+    day_of_week = date_dt.strftime("%A").upper()
+    source = _report_source(conn, date_dt, start_date, last_day)
+    written, errors = [], []
+
+    staff_directory = directory(conn)
+    for staff in staff_directory.known_staff:
+        staff_id = staff_directory.ids[staff]
+        staff_dir = os.path.join(pdfs_dir, staff)
+        os.makedirs(staff_dir, exist_ok=True)
+
+        temp_path = os.path.join(staff_dir, f"{staff}_temp_incentive_report.pdf")
+        output_path = os.path.join(staff_dir, f"{staff}_{date_to_use}_incentive_report.pdf")
+        try:
+            c = canvas.Canvas(temp_path, pagesize=letter)
+        except Exception as e:
+            errors.append(f"Error creating canvas for {staff}: {e}")
+            continue
+
+        width, height = letter
+        page_number = 1
+        with metrics.stage("query"):
+            y_position = _draw_header(metrics, c, cursor, source, staff_directory, staff, height - 70, header_date, day_of_week, last_day)
+            try:
+                bill_data = _bill_rows(metrics, cursor, source, staff_id, date_to_use, start_date, end_date)
+            except Exception as e:
+                errors.append(f"Error querying data for {staff}: {e}")
+                bill_data = []
+        table_data, total_net_amount, total_incentive = _bill_table(bill_data)
+
+        if not bill_data:
+            y_position -= 40
+            c.setFont("Helvetica", 10)
+            c.setFillColorRGB(0.5, 0.5, 0.5)
+            c.drawString(50, y_position, f"No data available for {staff} on {header_date}")
+        else:
+            try:
+                with metrics.stage("render"):
+                    table = Table(table_data, colWidths=[70, 100, 50, 60, 60, 80, 50, 60])
+                    table.setStyle(BILL_TABLE_STYLE)
+                    table.wrapOn(c, width - 100, height)
+                    y_position -= table._height + 20
+                    table.drawOn(c, 50, y_position)
+            except Exception as e:
+                errors.append(f"Error drawing table for {staff}: {e}")
+                continue
+
+        try:
+            with metrics.stage("query"):
+                summary_table = _summary_table(metrics, cursor, source, staff_id, date_dt, start_date, last_day, total_net_amount, total_incentive)
+            summary_table.wrapOn(c, width - 100, height)
+            summary_height = summary_table._height
+            if y_position - summary_height - 20 < 50:
+                c.showPage()
+                y_position = height - 70
+                page_number += 1
+            y_position -= summary_height + 20
+            summary_table.drawOn(c, 50, y_position)
+        except Exception as e:
+            errors.append(f"Error drawing summary table for {staff}: {e}")
+            continue
+
+        _draw_footer(c, width, page_number)
+
+        try:
+            with metrics.stage("render"):
+                c.showPage()
+                c.save()
+            password = staff_directory.passwords.get(staff)
+            with metrics.stage("encrypt"):
+                if password:
+                    encrypt_pdf(temp_path, output_path, password)
+                    os.remove(temp_path)
+                else:
+                    os.replace(temp_path, output_path)
+            written.append(output_path)
+            metrics.count("pdfs_written")
+        except Exception as e:
+            errors.append(f"Error saving PDF for {staff}: {e}")
+
+    for error in errors:
+        logging.error(error)
+    return written, errors
+
+
+# Original Detailed PDF (Restored)
+def generate_detailed_pdf(conn, selected_date=None, start_date=None, end_date=None, report_date=None, profile=False):
+    """Render every staff member's report into one unencrypted PDF and return its bytes."""
+    with track_run(conn, "detailed_pdf", profile) as metrics:
+        return _generate_detailed_pdf(conn, metrics, selected_date, start_date, end_date, report_date)
+
+
+def _generate_detailed_pdf(conn, metrics, selected_date, start_date, end_date, report_date):
+    cursor = conn.cursor()
+    if not selected_date and not start_date and not report_date:
+        report_date = latest_report_date(conn)
+    date_to_use, last_day, date_dt, header_date = _report_period(selected_date, start_date, end_date, report_date)
+    day_of_week = date_dt.strftime("%A").upper()
+    source = _report_source(conn, date_dt, start_date, last_day)
+
+    output = BytesIO()
+    c = canvas.Canvas(output, pagesize=letter)
+    width, height = letter
+    y_position = height - 70
+    page_number = 1
+
+    staff_directory = directory(conn)
+    for staff in staff_directory.known_staff:
+        staff_id = staff_directory.ids[staff]
+        if y_position < 150:
+            c.showPage()
+            page_number += 1
+            y_position = height - 70
+
+        with metrics.stage("query"):
+            y_position = _draw_header(metrics, c, cursor, source, staff_directory, staff, y_position - 40, header_date, day_of_week, last_day)
+            bill_data = _bill_rows(metrics, cursor, source, staff_id, date_to_use, start_date, end_date)
+        table_data, total_net_amount, total_incentive = _bill_table(bill_data)
+
+        if len(table_data) > 1:
+            with metrics.stage("render"):
+                table = Table(table_data, colWidths=[70, 100, 50, 60, 60, 80, 50, 60])
+                table.setStyle(BILL_TABLE_STYLE)
+                table.wrapOn(c, width - 100, height)
+                y_position -= table._height + 20
+                table.drawOn(c, 50, y_position)
+
+        with metrics.stage("query"):
+            summary_table = _summary_table(metrics, cursor, source, staff_id, date_dt, start_date, last_day, total_net_amount, total_incentive)
+        summary_table.wrapOn(c, width - 100, height)
+        summary_height = summary_table._height
+        if y_position - summary_height - 20 < 50:
+            c.showPage()
+            y_position = height - 70
+            page_number += 1
+        y_position -= summary_height + 20
+        summary_table.drawOn(c, 50, y_position)
+
+        _draw_footer(c, width, page_number)
+
+    with metrics.stage("render"):
+        c.showPage()
+        c.save()
+    return output.getvalue()
+
+
+def backup_pdfs(pdfs_dir=PDFS_DIR, backup_dir=None):
+    """Zip the whole PDFs folder; returns the archive path or None if there is nothing to back up."""
+    if not os.path.exists(pdfs_dir):
+        return None
+    backup_dir = backup_dir or os.path.join(os.path.dirname(pdfs_dir), "pdfs_backup")
+    os.makedirs(backup_dir, exist_ok=True)
+    backup_path = os.path.join(backup_dir, f"pdfs_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip")
+    with zipfile.ZipFile(backup_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for root, _, files in os.walk(pdfs_dir):
+            for file in files:
+                zipf.write(os.path.join(root, file), os.path.relpath(os.path.join(root, file), pdfs_dir))
+    return backup_path
+
+
+def compress_pdfs(days_old, pdfs_dir=PDFS_DIR, archive_dir=None):
+    """Move PDFs older than ``days_old`` days into a zip archive; returns its path or None."""
+    if not os.path.exists(pdfs_dir):
+        return None
+    archive_dir = archive_dir or os.path.join(os.path.dirname(pdfs_dir), "pdfs_archive")
+    os.makedirs(archive_dir, exist_ok=True)
+    archive_path = os.path.join(archive_dir, f"pdfs_archive_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip")
+    cutoff = (datetime.now() - timedelta(days=days_old)).timestamp()
+    with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for root, _, files in os.walk(pdfs_dir):
+            for file in files:
+                file_path = os.path.join(root, file)
+                if os.path.getmtime(file_path) < cutoff:
+                    zipf.write(file_path, os.path.relpath(file_path, pdfs_dir))
+                    os.remove(file_path)
+    return archive_path
@@ -0,0 +1,243 @@
+"""Incentive rules: versioned rule sets, the per-line split and a vectorized evaluator.
+
+A rule set is a JSON document (keys as in ``config.default_rules``) stored in
+``rule_sets`` with the date it takes effect. Ingestion applies to each sale
+line the rule set in effect on its bill date. Every ingested line is also
+kept in ``sales_lines``, so :func:`simulate` can replay a period under a
+candidate rule set with whole-column arithmetic and report per-staff deltas
+without writing to ``incentives``.
+"""
+import bisect
+import json
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from fuzzywuzzy import fuzz
+
+from .archive import incentives
+from .config import default_rules, excluded_names
+from .dates import date_key
+
+SIMULATION_COLUMNS = ["Name", "Current", "Simulated", "Delta"]
+
+
+@lru_cache(maxsize=4096)
+def is_special_item(item_name, special_items=tuple(default_rules["special_items"]), score=default_rules["special_item_score"]):
+    """Whether ``item_name`` fuzzily matches one of the helper-pool items."""
+    if not item_name:
+        return False
+    for special_item in special_items:
+        if fuzz.partial_ratio(item_name.lower(), special_item.lower()) >= score:
+            return True
+    return False
+
+
+@dataclass(frozen=True)
+class RuleSet:
+    total_rate: float
+    pool_rate: float
+    pair_rates: tuple
+    junior_agents: frozenset
+    junior_pair_rates: tuple
+    special_items: tuple
+    special_item_score: int
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a rule set from a (possibly partial) config; missing keys keep their default. Raises ValueError."""
+        unknown = set(config) - set(default_rules)
+        if unknown:
+            raise ValueError(f"Unknown rule keys: {', '.join(sorted(unknown))}")
+        merged = {**default_rules, **config}
+        try:
+            rates = {key: float(merged[key]) for key in ("total_rate", "pool_rate")}
+            pairs = {key: tuple(float(rate) for rate in merged[key]) for key in ("pair_rates", "junior_pair_rates")}
+            score = int(merged["special_item_score"])
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid rule value: {e}") from e
+        if any(rate < 0 for rate in [*rates.values(), *pairs["pair_rates"], *pairs["junior_pair_rates"]]):
+            raise ValueError("Rates cannot be negative")
+        if any(len(pair) != 2 for pair in pairs.values()):
+            raise ValueError("pair_rates and junior_pair_rates need one rate per agent")
+        return cls(junior_agents=frozenset(name.lower() for name in merged["junior_agents"]),
+                   special_items=tuple(merged["special_items"]), special_item_score=score, **rates, **pairs)
+
+    def to_config(self):
+        return {"total_rate": self.total_rate, "pool_rate": self.pool_rate, "pair_rates": list(self.pair_rates),
+                "junior_agents": sorted(self.junior_agents), "junior_pair_rates": list(self.junior_pair_rates),
+                "special_items": list(self.special_items), "special_item_score": self.special_item_score}
+
+    def is_special(self, item_name):
+        return is_special_item(item_name, self.special_items, self.special_item_score)
+
+    def evaluate(self, lines):
+        """Split every sale line at once.
+
+        ``lines`` has ``net_amount``, ``item_name``, ``agent`` and
+        ``other_agent`` columns; returns the agent's and other agent's
+        incentive and the pool contribution per line, exactly as
+        :func:`calculate_incentive` would.
+        """
+        net = lines["net_amount"].to_numpy(dtype=float)
+        items = lines["item_name"]
+        special = items.map({item: self.is_special(item) for item in pd.unique(items.dropna())}).fillna(False).to_numpy(dtype=bool)
+        agent, other = lines["agent"], lines["other_agent"]
+        first = (agent.notna() & ~agent.str.lower().isin(excluded_names)).to_numpy()
+        second = other.notna().to_numpy()
+        pair = first & second & ~other.str.lower().isin(excluded_names).to_numpy()
+        junior = other.str.lower().isin(self.junior_agents).to_numpy()
+        total = net * self.total_rate
+        pool = net * self.pool_rate
+        agent_share = np.where(junior, net * self.junior_pair_rates[0], net * self.pair_rates[0])
+        other_share = np.where(junior, net * self.junior_pair_rates[1], net * self.pair_rates[1])
+        agent_incentive = np.where(first & ~second, total - pool, np.where(pair, agent_share, 0.0))
+        other_incentive = np.where(pair, other_share, 0.0)
+        # The same agent on both sides keeps only the second agent's share
+        same = pair & (agent == other).to_numpy()
+        agent_incentive = np.where(same, other_incentive, agent_incentive)
+        other_incentive = np.where(same, 0.0, other_incentive)
+        return pd.DataFrame({"agent_incentive": np.where(special, 0.0, agent_incentive),
+                             "other_incentive": np.where(special, 0.0, other_incentive),
+                             "pool": np.where(special, total, pool)}, index=lines.index)
+
+
+DEFAULT_RULES = RuleSet.from_config(default_rules)
+
+
+@dataclass
+class RuleBook:
+    """Rule sets by the date_key they take effect from, oldest first."""
+    starts: list = field(default_factory=list)
+    rule_sets: list = field(default_factory=list)
+
+    def at(self, key):
+        i = bisect.bisect_right(self.starts, key)
+        return self.rule_sets[i - 1] if i else DEFAULT_RULES
+
+    def evaluate(self, lines):
+        """:meth:`RuleSet.evaluate` with each line under the rule set in effect on its ``date_key``."""
+        if not self.rule_sets:
+            return DEFAULT_RULES.evaluate(lines)
+        ends = self.starts[1:] + [None]
+        parts = [DEFAULT_RULES.evaluate(lines[lines["date_key"] < self.starts[0]])]
+        for start, end, rules in zip(self.starts, ends, self.rule_sets):
+            in_effect = lines["date_key"] >= start
+            if end is not None:
+                in_effect &= lines["date_key"] < end
+            parts.append(rules.evaluate(lines[in_effect]))
+        return pd.concat(parts).reindex(lines.index)
+
+
+def load_rule_book(conn):
+    book = RuleBook()
+    for effective_from, config in conn.execute("SELECT effective_from, config FROM rule_sets ORDER BY effective_from"):
+        book.starts.append(effective_from)
+        book.rule_sets.append(RuleSet.from_config(json.loads(config)))
+    return book
+
+
+def add_rule_set(conn, name, effective_from, config, author=""):
+    """Store a rule set taking effect on ``effective_from`` (a date); replaces one starting the same day.
+
+    Only files ingested afterwards use it; stored incentives are not recomputed.
+    """
+    rules = RuleSet.from_config(config)
+    key = date_key(effective_from)
+    conn.execute("INSERT OR REPLACE INTO rule_sets (name, effective_from, config, author, created_at) VALUES (?, ?, ?, ?, ?)",
+                 (name, key, json.dumps(rules.to_config()), author, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+    conn.commit()
+    logging.info(f"Added rule set {name!r} effective from {key}")
+    return rules
+
+
+def rule_sets(conn):
+    """Return ``(effective_from, name, author, created_at, config)`` of every rule set, newest first."""
+    return conn.execute("""SELECT CASE effective_from WHEN 0 THEN 'Start'
+                                  ELSE printf('%02d-%02d-%04d', effective_from % 100, effective_from / 100 % 100, effective_from / 10000) END,
+                                  name, author, created_at, config
+                           FROM rule_sets ORDER BY effective_from DESC""").fetchall()
+
+
+def sales_lines(conn, start_date, end_date):
+    """Stored sale lines in the range with their agents' names."""
+    return pd.read_sql_query("""SELECT sales_lines.date_key, item_name, net_amount, agent.name AS agent, other.name AS other_agent
+                                FROM sales_lines LEFT JOIN staff AS agent ON agent.id = sales_lines.agent_id
+                                LEFT JOIN staff AS other ON other.id = sales_lines.other_agent_id
+                                WHERE sales_lines.date_key BETWEEN ? AND ?""",
+                             conn, params=(date_key(start_date), date_key(end_date)))
+
+
+def _by_staff(lines, split):
+    totals = split["agent_incentive"].groupby(lines["agent"]).sum()
+    return totals.add(split["other_incentive"].groupby(lines["other_agent"]).sum(), fill_value=0.0)
+
+
+def simulate(conn, candidate, start_date, end_date):
+    """Replay the range's sale lines under ``candidate`` (a RuleSet or config dict) instead of the rules in effect.
+
+    Returns ``(name, current, simulated, delta)`` per staff member, largest
+    change first. "Current" re-evaluates the same lines under the stored rule
+    sets, so the delta is only the rule change. Helper pool shares are scaled
+    by the change in the pool.
+    """
+    if not isinstance(candidate, RuleSet):
+        candidate = RuleSet.from_config(candidate)
+    lines = sales_lines(conn, start_date, end_date)
+    current = load_rule_book(conn).evaluate(lines)
+    simulated = candidate.evaluate(lines)
+    current_totals, simulated_totals = _by_staff(lines, current), _by_staff(lines, simulated)
+    pool_shares = dict(conn.execute(f"""SELECT name, SUM(incentive) FROM {incentives(conn, start_date, end_date)}
+                                       WHERE bill_no = 'Helper Pool' AND date_key BETWEEN ? AND ? GROUP BY name""",
+                                    (date_key(start_date), date_key(end_date))).fetchall())
+    pool_before, pool_after = current["pool"].sum(), simulated["pool"].sum()
+    scale = float(pool_after / pool_before) if pool_before > 0 else 1.0
+    rows = []
+    for name in sorted(set(current_totals.index) | set(simulated_totals.index) | set(pool_shares)):
+        before = float(current_totals.get(name, 0.0) + pool_shares.get(name, 0.0))
+        after = float(simulated_totals.get(name, 0.0) + pool_shares.get(name, 0.0) * scale)
+        rows.append((name, before, after, after - before))
+    return sorted(rows, key=lambda row: abs(row[3]), reverse=True)
+
+
+# Commission Rules
+def calculate_incentive(salesman1, salesman2, helper, gross, item_name, net_amount, rules=DEFAULT_RULES):
+    """Split one sale line's incentive between the agents on it under ``rules``.
+
+    Returns ``(incentives, net_amounts, pool_contribution)``; the caller adds
+    ``pool_contribution`` to the day's helper pool.
+    """
+    total_incentive = net_amount * rules.total_rate
+    incentives = {}
+    net_amounts = {}
+
+    if rules.is_special(item_name):
+        logging.info(f"{item_name} matched as special item, added {total_incentive} to helper pool")
+        return incentives, net_amounts, total_incentive
+
+    pool_contribution = net_amount * rules.pool_rate
+    remaining_incentive = total_incentive - pool_contribution
+
+    if salesman1 and not salesman2 and not helper:
+        if salesman1.lower() not in excluded_names:
+            incentives[salesman1] = remaining_incentive
+            net_amounts[salesman1] = net_amount
+    elif salesman1 and salesman2:
+        if salesman1.lower() not in excluded_names and salesman2.lower() not in excluded_names:
+            net_amounts[salesman1] = net_amount
+            net_amounts[salesman2] = net_amount
+            if salesman2.lower() in rules.junior_agents:
+                incentives[salesman1] = net_amount * rules.junior_pair_rates[0]
+                incentives[salesman2] = net_amount * rules.junior_pair_rates[1]
+            else:
+                incentives[salesman1] = net_amount * rules.pair_rates[0]
+                incentives[salesman2] = net_amount * rules.pair_rates[1]
+    elif helper and not salesman1 and not salesman2:
+        if helper.lower() not in excluded_names:
+            incentives[helper] = remaining_incentive
+            net_amounts[helper] = net_amount
+
+    return incentives, net_amounts, pool_contribution
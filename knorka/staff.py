@@ -0,0 +1,114 @@
+"""Staff dimension: ids, spellings, role history and report passwords.
+
+Staff live in the ``staff``, ``staff_aliases`` and ``staff_roles`` tables
+(seeded from ``config`` on first migration) and are read through a
+:class:`StaffDirectory` cached per ``staff_version``, so lookups never touch
+the database once loaded. A role change appends to ``staff_roles`` with the
+date it takes effect; ledger rows keep the role they were recorded with.
+
+Ledger rows reference staff by ``staff_id`` (queries filter and join on it)
+but also keep the name, role and second agent as text, as they were paid:
+archives and exports stay readable on their own, so rows are a little wider
+than before rather than narrower.
+"""
+import bisect
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from .config import excluded_names
+from .dates import date_key
+from .db import VersionedCache, bump_staff_version, staff_version
+
+_cache = VersionedCache(staff_version)
+
+
+@dataclass
+class StaffDirectory:
+    ids: dict = field(default_factory=dict)  # canonical name -> id, in id order
+    passwords: dict = field(default_factory=dict)
+    aliases: dict = field(default_factory=dict)  # lower-cased spelling -> canonical name
+    history: dict = field(default_factory=dict)  # id -> [(effective_from date_key, role)], oldest first
+
+    @property
+    def names(self):
+        return {staff_id: name for name, staff_id in self.ids.items()}
+
+    @property
+    def known_staff(self):
+        """Staff who earn incentives, in the order they were added."""
+        return [name for name in self.ids if name not in excluded_names]
+
+    @property
+    def helpers(self):
+        return [name.lower() for name in self.ids if self.role(name) == "Helper"]
+
+    def role(self, name, on=None):
+        """Role of ``name`` on the ``on`` date key (default: today), or "Staff" when unknown."""
+        history = self.history.get(self.ids.get(name))
+        if not history:
+            return "Staff"
+        if on is None:
+            on = date_key(datetime.now())
+        i = bisect.bisect_right([start for start, _ in history], on)
+        return history[max(i - 1, 0)][1]
+
+    def resolve(self, spelling):
+        """Canonical name of a known staff member for an exact (case-insensitive) spelling, or None."""
+        return self.aliases.get(spelling.lower()) if spelling else None
+
+
+def load_directory(conn):
+    directory = StaffDirectory()
+    for staff_id, name, password in conn.execute("SELECT id, name, password FROM staff WHERE active = 1 ORDER BY id"):
+        directory.ids[name] = staff_id
+        directory.passwords[name] = password
+    names = directory.names
+    for alias, staff_id in conn.execute("SELECT alias, staff_id FROM staff_aliases"):
+        if staff_id in names and names[staff_id] not in excluded_names:
+            directory.aliases[alias.lower()] = names[staff_id]
+    for staff_id, effective_from, role in conn.execute(
+            "SELECT staff_id, effective_from, role FROM staff_roles ORDER BY staff_id, effective_from"):
+        directory.history.setdefault(staff_id, []).append((effective_from, role))
+    return directory
+
+
+def directory(conn):
+    """The shared :class:`StaffDirectory`, reloaded only after a staff change."""
+    return _cache.get(conn, "directory", lambda: load_directory(conn))
+
+
+def add_staff(conn, name, role="Salesman", password=None):
+    """Persist a new staff member; returns False when the name is empty or taken."""
+    if not name or conn.execute("SELECT 1 FROM staff WHERE name = ?", (name,)).fetchone():
+        return False
+    staff_id = conn.execute("INSERT INTO staff (name, password) VALUES (?, ?)", (name, password)).lastrowid
+    conn.execute("INSERT INTO staff_aliases VALUES (?, ?)", (name.lower(), staff_id))
+    conn.execute("INSERT INTO staff_roles VALUES (?, 0, ?)", (staff_id, role))
+    bump_staff_version(conn)
+    conn.commit()
+    return True
+
+
+def _staff_id(conn, name):
+    row = conn.execute("SELECT id FROM staff WHERE name = ?", (name,)).fetchone()
+    if row is None:
+        raise ValueError(f"Unknown staff member {name!r}")
+    return row[0]
+
+
+def set_role(conn, name, role, effective_from=None):
+    """Record that ``name`` has ``role`` from ``effective_from`` (a date, default: from the start).
+
+    Raises ValueError when no staff member has that name.
+    """
+    key = date_key(effective_from) if effective_from else 0
+    conn.execute("INSERT OR REPLACE INTO staff_roles VALUES (?, ?, ?)", (_staff_id(conn, name), key, role))
+    bump_staff_version(conn)
+    conn.commit()
+
+
+def add_alias(conn, alias, name):
+    """Map an ERP spelling to a staff member, ahead of fuzzy matching; raises ValueError for an unknown name."""
+    conn.execute("INSERT OR REPLACE INTO staff_aliases VALUES (?, ?)", (alias.lower(), _staff_id(conn, name)))
+    bump_staff_version(conn)
+    conn.commit()
@@ -0,0 +1,104 @@
+"""Row validation of ERP exports and the rejects table.
+
+Each check runs as a boolean mask over the whole sheet, in the order the
+ingestion always applied them: missing data, unreadable bill date, lines
+booked to NIL, then agents that match no staff member (each distinct
+spelling is matched once). Rejected rows are stored in bulk in ``rejects``
+with their reason code and the ingest run's id, so an upload's excluded
+volume can be read back with :func:`upload_summary` instead of from the log.
+A NIL line pays no agent but, when its other agent is a staff member, still
+feeds the helper pool (``feeds_pool`` in the rejects frame).
+"""
+import pandas as pd
+
+# Reason codes stored in rejects.reason, in the order the checks run
+REASONS = {
+    "missing_data": "Missing bill date, bill no., item name or gross amount",
+    "bad_date": "Unreadable bill date",
+    "nil_agent": "Booked to NIL",
+    "unmatched_agent": "No agent matches a staff member",
+}
+SUMMARY_COLUMNS = ["Reason", "Rows", "Net Amount"]
+UNMATCHED_COLUMNS = ["Spelling", "Rows", "Net Amount"]
+# Excel row of the first data row: two title rows and the header come first
+FIRST_SHEET_ROW = 4
+INSERT_REJECT = """INSERT INTO rejects (run_id, company, file_name, sheet_row, reason, date_key, bill_no, item_name, agent,
+                                       other_agent, gross, net_amount)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+
+def _column(df, name, default=None):
+    return df[name] if name in df else pd.Series(default, index=df.index, dtype=object if default is None else float)
+
+
+def _matched(names, matcher):
+    """Staff name for every spelling in ``names`` (None when unmatched), matching each distinct spelling once."""
+    lower = names.map(lambda name: name.lower() if isinstance(name, str) and name else None)
+    spellings = {spelling: matcher.match(spelling) for spelling in pd.unique(lower.dropna())}
+    matched = lower.map(spellings).astype(object)
+    return matched.where(matched.notna(), None)
+
+
+def validate(df, bill_dates, matcher):
+    """Split a cleaned sales sheet into the rows to price and the rejected ones.
+
+    Returns ``(valid, agents, other_agents, rejects)``: the valid rows of
+    ``df``, their matched agents (None where unmatched) and a frame of the
+    rejected rows with ``reason`` and ``feeds_pool`` columns.
+    """
+    gross = _column(df, "GROSS AMOUNT", 0.0)
+    reasons = pd.Series(None, index=df.index, dtype=object)
+    missing = (_column(df, "BILL DATE").isna() | gross.isna() | gross.eq(0)
+               | _column(df, "BILL NO.").isna() | _column(df, "ITEM NAME").isna())
+    reasons[missing] = "missing_data"
+    reasons[reasons.isna() & bill_dates.keys.eq(0)] = "bad_date"
+    # NIL is not a staff member, so it is recognised on the raw spelling before matching
+    nil = _column(df, "AGENT NAME").map(lambda name: isinstance(name, str) and name.strip().lower() == "nil")
+    reasons[reasons.isna() & nil.astype(bool)] = "nil_agent"
+
+    pending = reasons.isna()
+    agents = _matched(_column(df, "AGENT NAME")[pending], matcher).reindex(df.index)
+    other_agents = _matched(_column(df, "OTHER AGENT NAME")[pending | reasons.eq("nil_agent")], matcher).reindex(df.index)
+    reasons[pending & agents.isna() & other_agents.isna()] = "unmatched_agent"
+
+    valid = reasons.isna()
+    feeds_pool = reasons.eq("nil_agent") & other_agents.notna()
+    rejects = df.loc[~valid].assign(reason=reasons[~valid], feeds_pool=feeds_pool[~valid])
+    return df[valid], agents[valid], other_agents[valid], rejects
+
+
+def reject_rows(rejects, bill_dates, company, file_name):
+    """Rows for ``INSERT_REJECT`` (without the run id) from the rejects frame of :func:`validate`."""
+    gross = _column(rejects, "GROSS AMOUNT", 0.0)
+    net = rejects["NET AMOUNT"] if "NET AMOUNT" in rejects else rejects["NET AMT"] if "NET AMT" in rejects else gross * 0.95
+    frame = pd.DataFrame({
+        "sheet_row": rejects.index + FIRST_SHEET_ROW,
+        "reason": rejects["reason"],
+        "date_key": bill_dates.keys.reindex(rejects.index),
+        "bill_no": _column(rejects, "BILL NO.").map(lambda value: None if pd.isna(value) else str(value)),
+        "item_name": _column(rejects, "ITEM NAME").map(lambda value: None if pd.isna(value) else str(value)),
+        "agent": _column(rejects, "AGENT NAME"),
+        "other_agent": _column(rejects, "OTHER AGENT NAME"),
+        "gross": pd.to_numeric(gross, errors="coerce"),
+        "net_amount": pd.to_numeric(net, errors="coerce"),
+    }, index=rejects.index)
+    frame = frame.astype(object).where(frame.notna(), None)
+    return [(company, file_name, int(row[0]), row[1], int(row[2] or 0), *row[3:]) for row in frame.itertuples(index=False)]
+
+
+def upload_summary(conn, run_id):
+    """``(reason, rows, net_amount)`` of one ingest run's rejects, in check order."""
+    counts = {reason: (rows, net or 0.0) for reason, rows, net in conn.execute(
+        "SELECT reason, COUNT(*), SUM(net_amount) FROM rejects WHERE run_id = ? GROUP BY reason", (run_id,))}
+    return [(REASONS[reason], *counts[reason]) for reason in REASONS if reason in counts]
+
+
+def top_unmatched(conn, run_id, limit=10):
+    """``(spelling, rows, net_amount)`` of the most frequent agent spellings that matched no staff member."""
+    return conn.execute("""SELECT spelling, COUNT(*), COALESCE(SUM(net_amount), 0) FROM (
+                               SELECT agent AS spelling, net_amount FROM rejects
+                               WHERE run_id = ? AND reason = 'unmatched_agent' AND agent IS NOT NULL
+                               UNION ALL
+                               SELECT other_agent, net_amount FROM rejects
+                               WHERE run_id = ? AND reason = 'unmatched_agent' AND other_agent IS NOT NULL)
+                           GROUP BY spelling ORDER BY COUNT(*) DESC, spelling LIMIT ?""", (run_id, run_id, limit)).fetchall()
@@ -0,0 +1,188 @@
+"""Watch-folder ingestion of Logic ERP exports.
+
+``python -m knorka watch DIR`` polls DIR for the day's exports (classified by
+:func:`ingest.determine_company`) and attendance sheet. A file is only used
+once two polls have seen the same size and modification time and it is at
+least ``settle`` seconds old, so exports still being written or synced (sync
+clients may keep an old modification time) are left alone. As soon as every
+company's export and the attendance sheet are in (or no new export has
+arrived for ``batch_timeout`` seconds), the batch goes through
+:func:`ingest.process_files`, the files move to ``processed/`` (``failed/``
+with the error when ingestion refuses them) and the day's per-staff PDFs
+are rendered. An export arriving after its batch went in without it is
+ingested with that batch's attendance sheet; one left without an attendance
+sheet for ``batch_timeout`` seconds goes to ``failed/``. In multi-branch mode
+each branch's files (``NTH_LS_Sales.xlsx``, ``NTH_Attendance.xlsx``) form
+their own batch and go to the branch's database.
+"""
+import logging
+import os
+import shutil
+import time
+from datetime import datetime
+
+from . import branches
+from .config import DB_PATH, PDFS_DIR, company_prefixes
+from .ingest import IngestError, determine_branch, determine_company, process_files
+from .reports import generate_pdfs_to_folder
+
+EXTENSIONS = (".xlsx", ".xls")
+# Office lock files, hidden files and partial downloads
+IGNORED_PREFIXES = ("~$", ".")
+IGNORED_SUFFIXES = (".tmp", ".part", ".crdownload")
+PROCESSED_DIR = "processed"
+FAILED_DIR = "failed"
+
+
+def classify(path):
+    """"erp", "attendance" or None for a file in the watch folder."""
+    name = os.path.basename(path)
+    if name.startswith(IGNORED_PREFIXES) or name.lower().endswith(IGNORED_SUFFIXES) or not name.lower().endswith(EXTENSIONS):
+        return None
+    if determine_company(name) != "Unknown":
+        return "erp"
+    if "attendance" in name.lower():
+        return "attendance"
+    return None
+
+
+class FolderWatcher:
+    """Polls one folder and ingests each complete batch of exports found in it."""
+
+    def __init__(self, conn, folder, settle=10.0, batch_timeout=120.0, pdfs_dir=PDFS_DIR, render_pdfs=True, main_db=DB_PATH):
+        self.conns = {None: conn}  # by branch code; None is the main store
+        self.main_db = main_db  # branch databases are next to it
+        self.folder = folder
+        self.settle = settle
+        self.batch_timeout = batch_timeout
+        self.pdfs_dir = pdfs_dir
+        self.render_pdfs = render_pdfs
+        self.signatures = {}  # path -> (size, mtime) at the previous poll
+        self.partial = {}  # branch -> (attendance sheet in processed/, companies whose export is missing) of the last batch
+        self.ignored = set()
+
+    def stable_files(self, now=None):
+        """Return ``{path: (kind, mtime)}`` of the files that have stopped changing."""
+        now = now or time.time()
+        stable, signatures = {}, {}
+        for entry in os.scandir(self.folder):
+            if not entry.is_file():
+                continue
+            kind = classify(entry.path)
+            if kind is None:
+                if entry.path not in self.ignored:
+                    self.ignored.add(entry.path)
+                    logging.info(f"Watch folder: ignoring {entry.name}")
+                continue
+            stat = entry.stat()
+            signature = signatures[entry.path] = (stat.st_size, stat.st_mtime)
+            unchanged = self.signatures.get(entry.path) == signature
+            if stat.st_size > 0 and unchanged and now - stat.st_mtime >= self.settle:
+                stable[entry.path] = (kind, stat.st_mtime)
+        self.signatures = signatures
+        return stable
+
+    def ready_batch(self, now=None):
+        """``(branch, erp_files, attendance_files)`` of a batch that is complete or has waited long enough, else None.
+
+        Exports the branch's last batch went in without come with that
+        batch's attendance sheet; exports left without any after
+        ``batch_timeout`` come with none (and are moved to ``failed/``).
+        """
+        now = now or time.time()
+        by_branch = {}
+        for path, (kind, mtime) in self.stable_files(now).items():
+            by_branch.setdefault(determine_branch(path), {})[path] = (kind, mtime)
+        for code, stable in sorted(by_branch.items(), key=lambda item: item[0] or ""):
+            erp_files = sorted(path for path, (kind, _) in stable.items() if kind == "erp")
+            attendance_files = sorted(path for path, (kind, _) in stable.items() if kind == "attendance")
+            if not erp_files:
+                continue
+            newest = max(mtime for _, mtime in stable.values())
+            if not attendance_files:
+                attendance, missing = self.partial.get(code, (None, set()))
+                late = [path for path in erp_files if determine_company(path) in missing]
+                if late:
+                    return code, late, [attendance]
+                if now - newest >= self.batch_timeout:
+                    return code, erp_files, []
+                continue
+            companies = {determine_company(path) for path in erp_files}
+            if companies >= set(company_prefixes.values()) or now - newest >= self.batch_timeout:
+                return code, erp_files, attendance_files
+        return None
+
+    def _conn(self, code):
+        if code not in self.conns:
+            self.conns[code] = branches.connect_branch(code, self.main_db)
+        return self.conns[code]
+
+    def _move(self, paths, subdir, note=None):
+        target = os.path.join(self.folder, subdir, datetime.now().strftime("%Y-%m-%d_%H%M%S"))
+        os.makedirs(target, exist_ok=True)
+        for path in paths:
+            shutil.move(path, os.path.join(target, os.path.basename(path)))
+            self.signatures.pop(path, None)
+        if note:
+            with open(os.path.join(target, "error.txt"), "w") as f:
+                f.write(note + "\n")
+        return target
+
+    def process(self, code, erp_files, attendance_files):
+        """Ingest one branch's batch and pre-render its PDFs; returns the IngestResult, or None when it failed."""
+        attendance, missing = self.partial.get(code, (None, set()))
+        late = attendance_files == [attendance]
+        # A late export reuses the attendance sheet already in processed/
+        files = erp_files + ([] if late else attendance_files)
+        error = None
+        if not attendance_files:
+            error = (f"No attendance sheet arrived within {self.batch_timeout:g}s for {', '.join(map(os.path.basename, erp_files))}; "
+                     "drop the export again together with the day's attendance sheet")
+        elif len(attendance_files) > 1:
+            error = f"More than one attendance sheet: {', '.join(map(os.path.basename, attendance_files))}"
+        if error:
+            logging.error(f"Watch folder: {error}")
+            self._move(files, FAILED_DIR, error)
+            return None
+        try:
+            result = process_files(self._conn(code), erp_files, attendance_files[0])
+        except IngestError as e:
+            logging.error(f"Watch folder: {e}")
+            self._move(files, FAILED_DIR, str(e))
+            return None
+        target = self._move(files, PROCESSED_DIR)
+        companies = {determine_company(path) for path in erp_files}
+        missing = missing - companies if late else set(company_prefixes.values()) - companies
+        if missing:
+            attendance = attendance if late else os.path.join(target, os.path.basename(attendance_files[0]))
+            self.partial[code] = (attendance, missing)
+        else:
+            self.partial.pop(code, None)
+        branch = f" of {branches.name(code)}" if code else ""
+        logging.info(f"Watch folder: ingested {result.rows_processed} rows from {len(erp_files)} exports{branch}, moved to {target}")
+        if self.render_pdfs:
+            pdfs_dir = branches.pdfs_dir(code) if code else self.pdfs_dir
+            written, errors = generate_pdfs_to_folder(self._conn(code), report_date=result.report_date, pdfs_dir=pdfs_dir)
+            logging.info(f"Watch folder: rendered {len(written)} PDFs for {result.report_date} in {pdfs_dir}")
+            result.warnings.extend(errors)
+        return result
+
+    def poll(self, now=None):
+        """One pass over the folder; returns the IngestResult of a processed batch, or None."""
+        batch = self.ready_batch(now)
+        return self.process(*batch) if batch else None
+
+    def run(self, interval=5.0, once=False, on_result=None):
+        """Poll every ``interval`` seconds until interrupted (or a single pass with ``once``)."""
+        logging.info(f"Watching {self.folder} for ERP exports")
+        if once:
+            # Files only count as stable once two polls saw them unchanged
+            self.stable_files()
+            time.sleep(interval)
+        while True:
+            result = self.poll()
+            if result is not None and on_result:
+                on_result(result)
+            if once:
+                return result
+            time.sleep(interval)
@@ -0,0 +1,41 @@
+import os
+import sys
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+BENCHMARKS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+sys.path.insert(0, BENCHMARKS)
+
+from synthetic import SALES_COLUMNS, write_attendance_workbook, write_dataset  # noqa: E402
+
+from knorka.db import connect  # noqa: E402
+
+
+def write_sales(path, lines, title="LIFE STYLE"):
+    """An ERP export of ``lines``: ``(bill_no, item_name, net_amount, agent, other_agent)`` on 01-03-2025."""
+    records = [[i, "01/03/2025", bill_no, f"IC{i}", f"AIC{i}", item_name, 1.0, net, net, net, agent, other]
+               for i, (bill_no, item_name, net, agent, other) in enumerate(lines, start=1)]
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        pd.DataFrame(records, columns=SALES_COLUMNS).to_excel(writer, index=False, startrow=2)
+        writer.sheets["Sheet1"].cell(row=1, column=1, value=title)
+    return str(path)
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = connect(str(tmp_path / "incentives.db"))
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def attendance(tmp_path):
+    return write_attendance_workbook(str(tmp_path / "Attendance.xlsx"), day=datetime(2025, 3, 1))
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    """A synthetic day: ``(erp_paths, attendance_path)`` with 300 lines per company."""
+    return write_dataset(str(tmp_path / "data"), 300, start=datetime(2025, 3, 1))
@@ -0,0 +1,49 @@
+from datetime import date
+
+from knorka import activity, staff
+from knorka.db import bump_ledger_version, connect
+
+
+def test_special_items_count_as_sales():
+    """A salesman whose only lines of the day were special items has no incentives row but did sell."""
+    conn = connect(":memory:")
+    gaurav, vivek = (conn.execute("SELECT id FROM staff WHERE name = ?", (name,)).fetchone()[0] for name in ("Gaurav", "Vivek"))
+    activity.record_attendance(conn.cursor(), [(staff_id, key, "P") for staff_id in (gaurav, vivek) for key in (20250303, 20250304)])
+    conn.executemany("INSERT INTO sales_lines (date_key, item_name, agent_id, other_agent_id) VALUES (?, 'Alteration', ?, ?)",
+                     [(20250303, gaurav, None), (20250304, None, vivek)])
+    rows = {row[0]: row for row in activity.streaks(conn, date(2025, 3, 3), date(2025, 3, 9))}
+    assert rows["Gaurav"][1:4] == (2, 1, 1)
+    assert rows["Vivek"][1:4] == (2, 1, 1)
+
+
+def test_streaks_and_weekly_alerts():
+    conn = connect(":memory:")
+    ids = {name: conn.execute("SELECT id FROM staff WHERE name = ?", (name,)).fetchone()[0] for name in ("Gaurav", "Vivek", "Sahil")}
+    week = range(20250303, 20250310)
+    activity.record_attendance(conn.cursor(), [(ids[name], key, "L" if name == "Vivek" and key == 20250305 else "P")
+                                               for name in ids for key in week])
+    conn.executemany("INSERT INTO sales_lines (date_key, item_name, agent_id) VALUES (?, 'SHIRT', ?)",
+                     [(20250303, ids["Gaurav"]), (20250306, ids["Gaurav"])] + [(key, ids["Vivek"]) for key in week])
+    conn.commit()
+
+    rows = {row[0]: row for row in activity.streaks(conn, date(2025, 3, 3), date(2025, 3, 9))}
+    assert rows["Gaurav"][1:] == (7, 2, 5, 3, 3, "06-03-2025")
+    assert rows["Vivek"][1:] == (6, 6, 0, 0, 0, "09-03-2025")
+    assert rows["Sahil"][1:] == (7, 0, 7, 7, 7, None)
+    assert list(rows)[0] == "Sahil"
+
+    alerts = activity.inactivity_alerts(conn, date(2025, 3, 5), staff.directory(conn))
+    assert alerts == ["Gaurav has not made sales on 5 days present this week!"]
+
+
+def test_streaks_are_cached_per_ledger_version():
+    conn = connect(":memory:")
+    gaurav = conn.execute("SELECT id FROM staff WHERE name = 'Gaurav'").fetchone()[0]
+    activity.record_attendance(conn.cursor(), [(gaurav, 20250303, "P")])
+    conn.commit()
+    assert activity.streaks(conn, date(2025, 3, 3), date(2025, 3, 3))[0][3] == 1
+    conn.execute("INSERT INTO sales_lines (date_key, item_name, agent_id) VALUES (20250303, 'SHIRT', ?)", (gaurav,))
+    assert activity.streaks(conn, date(2025, 3, 3), date(2025, 3, 3))[0][3] == 1
+    bump_ledger_version(conn)
+    conn.commit()
+    assert activity.streaks(conn, date(2025, 3, 3), date(2025, 3, 3))[0][3] == 0
@@ -0,0 +1,45 @@
+from datetime import date
+
+import pytest
+
+from knorka import adjustments, balances, process_files, queries
+
+DAY = date(2025, 3, 1)
+
+
+def _balance(conn, name):
+    return next(row for row in balances.outstanding(conn) if row[0] == name)
+
+
+def _gross(conn, name):
+    return conn.execute("""SELECT SUM(gross) FROM incentives
+                           WHERE name = ? AND date_key = 20250301 AND bill_no != 'Helper Pool'""", (name,)).fetchone()[0]
+
+
+def test_adjustments_reach_the_ledger_and_balances(conn, dataset):
+    process_files(conn, *dataset, workers=1)
+    base = queries.totals_by_staff(conn, DAY)
+    earned, adjusted = _balance(conn, "Gaurav")[1:3]
+
+    assert adjustments.add_adjustments(conn, ["Gaurav", "Vivek"], DAY, amount=50.0, reason="Festival", author="admin") == 2
+    assert adjustments.add_adjustments(conn, ["Gaurav"], DAY, percent=2.0, reason="Target met") == 1
+
+    bonus = 50.0 + _gross(conn, "Gaurav") * 2.0 / 100
+    totals = queries.totals_by_staff(conn, DAY)
+    assert totals["Gaurav"][0] == pytest.approx(base["Gaurav"][0] + bonus, abs=0.01)
+    assert totals["Vivek"][0] == pytest.approx(base["Vivek"][0] + 50.0, abs=0.01)
+    assert _balance(conn, "Gaurav")[1:3] == pytest.approx((earned, adjusted + bonus))
+    assert adjustments.effective_incentive(conn, "Gaurav", DAY) == pytest.approx(base["Gaurav"][0] + bonus, abs=0.01)
+
+
+def test_adjustments_are_append_only(conn, dataset):
+    process_files(conn, *dataset, workers=1)
+    ledger_rows = conn.execute("SELECT rowid, * FROM incentives ORDER BY rowid").fetchall()
+    adjustments.add_adjustments(conn, ["Gaurav"], DAY, amount=-20.0, reason="Return")
+    first = conn.execute("SELECT * FROM adjustments ORDER BY id").fetchall()
+
+    adjustments.set_incentive(conn, "Gaurav", DAY, 500.0, author="admin")
+    assert conn.execute("SELECT rowid, * FROM incentives ORDER BY rowid").fetchall() == ledger_rows
+    rows = conn.execute("SELECT * FROM adjustments ORDER BY id").fetchall()
+    assert rows[:len(first)] == first and len(rows) == len(first) + 1
+    assert adjustments.effective_incentive(conn, "Gaurav", DAY) == pytest.approx(500.0)
@@ -0,0 +1,55 @@
+from datetime import date
+
+import pytest
+
+from knorka import archive, balances, queries
+
+MONTHS = [(2024, month) for month in range(1, 13)] + [(2025, 1)]
+
+
+def _fill(conn):
+    staff_id = conn.execute("SELECT id FROM staff WHERE name = 'Gaurav'").fetchone()[0]
+    conn.executemany("""INSERT INTO incentives (date, name, role, incentive, gross, bill_no, date_key, staff_id)
+                        VALUES (?, 'Gaurav', 'Salesman', ?, ?, ?, ?, ?)""",
+                     [(f"{day:02d}-{month:02d}-{year}", month + day / 100, 100.0 * month, f"{year}{month}{day}",
+                       year * 10000 + month * 100 + day, staff_id)
+                      for year, month in MONTHS for day in (1, 15)])
+    conn.commit()
+
+
+def _total(conn, source=None):
+    return conn.execute(f"SELECT SUM(incentive), COUNT(*) FROM {source or archive.incentives(conn)}").fetchone()
+
+
+def test_more_archives_than_sqlite_attaches(conn, tmp_path):
+    _fill(conn)
+    expected = _total(conn, "incentives")
+    overview = queries.overview_totals(conn, date(2024, 1, 1), date(2025, 1, 31))
+    for year, month in MONTHS:
+        archive.archive_period(conn, f"{year}-{month:02d}", str(tmp_path / "archive"))
+    assert len(archive.partitions(conn)) == 13 > archive.MAX_ATTACHED
+    assert _total(conn, "incentives") == (None, 0)
+
+    assert _total(conn) == pytest.approx(expected)
+    assert queries.overview_totals(conn, date(2024, 1, 1), date(2025, 1, 31)) == pytest.approx(overview)
+    for year, month in MONTHS:
+        assert queries.overview_totals(conn, date(year, month, 1), date(year, month, 28))[1] == pytest.approx(200.0 * month)
+        assert len(archive._attached(conn)) <= archive.MAX_ATTACHED
+    balances.rebuild(conn)
+    assert balances.drift(conn) == []
+
+    assert archive.archive_closed_periods(conn, date(2026, 1, 1), str(tmp_path / "archive")) == {"2024": 0, "2025": 0}
+    assert [partition[1] for partition in archive.partitions(conn)] == ["2024", "2025"]
+    assert _total(conn) == pytest.approx(expected)
+
+
+def test_reading_past_the_limit_commits_nothing(conn, tmp_path):
+    _fill(conn)
+    for year, month in MONTHS:
+        archive.archive_period(conn, f"{year}-{month:02d}", str(tmp_path / "archive"))
+    conn.execute("INSERT INTO payments (date, name, amount) VALUES ('01/03/2025', 'Gaurav', 10.0)")
+    assert conn.in_transaction
+    _total(conn)
+    assert conn.in_transaction
+    conn.rollback()
+    assert conn.execute("SELECT COUNT(*) FROM payments").fetchone()[0] == 0
@@ -0,0 +1,34 @@
+from datetime import date
+
+import pytest
+
+from knorka import adjustments, balances, process_files
+
+
+def _stored(conn):
+    return {name: (earned, adjusted, paid) for name, earned, adjusted, paid, _ in balances.outstanding(conn)}
+
+
+def test_balances_follow_ingest_adjustments_and_payments(conn, dataset):
+    process_files(conn, *dataset, workers=1)
+    adjustments.add_adjustments(conn, ["Gaurav", "Vivek"], date(2025, 3, 1), amount=25.0, percent=1.0, reason="Festival")
+    balances.record_payment(conn, "Gaurav", 100.0, date(2025, 3, 1))
+    assert balances.drift(conn) == []
+
+    incremental = _stored(conn)
+    balances.rebuild(conn)
+    rebuilt = _stored(conn)
+    assert incremental.keys() == rebuilt.keys()
+    for name in rebuilt:
+        assert incremental[name] == pytest.approx(rebuilt[name])
+
+
+def test_reconcile_repairs_drift(conn, dataset):
+    process_files(conn, *dataset, workers=1)
+    expected = _stored(conn)
+    conn.execute("UPDATE staff_balances SET earned = earned + 10 WHERE staff_id = (SELECT id FROM staff WHERE name = 'Vivek')")
+    conn.commit()
+    assert balances.drift(conn) == ["Vivek"]
+    assert balances.reconcile(conn) == ["Vivek"]
+    assert balances.drift(conn) == []
+    assert _stored(conn)["Vivek"] == pytest.approx(expected["Vivek"])
@@ -0,0 +1,39 @@
+import json
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from knorka import process_files
+
+import run_benchmarks
+from synthetic import SALES_COLUMNS, sales_frame, write_sales_workbook
+
+
+def test_synthetic_sales_follow_the_export_layout(tmp_path):
+    path = write_sales_workbook(str(tmp_path / "LS_Sales.xlsx"), "LIFE STYLE", 200, days=3, seed=4)
+    preamble = pd.read_excel(path, header=None, nrows=2)[0].tolist()
+    assert preamble == ["LIFE STYLE", "Sales Register From 01/03/2025 To 03/03/2025"]
+    df = pd.read_excel(path, skiprows=2)
+    assert list(df.columns) == SALES_COLUMNS
+    assert len(df) == 201 and df["SNO."].iloc[-1] == "TOTAL"
+    assert df["GROSS AMOUNT"].iloc[-1] == pytest.approx(df["GROSS AMOUNT"].iloc[:-1].sum())
+    days = {pd.to_datetime(value, dayfirst=True).date() for value in df["BILL DATE"].iloc[:-1].dropna()}
+    assert days <= {datetime(2025, 3, day).date() for day in (1, 2, 3)}
+    pd.testing.assert_frame_equal(sales_frame(200, days=3, seed=4), sales_frame(200, days=3, seed=4))
+
+
+def test_every_synthetic_line_is_ingested_or_rejected(conn, dataset):
+    result = process_files(conn, *dataset, workers=1)
+    lines = conn.execute("SELECT COUNT(*) FROM sales_lines").fetchone()[0]
+    assert lines + sum(rows for _, rows, _ in result.rejected) == 600
+    assert conn.execute("SELECT COUNT(DISTINCT company) FROM sales_lines").fetchone()[0] == 2
+
+
+def test_baseline_ratios(tmp_path, capsys):
+    entry = run_benchmarks.summarize("process_files", 1000, [0.5, 0.25, 0.4])
+    assert (entry["min"], entry["median"], entry["rows_per_sec"]) == (0.25, 0.4, 4000.0)
+    baseline = tmp_path / "bench.json"
+    baseline.write_text(json.dumps({"results": [dict(entry, min=0.5)]}))
+    run_benchmarks.compare([entry], str(baseline))
+    assert capsys.readouterr().out.splitlines()[-1].split() == ["process_files", "1000", "0.5000", "0.2500", "0.50"]
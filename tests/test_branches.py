@@ -0,0 +1,42 @@
+from datetime import datetime
+
+import pytest
+
+from knorka import branches, config, process_files, queries
+from knorka.config import BRANCHES_DIR
+
+from conftest import write_attendance_workbook, write_sales
+
+DAY = datetime(2025, 3, 1)
+
+
+def test_shards_follow_the_main_database(tmp_path, monkeypatch):
+    monkeypatch.setitem(config.branches, "NTH", "North")
+    main_db = str(tmp_path / "store" / "main.db")
+    files = [write_sales(tmp_path / "LS_Sales.xlsx", [("1", "SHIRT", 1000.0, "Gaurav", None)]),
+             write_attendance_workbook(str(tmp_path / "Attendance.xlsx"), day=DAY),
+             write_sales(tmp_path / "NTH_LS_Sales.xlsx", [("1", "SAREE", 3000.0, "Vivek", None),
+                                                          ("2", "JEANS", 2000.0, "Gaurav", None)]),
+             write_attendance_workbook(str(tmp_path / "NTH_Attendance.xlsx"), day=DAY)]
+    routed = branches.route(files)
+    assert {code: len(erp_files) for code, (erp_files, _) in routed.items()} == {None: 1, "NTH": 1}
+    assert routed["NTH"][1].endswith("NTH_Attendance.xlsx")
+
+    totals = {}
+    for code, (erp_files, attendance_file) in routed.items():
+        conn = branches.connect_branch(code, main_db)
+        process_files(conn, erp_files, attendance_file, workers=1)
+        totals[code] = queries.overview_totals(conn, DAY, DAY)
+        conn.close()
+    assert branches.shard_path("NTH", main_db) == str(tmp_path / "store" / "branches" / "nth.db")
+    assert (tmp_path / "store" / "branches" / "nth.db").exists()
+    assert branches.shard_path("NTH") == f"{BRANCHES_DIR}/nth.db"
+    assert totals[None][1] == pytest.approx(1000.0) and totals["NTH"][1] == pytest.approx(5000.0)
+
+    total_incentive, total_gross, rows, _, top_range = branches.overview(DAY, DAY, DAY, main_db)
+    assert rows == [(branches.name(None), *totals[None]), ("North", *totals["NTH"])]
+    assert (total_incentive, total_gross) == pytest.approx(tuple(map(sum, zip(totals[None], totals["NTH"]))))
+    combined = branches.performance(DAY, DAY, DAY, main_db)
+    assert combined["Gaurav"][0] == f"{branches.name(None)}, North"
+    assert combined["Gaurav"][4] == pytest.approx(3000.0)
+    assert top_range[0] in combined
@@ -0,0 +1,25 @@
+from datetime import datetime
+
+import pandas as pd
+
+from knorka.dates import normalize_dates
+
+
+def test_excel_date_column(tmp_path):
+    """A BILL DATE column of real Excel dates comes back from read_excel as datetime64."""
+    path = tmp_path / "dates.xlsx"
+    pd.DataFrame({"BILL DATE": [datetime(2025, 3, 12), None, datetime(2025, 3, 13)], "BILL NO.": [1, 2, 3]}).to_excel(path, index=False)
+    column = pd.read_excel(path)["BILL DATE"]
+    assert pd.api.types.is_datetime64_any_dtype(column)
+
+    result = normalize_dates(column)
+    assert result.keys.tolist() == [20250312, 0, 20250313]
+    assert result.display.tolist() == ["12-03-2025", None, "13-03-2025"]
+    assert result.unparsed == []
+
+
+def test_mixed_date_column():
+    column = pd.Series([datetime(2025, 3, 12), "13/03/2025", "not a date", None], dtype=object)
+    result = normalize_dates(column)
+    assert result.keys.tolist() == [20250312, 20250313, 0, 0]
+    assert result.unparsed == ["not a date"]
@@ -0,0 +1,35 @@
+from knorka import ledger, staff
+from knorka.db import connect, database_id
+
+
+def _sale(conn, name, bill_no):
+    conn.execute("""INSERT INTO incentives (date, name, incentive, gross, bill_no, date_key)
+                    VALUES ('01-03-2025', ?, 1.0, 100.0, ?, 20250301)""", (name, bill_no))
+
+
+def test_caches_tell_in_memory_databases_apart():
+    a, b = connect(":memory:"), connect(":memory:")
+    assert database_id(a) != database_id(b)
+    _sale(a, "Gaurav", "A1")
+    _sale(b, "Vivek", "B1")
+    assert ledger.get_ledger(a)["bill_no"].tolist() == ["A1"]
+    assert ledger.get_ledger(b)["bill_no"].tolist() == ["B1"]
+
+    staff.add_staff(a, "Zoya")
+    assert "Zoya" in staff.directory(a).known_staff
+    assert "Zoya" not in staff.directory(b).known_staff
+
+
+def test_recreated_file_is_a_new_database(tmp_path):
+    path = str(tmp_path / "incentives.db")
+    first = connect(path)
+    _sale(first, "Gaurav", "A1")
+    first.commit()
+    assert ledger.get_ledger(first)["bill_no"].tolist() == ["A1"]
+    first.close()
+
+    (tmp_path / "incentives.db").unlink()
+    second = connect(path)
+    _sale(second, "Vivek", "B1")
+    second.commit()
+    assert ledger.get_ledger(second)["bill_no"].tolist() == ["B1"]
@@ -0,0 +1,59 @@
+import io
+from datetime import date
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from knorka import exports, process_files, queries
+from knorka.db import connect
+
+DAY = date(2025, 3, 1)
+
+
+def test_full_sheet_continues(tmp_path, monkeypatch):
+    monkeypatch.setattr(exports, "EXCEL_MAX_ROWS", 3)
+    conn = connect(":memory:")
+    conn.executemany("INSERT INTO incentives (date, name, incentive, gross, bill_no, date_key) VALUES ('01-03-2025', 'Gaurav', 1.0, 100.0, ?, 20250301)",
+                     [(str(i),) for i in range(5)])
+    path = tmp_path / "ledger.xlsx"
+    assert exports.write_excel(conn, str(path), date(2025, 3, 1), date(2025, 3, 1)) == 5
+
+    workbook = openpyxl.load_workbook(path, read_only=True)
+    assert workbook.sheetnames == ["Ledger", "Ledger (2)", "Ledger (3)"]
+    rows = [row for sheet in workbook for row in sheet.iter_rows(min_row=2, values_only=True)]
+    assert len(rows) == 5
+
+
+def test_formats_agree_with_the_ledger(conn, dataset, tmp_path, monkeypatch):
+    monkeypatch.setattr(exports, "EXPORT_BATCH_ROWS", 7)
+    process_files(conn, *dataset, workers=1)
+    rows = queries.detailed_rows(conn, DAY, DAY)
+    incentive = sum(row[3] for row in rows)
+
+    for extension in exports.EXPORT_FORMATS:
+        assert exports.export(conn, str(tmp_path / f"ledger.{extension}"), DAY, DAY) == len(rows)
+    csv_rows = pd.read_csv(tmp_path / "ledger.csv")
+    parquet_rows = pd.read_parquet(tmp_path / "ledger.parquet")
+    excel_rows = pd.read_excel(tmp_path / "ledger.xlsx")
+    for frame in (csv_rows, parquet_rows, excel_rows):
+        assert list(frame.columns) == queries.LEDGER_COLUMNS
+        assert len(frame) == len(rows)
+        assert frame["Incentive"].sum() == pytest.approx(incentive)
+
+    with pytest.raises(ValueError, match="Unsupported export format"):
+        exports.export(conn, str(tmp_path / "ledger.json"), DAY, DAY)
+
+
+def test_sheet_per_staff_with_overview(conn, dataset, tmp_path):
+    process_files(conn, *dataset, workers=1)
+    path = tmp_path / "staff.xlsx"
+    summary = (["Name", "Range Incentive"], [["Gaurav", 1.0]])
+    written = exports.write_excel(conn, str(path), DAY, DAY, split_by="staff", summary=summary)
+
+    sheets = pd.read_excel(path, sheet_name=None)
+    assert list(sheets)[0] == "Overview"
+    per_staff = dict(conn.execute("SELECT name, COUNT(*) FROM incentives WHERE name != 'NIL' GROUP BY name").fetchall())
+    assert {name: len(sheet) for name, sheet in sheets.items() if name != "Overview"} == per_staff
+    assert written == sum(per_staff.values())
+    assert exports.write_csv(conn, io.StringIO(), DAY, DAY, "Gaurav") == per_staff["Gaurav"]
@@ -0,0 +1,44 @@
+import pytest
+
+from knorka import process_files
+from knorka.config import default_rules
+from knorka.db import connect
+from knorka.ingest import shutdown_executor
+
+from conftest import write_sales
+
+
+def _pool(conn):
+    return conn.execute("SELECT MAX(total_pool) FROM incentives WHERE bill_no = 'Helper Pool'").fetchone()[0]
+
+
+def test_nil_lines_feed_the_pool_but_pay_no_agent(conn, attendance, tmp_path):
+    erp = write_sales(tmp_path / "LS_Sales.xlsx", [
+        ("1", "SHIRT", 1000.0, "Gaurav", None),
+        ("2", "JEANS", 2000.0, "NIL", "Vivek"),
+        ("3", "SAREE", 4000.0, "Nil", None),
+    ])
+    result = process_files(conn, [erp], attendance, workers=1)
+    assert _pool(conn) == pytest.approx((1000.0 + 2000.0) * default_rules["pool_rate"])
+    assert conn.execute("SELECT DISTINCT bill_no FROM incentives WHERE bill_no != 'Helper Pool'").fetchall() == [("1",)]
+    assert result.rejected == [("Booked to NIL", 2, 6000.0)]
+
+
+def _contents(conn):
+    return {table: conn.execute(f"SELECT {columns} FROM {table} ORDER BY {columns}").fetchall() for table, columns in {
+        "incentives": "date_key, company, bill_no, item_name, name, role, incentive, gross, net_amount, second_agent, total_pool",
+        "sales_lines": "date_key, company, bill_no, item_name, gross, net_amount, agent_id, other_agent_id",
+        "rejects": "company, sheet_row, reason",
+    }.items()}
+
+
+def test_parallel_ingest_matches_serial(dataset, tmp_path):
+    results = {}
+    for workers in (1, 2):
+        conn = connect(str(tmp_path / f"workers{workers}.db"))
+        result = process_files(conn, *dataset, workers=workers)
+        results[workers] = (result.rows_processed, result.report_date, result.rejected, _contents(conn))
+        conn.close()
+    shutdown_executor()
+    assert results[1][3]["incentives"]
+    assert results[1] == results[2]
@@ -0,0 +1,52 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from knorka import adjustments, process_files, queries
+from knorka.db import connect
+from knorka.ledger import ADJUSTMENT, CHUNK_ROWS, detailed_frame, get_ledger, load_ledger, search_frame
+
+DAY = date(2025, 3, 1)
+
+
+def _insert(conn, rows, second_agent):
+    conn.executemany("""INSERT INTO incentives (date, name, role, incentive, gross, status, bill_no, second_agent, date_key)
+                        VALUES ('01-03-2025', 'Gaurav', 'Salesman', 1.0, 100.0, 'Present', ?, ?, 20250301)""",
+                     [(str(i), second_agent) for i in range(rows)])
+
+
+def test_all_null_tail_chunk():
+    """Helper Pool rows come last in an ingest and have no second agent, so the last chunk can be all NULL there."""
+    conn = connect(":memory:")
+    _insert(conn, CHUNK_ROWS, "Vivek")
+    _insert(conn, 5, None)
+    ledger = load_ledger(conn)
+    assert len(ledger) == CHUNK_ROWS + 5
+    assert ledger["second_agent"].isna().sum() == 5
+    assert list(ledger["second_agent"].cat.categories) == ["Vivek"]
+
+
+def test_frame_matches_the_database(conn, dataset):
+    process_files(conn, *dataset, workers=1)
+    frame = get_ledger(conn)
+    assert frame["name"].dtype == "category" and frame["incentive"].dtype == "float32"
+
+    rows = pd.DataFrame(queries.detailed_rows(conn, DAY, DAY), columns=queries.LEDGER_COLUMNS)
+    detailed = detailed_frame(frame, DAY, DAY)
+    assert len(detailed) == len(rows)
+    assert detailed["Incentive"].astype("float64").sum() == pytest.approx(rows["Incentive"].sum(), rel=1e-6)
+    gaurav = detailed_frame(frame, DAY, DAY, "Gaurav")
+    assert sorted(gaurav["Bill No"]) == sorted(rows.loc[rows["Name"] == "Gaurav", "Bill No"])
+    assert len(search_frame(frame, "Item Name", "shirt", DAY, DAY)) == len(queries.search_items(conn, "Item Name", "shirt", DAY, DAY)) > 0
+
+
+def test_frame_reloads_after_an_edit(conn, dataset):
+    process_files(conn, *dataset, workers=1)
+    frame = get_ledger(conn)
+    assert get_ledger(conn) is frame
+    adjustments.add_adjustments(conn, ["Gaurav"], DAY, amount=25.0, reason="Bonus")
+    reloaded = get_ledger(conn)
+    assert reloaded is not frame
+    (bonus,) = reloaded.loc[reloaded["bill_no"] == ADJUSTMENT, "incentive"]
+    assert bonus == 25.0
@@ -0,0 +1,46 @@
+import shutil
+import sqlite3
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture
+def load_test(monkeypatch):
+    # The harness points KNORKA_DATA_DIR at its own work directory on import; monkeypatch restores it
+    monkeypatch.setenv("KNORKA_DATA_DIR", "")
+    import load_test
+    yield load_test
+    shutil.rmtree(load_test.WORKDIR, ignore_errors=True)
+    load_test.LOCKS.reset()
+
+
+def test_percentile(load_test):
+    values = [0.1 * i for i in range(10, 0, -1)]
+    assert load_test.percentile(values, 50) == pytest.approx(0.5)
+    assert load_test.percentile(values, 95) == pytest.approx(1.0)
+    assert load_test.percentile([], 50) is None
+    assert load_test._latency([0.2, 0.1])["p50"] == 0.1
+
+
+def test_lock_waits_are_retried_and_recorded(load_test, tmp_path):
+    path = str(tmp_path / "load.db")
+    writer = load_test.timed_connect(path)
+    reader = load_test.timed_connect(path, migrate_schema=False)
+    writer.execute("BEGIN IMMEDIATE")
+    writer.execute("INSERT INTO payments (date, name, amount) VALUES ('01/03/2025', 'Gaurav', 1.0)")
+    release = threading.Timer(0.1, writer.commit)
+    release.start()
+    started = time.perf_counter()
+    reader.execute("INSERT INTO payments (date, name, amount) VALUES ('01/03/2025', 'Vivek', 2.0)")
+    reader.commit()
+    release.join()
+    assert time.perf_counter() - started >= 0.09
+    assert len(load_test.LOCKS.waits) == 1 and load_test.LOCKS.waits[0] >= 0.09
+    assert load_test.LOCKS.timeouts == 0
+    assert reader.execute("SELECT COUNT(*) FROM payments").fetchone()[0] == 2
+
+    with pytest.raises(sqlite3.OperationalError, match="no such table"):
+        reader.execute("SELECT * FROM missing")
+    assert len(load_test.LOCKS.waits) == 1
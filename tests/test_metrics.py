@@ -0,0 +1,36 @@
+import pytest
+
+from knorka import process_files
+from knorka.ingest import IngestError
+from knorka.metrics import recent_runs, run_details
+
+
+def _details(conn, run_id):
+    rows, profile = run_details(conn, run_id)
+    return {(category, metric): (value, calls) for category, metric, value, calls in rows}, profile
+
+
+def test_ingest_run_is_recorded(conn, dataset):
+    result = process_files(conn, *dataset, profile=True, workers=1)
+    (run,) = recent_runs(conn)
+    assert run[:2] + run[3:4] == (result.run_id, "ingest", "ok")
+    assert run[4] > 0 and run[5] > 0
+
+    details, profile = _details(conn, result.run_id)
+    assert {"parse", "validate", "rules", "insert", "commit", "total"} <= {metric for category, metric in details if category == "stage"}
+    assert details["stage", "rules"][0] <= details["stage", "total"][0]
+    assert details["counter", "rows_inserted"][0] == result.rows_processed
+    incentive_rows = conn.execute("SELECT COUNT(*) FROM incentives WHERE bill_no != 'Helper Pool'").fetchone()[0]
+    assert details["sql", "insert incentive"][1] == incentive_rows
+    assert 0 <= details["rate", "fuzzy_match_cache_hit_rate"][0] <= 1
+    assert "cumulative" in profile
+
+
+def test_failed_run_is_recorded_as_an_error(conn, attendance, tmp_path):
+    broken = tmp_path / "LS_Sales.xlsx"
+    broken.write_bytes(b"not a workbook")
+    with pytest.raises(IngestError):
+        process_files(conn, [str(broken)], attendance, workers=1)
+    (run,) = recent_runs(conn)
+    assert (run[1], run[3]) == ("ingest", "error")
+    assert conn.execute("SELECT COUNT(*) FROM incentives").fetchone()[0] == 0
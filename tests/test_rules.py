@@ -0,0 +1,53 @@
+import random
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from knorka import process_files
+from knorka.db import connect
+from knorka.rules import calculate_incentive, load_rule_book, simulate
+
+from conftest import write_sales
+
+NAMES = ["Gaurav", "Vivek", "Sonu", "Shivam", "Sahil", "Maanik", None]
+ITEMS = ["SHIRT", "JEANS", "PETICOT", "UNDERWEAR", "KURTA", None]
+
+
+def test_stored_default_rules_match_calculate_incentive():
+    rules = load_rule_book(connect(":memory:")).at(20250301)
+    rng = random.Random(0)
+    lines = pd.DataFrame([(round(rng.uniform(50, 5000), 2), rng.choice(ITEMS), rng.choice(NAMES), rng.choice(NAMES))
+                          for _ in range(500)], columns=["net_amount", "item_name", "agent", "other_agent"])
+    split = rules.evaluate(lines)
+    for line, (agent_incentive, other_incentive, pool) in zip(lines.itertuples(index=False), split.itertuples(index=False)):
+        agent, other, item = (None if pd.isna(value) else value for value in (line.agent, line.other_agent, line.item_name))
+        incentives, _, contribution = calculate_incentive(agent, other, None, line.net_amount, item, line.net_amount, rules)
+        expected = {name: amount for name, amount in incentives.items() if amount}
+        evaluated = {}
+        for name, amount in ((agent, agent_incentive), (other, other_incentive)):
+            if amount:
+                evaluated[name] = evaluated.get(name, 0.0) + amount
+        assert evaluated == pytest.approx(expected)
+        assert pool == pytest.approx(contribution)
+
+
+def test_simulating_the_stored_rules_changes_nothing(conn, dataset):
+    process_files(conn, *dataset, workers=1)
+    rows = simulate(conn, {}, date(2025, 3, 1), date(2025, 3, 1))
+    ledger = dict(conn.execute("SELECT name, SUM(incentive) FROM incentives GROUP BY name").fetchall())
+    assert {name: current for name, current, _, _ in rows} == pytest.approx({name: ledger.get(name, 0.0) for name, *_ in rows})
+    assert all(delta == pytest.approx(0.0) for *_, delta in rows)
+
+
+def test_simulate_scales_pool_shares(conn, attendance, tmp_path):
+    erp = write_sales(tmp_path / "LS_Sales.xlsx", [("1", "SHIRT", 10000.0, "Gaurav", None), ("2", "JEANS", 6000.0, "Vivek", None)])
+    process_files(conn, [erp], attendance, workers=1)
+    pool_shares = dict(conn.execute("SELECT name, incentive FROM incentives WHERE bill_no = 'Helper Pool'").fetchall())
+    assert pool_shares
+
+    rows = {name: (current, simulated) for name, current, simulated, _ in
+            simulate(conn, {"pool_rate": 0.001}, date(2025, 3, 1), date(2025, 3, 1))}
+    assert rows["Gaurav"] == pytest.approx((10000.0 * (0.01 - 0.0005), 10000.0 * (0.01 - 0.001)))
+    for name, share in pool_shares.items():
+        assert rows[name] == pytest.approx((share, share * 2))
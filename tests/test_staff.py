@@ -0,0 +1,52 @@
+from datetime import date
+
+import pytest
+
+from knorka import admin, process_files, staff
+from knorka.config import staff_list
+from knorka.db import connect
+
+from conftest import write_sales
+
+
+def test_seeded_from_config(conn):
+    directory = staff.directory(conn)
+    assert set(directory.ids) == set(staff_list)
+    assert "Maanik" not in directory.known_staff
+    assert directory.role("Sahil") == "Helper"
+    assert directory.resolve("GAURAV") == "Gaurav"
+    assert directory.resolve("Gourav") is None
+
+
+def test_role_history_keeps_earlier_rows(conn, attendance, tmp_path):
+    process_files(conn, [write_sales(tmp_path / "LS_Sales.xlsx", [("1", "SHIRT", 1000.0, "Gaurav", None)])], attendance, workers=1)
+    staff.set_role(conn, "Gaurav", "Helper", date(2025, 4, 1))
+    directory = staff.directory(conn)
+    assert directory.role("Gaurav", on=20250331) == "Salesman"
+    assert directory.role("Gaurav", on=20250401) == "Helper"
+    assert conn.execute("SELECT DISTINCT role FROM incentives WHERE name = 'Gaurav'").fetchall() == [("Salesman",)]
+    assert conn.execute("SELECT COUNT(*) FROM incentives WHERE staff_id IS NULL AND bill_no != 'Helper Pool'").fetchone()[0] == 0
+
+
+def test_unknown_names_are_refused(conn):
+    with pytest.raises(ValueError, match="Unknown staff member 'Nobody'"):
+        staff.set_role(conn, "Nobody", "Helper")
+    with pytest.raises(ValueError, match="Unknown staff member"):
+        staff.add_alias(conn, "nobdy", "Nobody")
+    assert conn.execute("SELECT COUNT(*) FROM staff_roles WHERE staff_id IS NULL").fetchone()[0] == 0
+
+
+def test_added_staff_and_aliases_persist(tmp_path):
+    path = str(tmp_path / "staff.db")
+    conn = connect(path)
+    assert admin.add_staff(conn, "Ravi", "Helper", "1234")
+    assert not admin.add_staff(conn, "Ravi")
+    staff.add_alias(conn, "RAVI KUMAR", "Ravi")
+    conn.close()
+
+    conn = connect(path)
+    directory = staff.directory(conn)
+    assert directory.resolve("ravi kumar") == "Ravi"
+    assert directory.passwords["Ravi"] == "1234"
+    assert "ravi" in directory.helpers
+    conn.close()
@@ -0,0 +1,30 @@
+import pandas as pd
+
+from knorka.dates import normalize_dates
+from knorka.validation import validate
+
+
+class Matcher:
+    staff = {"gaurav": "Gaurav", "vivek": "Vivek"}
+
+    def match(self, name_lower):
+        return self.staff.get(name_lower.strip())
+
+
+def test_reason_codes():
+    df = pd.DataFrame({
+        "BILL DATE": ["12/03/2025", None, "31/31/2025", "12/03/2025", "12/03/2025", "12/03/2025", "12/03/2025"],
+        "BILL NO.": ["1", "2", "3", "4", "5", "6", "7"],
+        "ITEM NAME": ["Shirt"] * 7,
+        "GROSS AMOUNT": [100.0] * 7,
+        "AGENT NAME": ["Gaurav", "Gaurav", "Gaurav", "NIL", "Nil\n", "Nobody", None],
+        "OTHER AGENT NAME": [None, None, None, "Vivek", None, None, "VIVEK"],
+    })
+    valid, agents, other_agents, rejects = validate(df, normalize_dates(df["BILL DATE"]), Matcher())
+    assert valid["BILL NO."].tolist() == ["1", "7"]
+    assert agents.tolist() == ["Gaurav", None]
+    assert other_agents.tolist() == [None, "Vivek"]
+    assert dict(zip(rejects["BILL NO."], rejects["reason"])) == {
+        "2": "missing_data", "3": "bad_date", "4": "nil_agent", "5": "nil_agent", "6": "unmatched_agent"}
+    assert rejects.set_index("BILL NO.")["feeds_pool"].to_dict() == {
+        "2": False, "3": False, "4": True, "5": False, "6": False}
@@ -0,0 +1,88 @@
+import os
+import shutil
+import time
+
+from knorka import process_files
+from knorka.db import connect
+from knorka.watch import FAILED_DIR, PROCESSED_DIR, FolderWatcher
+
+
+def _inbox(tmp_path, dataset):
+    erp_paths, attendance_path = dataset
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    for path in erp_paths + [attendance_path]:
+        shutil.copy(path, inbox)
+    return inbox
+
+
+def _sales(conn):
+    return conn.execute("SELECT COUNT(*) FROM sales_lines").fetchone()[0]
+
+
+def _ingested(tmp_path, dataset):
+    """Sale lines of the dataset ingested directly."""
+    conn = connect(str(tmp_path / "reference.db"))
+    try:
+        process_files(conn, *dataset)
+        return _sales(conn)
+    finally:
+        conn.close()
+
+
+def test_a_file_still_growing_is_left_alone(conn, tmp_path, dataset):
+    inbox = _inbox(tmp_path, dataset)
+    watcher = FolderWatcher(conn, str(inbox), settle=0, render_pdfs=False)
+    ls_path = inbox / "LS_Sales.xlsx"
+    content = ls_path.read_bytes()
+    ls_path.write_bytes(content[:len(content) // 2])
+    assert watcher.poll() is None
+    ls_path.write_bytes(content)
+    assert watcher.poll() is None
+    assert _sales(conn) == 0
+    assert sorted(os.listdir(inbox)) == ["Attendance.xlsx", "LS_Sales.xlsx", "NFS_Sales.xlsx"]
+
+
+def test_a_settled_batch_is_ingested_and_moved(conn, tmp_path, dataset):
+    inbox = _inbox(tmp_path, dataset)
+    watcher = FolderWatcher(conn, str(inbox), settle=5, render_pdfs=False)
+    # Unchanged across two polls but younger than ``settle``
+    assert watcher.poll() is None
+    assert watcher.poll() is None
+    result = watcher.poll(now=time.time() + 5)
+    assert result.report_date == "01-03-2025"
+    assert _sales(conn) == _ingested(tmp_path, dataset)
+    assert os.listdir(inbox) == [PROCESSED_DIR]
+    (batch,) = os.listdir(inbox / PROCESSED_DIR)
+    assert sorted(os.listdir(inbox / PROCESSED_DIR / batch)) == ["Attendance.xlsx", "LS_Sales.xlsx", "NFS_Sales.xlsx"]
+
+
+def test_a_late_export_reuses_the_batch_attendance(conn, tmp_path, dataset):
+    inbox = _inbox(tmp_path, dataset)
+    expected = _ingested(tmp_path, dataset)
+    nfs_path = inbox / "NFS_Sales.xlsx"
+    late = tmp_path / "NFS_Sales.xlsx"
+    shutil.move(nfs_path, late)
+    watcher = FolderWatcher(conn, str(inbox), settle=0, batch_timeout=60, render_pdfs=False)
+    watcher.poll()
+    assert watcher.poll() is None
+    first = watcher.poll(now=time.time() + 60)
+    assert 0 < _sales(conn) < expected
+    shutil.move(late, nfs_path)
+    watcher.poll()
+    second = watcher.poll()
+    assert second.report_date == first.report_date
+    assert _sales(conn) == expected
+    assert os.listdir(inbox) == [PROCESSED_DIR]
+
+
+def test_an_export_without_attendance_goes_to_failed(conn, tmp_path, dataset):
+    inbox = _inbox(tmp_path, dataset)
+    os.remove(inbox / "Attendance.xlsx")
+    watcher = FolderWatcher(conn, str(inbox), settle=0, batch_timeout=60, render_pdfs=False)
+    watcher.poll()
+    assert watcher.poll() is None
+    assert watcher.poll(now=time.time() + 60) is None
+    assert _sales(conn) == 0
+    (batch,) = os.listdir(inbox / FAILED_DIR)
+    assert sorted(os.listdir(inbox / FAILED_DIR / batch)) == ["LS_Sales.xlsx", "NFS_Sales.xlsx", "error.txt"]